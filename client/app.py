@@ -21,6 +21,15 @@ def get_columns():
     r = requests.get("http://localhost:5000/columnas")
     return r.json().get("columns", [])
 
+@st.cache_data
+def valores_unicos(col, agrup="Ninguna", prefijo="", limit=500):
+    # primera página de valores distintos (filtrados por prefijo si se indica)
+    params = {"col": col, "agrup": agrup, "limit": limit}
+    if prefijo:
+        params["prefijo"] = prefijo
+    r = requests.get("http://localhost:5000/valores_unicos", params=params)
+    return r.json().get("values", []) if r.ok else []
+
 # --- Carga de datos por defecto o subida ---
 uploaded_file = st.file_uploader(
     "Sube tu propio CSV para analizar",
@@ -37,6 +46,7 @@ if uploaded_file is not None:
             get_preview.clear()
             get_log.clear()
             get_columns.clear()
+            valores_unicos.clear()
             st.info("Por favor, recarga la página para ver el nuevo dataset.")
             st.stop()
         else:
@@ -75,8 +85,9 @@ if chart_type == "Boxplot":
 
 elif chart_type == "Correlograma":
     st.markdown("**Correlograma**: correlación entre todas las variables numéricas")
+    metodo = st.radio("Método", ["pearson", "spearman"], horizontal=True, key="cm")
     if st.button("Generar Correlograma"):
-        payload = {"tipo": "Correlograma"}
+        payload = {"tipo": "Correlograma", "metodo": metodo}
         r = requests.post("http://localhost:5000/graficar", json=payload)
         if r.ok:
             st.image(r.content, use_container_width=True)
@@ -91,10 +102,8 @@ elif chart_type == "Scatter":
     if grp!="(Sin)":
         if any(tok in grp.lower() for tok in ("date","fecha")):
             agr_g = st.selectbox("Agrupar fechas grupo", ["Anual","Mensual","Diaria"], key="sgf")
-        vals = requests.get(
-            "http://localhost:5000/valores_unicos",
-            params={"col":grp, "agrup":agr_g}
-        ).json().get("values",[])
+        filtro = st.text_input(f"Buscar en {grp}", key="sbf")
+        vals = valores_unicos(grp, agr_g, filtro)
         sel = st.multiselect(f"Seleccionar {grp}", vals, default=vals[:5], key="sms")
     if st.button("Generar Scatter"):
         payload = {
@@ -129,10 +138,8 @@ else:  # Barra / Línea
     if group_col != "(Sin agrupación)":
         if any(tok in group_col.lower() for tok in ("date","fecha")):
             agrup_g = st.selectbox("Agrupar fechas grupo", ["Anual","Mensual","Diaria"], key="bfg")
-        vals = requests.get(
-            "http://localhost:5000/valores_unicos",
-            params={"col": group_col, "agrup": agrup_g}
-        ).json().get("values", [])
+        filtro = st.text_input(f"Buscar en '{group_col}'", key="bbf")
+        vals = valores_unicos(group_col, agrup_g, filtro)
         seleccion_grps = st.multiselect(f"Seleccionar valores de '{group_col}'", vals, default=vals[:5], key="bms")
 
     if st.button("Generar gráfico", key="bgen"):
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .indexes import DateBucketIndex
+
+# funciones de agregación que ofrecen los gráficos de Barra y Línea
+AGG_FUNCS = {"Media": "mean", "Suma": "sum"}
+
+
+def date_bucket(s: pd.Series, agrupacion: str) -> pd.Series:
+    """
+    Agrupa una columna datetime por año, mes o día.
+    Devuelve una Series categórica ordenada con las mismas etiquetas que
+    to_period("Y"/"M").astype(str) o dt.date.astype(str), pero formateando solo
+    los valores distintos: el coste por fila es un código entero, no una cadena.
+    """
+    if agrupacion == "Anual":
+        keys = s.dt.year
+        fmt = lambda u: [str(int(k)) for k in u]
+    elif agrupacion == "Mensual":
+        keys = s.dt.to_period("M")
+        fmt = lambda u: [str(k) for k in u]
+    else:
+        keys = s.dt.normalize()
+        fmt = lambda u: list(pd.DatetimeIndex(u).strftime("%Y-%m-%d"))
+
+    codes, uniques = pd.factorize(keys, sort=True)   # NaT → -1 (nulo)
+    cat = pd.Categorical.from_codes(codes, categories=fmt(uniques), ordered=True)
+    return pd.Series(cat, index=s.index, name=s.name)
+
+
+def group_key(df: pd.DataFrame, col: str, agrupacion: str = "Ninguna",
+              buckets: Optional["DateBucketIndex"] = None) -> pd.Series:
+    """
+    Columna usada como clave de agrupación, con agrupación temporal si procede.
+    Si se pasa un DateBucketIndex del mismo df, se usa la agrupación precalculada.
+    """
+    s = df[col]
+    if agrupacion != "Ninguna" and pd.api.types.is_datetime64_any_dtype(s):
+        pre = buckets.get(col, agrupacion) if buckets is not None else None
+        return pre if pre is not None else date_bucket(s, agrupacion)
+    return s
+
+
+def isin_mask(s: pd.Series, values: List[Any]) -> np.ndarray:
+    """
+    Máscara booleana de s.isin(values). En columnas categóricas se resuelve sobre
+    los códigos: una tabla de len(categorías) booleanos indexada por el código de
+    cada fila, sin comparar valores fila a fila.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = s.cat.categories
+        hit = cats.get_indexer(pd.Index(list(values)).unique())
+        table = np.zeros(len(cats) + 1, dtype=bool)   # la última posición es el código -1 (nulo)
+        table[hit[hit >= 0]] = True
+        return table[s.cat.codes.to_numpy()]
+    return s.isin(values).to_numpy()
+
+
+def aggregate(df: pd.DataFrame,
+              x_col: str,
+              y_col: Optional[str],
+              agregacion: str,
+              grupo: Optional[str] = None,
+              agrupacion_fecha: str = "Ninguna",
+              agrupacion_grupo_fecha: str = "Ninguna",
+              seleccion_grupos: Optional[List[Any]] = None,
+              buckets: Optional["DateBucketIndex"] = None) -> pd.Series:
+    """
+    Calcula el resultado que pintan Barra y Línea sin copiar el DataFrame:
+    solo se leen las columnas x_col, y_col y grupo, el filtro de grupos es una
+    máscara booleana y las columnas categóricas se agrupan por sus códigos.
+    Devuelve una Series indexada por x_col (y grupo, si lo hay) con tantas
+    filas como combinaciones existentes. buckets: agrupaciones de fechas precalculadas.
+    """
+    mask = None
+    group_bucketed = bool(grupo) and agrupacion_grupo_fecha != "Ninguna" \
+        and pd.api.types.is_datetime64_any_dtype(df[grupo])
+    if grupo and seleccion_grupos and not group_bucketed:
+        mask = isin_mask(df[grupo], seleccion_grupos)
+
+    keys = [group_key(df, x_col, agrupacion_fecha, buckets)]
+    if grupo:
+        keys.append(group_key(df, grupo, agrupacion_grupo_fecha, buckets))
+    if mask is not None:
+        keys = [k[mask] for k in keys]
+
+    if agregacion == "Conteo":
+        result = keys[0].groupby(keys, observed=True, sort=True).size().rename("count")
+    else:
+        y = df[y_col] if mask is None else df[y_col][mask]
+        result = y.groupby(keys, observed=True, sort=True).agg(AGG_FUNCS[agregacion])
+
+    result.index = result.index.set_names([x_col, grupo] if grupo else x_col)
+
+    # con el grupo agrupado por fechas, la selección se compara con las etiquetas
+    if group_bucketed and seleccion_grupos:
+        labels = result.index.get_level_values(grupo).astype(str)
+        result = result[np.asarray(labels.isin([str(v) for v in seleccion_grupos]))]
+    return result
+
+
+def bin_points(x: pd.Series,
+               y: pd.Series,
+               groups: Optional[pd.Series] = None,
+               bins: Tuple[int, int] = (400, 250),
+               max_groups: int = 10) -> Dict[str, Any]:
+    """
+    Rejilla 2D de conteos para un scatter de densidad (estilo datashader).
+    Cada punto se asigna a una celda con aritmética vectorizada y se cuenta con
+    un único np.bincount, también por grupo: el resultado ocupa
+    grupos × bins[1] × bins[0] enteros, independientemente del número de filas.
+    Los grupos que no entran entre los max_groups más frecuentes se juntan en "Otros".
+    """
+    xv = pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    yv = pd.to_numeric(y, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    ok = np.isfinite(xv) & np.isfinite(yv)
+
+    labels: List[str] = [""]
+    codes = np.zeros(len(xv), dtype=np.int64)
+    if groups is not None:
+        g_codes, uniques = pd.factorize(groups, sort=True)
+        ok &= g_codes >= 0
+        freq = np.bincount(g_codes[ok], minlength=len(uniques))
+        top = np.argsort(-freq, kind="stable")[:max_groups]
+        top = top[freq[top] > 0]
+        remap = np.full(len(uniques) + 1, len(top), dtype=np.int64)
+        remap[top] = np.arange(len(top))
+        codes = remap[g_codes]
+        labels = [str(uniques[i]) for i in top]
+        if len(uniques) > len(top) and freq.sum() > freq[top].sum():
+            labels.append("Otros")
+
+    xv, yv, codes = xv[ok], yv[ok], codes[ok]
+    nx, ny = bins
+    if len(xv):
+        xmin, xmax = float(xv.min()), float(xv.max())
+        ymin, ymax = float(yv.min()), float(yv.max())
+    else:
+        xmin, xmax, ymin, ymax = 0.0, 1.0, 0.0, 1.0
+    if xmax == xmin:
+        xmax = xmin + 1.0
+    if ymax == ymin:
+        ymax = ymin + 1.0
+
+    ix = np.clip(((xv - xmin) / (xmax - xmin) * nx).astype(np.int64), 0, nx - 1)
+    iy = np.clip(((yv - ymin) / (ymax - ymin) * ny).astype(np.int64), 0, ny - 1)
+    flat = (codes * ny + iy) * nx + ix
+    counts = np.bincount(flat, minlength=len(labels) * ny * nx).reshape(len(labels), ny, nx)
+
+    return {
+        "counts": counts.astype(np.uint32),
+        "labels": labels,
+        "extent": (xmin, xmax, ymin, ymax),
+        "n_points": int(len(xv)),
+    }
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (motor de Parquet para pandas)
+except ImportError:  # pragma: no cover - dependencia opcional
+    pyarrow = None
+
+
+def cleaner_config(cleaner: Any) -> Dict[str, Any]:
+    """
+    Configuración de un ICleaner (clase + parámetros) para usarla como parte de la clave.
+    Los limpiadores sin params() aportan todos sus atributos.
+    """
+    params = cleaner.params() if hasattr(cleaner, "params") else vars(cleaner)
+    return {"class": type(cleaner).__name__, **params}
+
+
+class DatasetCache:
+    """
+    Caché en disco de datasets ya cargados y limpios, en formato columnar (Parquet).
+    La clave se calcula a partir de la ruta del fichero, su mtime y tamaño
+    (y opcionalmente un hash del contenido) y de la configuración de limpieza,
+    de modo que cualquier cambio en el CSV o en el Cleaner invalida la entrada.
+    Los df.attrs (p.ej. "cleaning_log") se guardan en un JSON junto al Parquet.
+    """
+    def __init__(self, cache_dir: str, hash_content: bool = False,
+                 max_bytes: Optional[int] = None):
+        """
+        cache_dir: directorio donde se guardan las entradas.
+        hash_content: incluir en la clave un hash SHA-256 del fichero (más lento, más seguro).
+        max_bytes: tamaño máximo del directorio; se borran las entradas más antiguas.
+        """
+        self.cache_dir = cache_dir
+        self.hash_content = hash_content
+        self.max_bytes = max_bytes
+        self.enabled = pyarrow is not None
+        if self.enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # --- claves ---
+    def key(self, file_path: str, config: Optional[Dict[str, Any]] = None) -> str:
+        st = os.stat(file_path)
+        ident = {
+            "path": os.path.abspath(file_path),
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "config": config or {},
+        }
+        if self.hash_content:
+            ident["sha256"] = self._file_hash(file_path)
+        raw = json.dumps(ident, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def _file_hash(file_path: str, block: int = 1 << 20) -> str:
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for buf in iter(lambda: f.read(block), b""):
+                h.update(buf)
+        return h.hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".parquet", base + ".json"
+
+    def _tmp(self, final_path: str) -> str:
+        # nombre único por escritura: dos cargas simultáneas del mismo fichero no se pisan
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir,
+                                   prefix=os.path.basename(final_path) + ".", suffix=".tmp")
+        os.close(fd)
+        return tmp
+
+    @staticmethod
+    def _commit(tmp_data: str, tmp_meta: str, data_path: str, meta_path: str,
+                meta: Dict[str, Any]) -> None:
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_data, data_path)
+        os.replace(tmp_meta, meta_path)
+
+    @staticmethod
+    def _discard(*tmp_paths: str) -> None:
+        # temporales que quedan si la escritura falló a medias
+        for tmp in tmp_paths:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+
+    # --- lectura / escritura ---
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Devuelve el DataFrame cacheado (mapeado en memoria) o None si no existe."""
+        if not self.enabled:
+            return None
+        data_path, meta_path = self._paths(key)
+        if not (os.path.isfile(data_path) and os.path.isfile(meta_path)):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            df = pd.read_parquet(data_path, engine="pyarrow", memory_map=True)
+        except Exception:
+            # entrada corrupta o a medio escribir: se ignora
+            return None
+        df.attrs = meta.get("attrs", {})
+        os.utime(meta_path)  # marca de uso para la poda por antigüedad
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        if not self.enabled:
+            return
+        data_path, meta_path = self._paths(key)
+        meta = {"created": time.time(), "attrs": _json_safe(df.attrs)}
+
+        # escritura atómica: fichero temporal + rename
+        tmp_data, tmp_meta = self._tmp(data_path), self._tmp(meta_path)
+        try:
+            df.to_parquet(tmp_data, engine="pyarrow", index=False)
+            self._commit(tmp_data, tmp_meta, data_path, meta_path, meta)
+        finally:
+            self._discard(tmp_data, tmp_meta)
+
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes)
+
+    def put_chunks(self, key: str, chunks: Iterable[pd.DataFrame],
+                   attrs: Optional[Callable[[], Dict[str, Any]]] = None) -> int:
+        """
+        Escribe en la caché un dataset que llega por bloques, sin reunirlo en memoria.
+        attrs se llama al terminar (p.ej. para recoger el cleaning_log de un StreamingCleaner).
+        Devuelve el número de filas escritas.
+        """
+        if not self.enabled:
+            for _ in chunks:
+                pass
+            return 0
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        data_path, meta_path = self._paths(key)
+        tmp_data, tmp_meta = self._tmp(data_path), self._tmp(meta_path)
+        writer = None
+        rows = 0
+        try:
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_data, table.schema)
+                    elif table.schema != writer.schema:
+                        table = table.cast(writer.schema)
+                    writer.write_table(table)
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                return 0
+            meta = {"created": time.time(), "attrs": _json_safe(attrs() if attrs else {})}
+            self._commit(tmp_data, tmp_meta, data_path, meta_path, meta)
+        finally:
+            self._discard(tmp_data, tmp_meta)
+
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes)
+        return rows
+
+    def prune(self, max_bytes: int) -> None:
+        """Borra las entradas usadas hace más tiempo hasta quedar por debajo de max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".parquet"):
+                continue
+            key = name[: -len(".parquet")]
+            data_path, meta_path = self._paths(key)
+            size = os.path.getsize(data_path)
+            used = os.path.getmtime(meta_path) if os.path.isfile(meta_path) else 0.0
+            entries.append((used, size, key))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= max_bytes:
+                break
+            for p in self._paths(key):
+                if os.path.isfile(p):
+                    os.remove(p)
+            total -= size
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((".parquet", ".json", ".tmp")):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+def canonical_key(payload: Dict[str, Any], version: Any = None) -> str:
+    """
+    Clave estable para un payload JSON: claves ordenadas, listas de selección
+    ordenadas y la versión del dataset incluida.
+    """
+    norm = dict(payload)
+    if isinstance(norm.get("seleccion_grupos"), list):
+        norm["seleccion_grupos"] = sorted(norm["seleccion_grupos"], key=str)
+    raw = json.dumps({"payload": norm, "version": version},
+                     sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def sizeof(value: Any) -> int:
+    """Tamaño aproximado en bytes de un valor cacheado."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if hasattr(value, "indptr"):   # matriz dispersa de scipy (CSR/CSC)
+        return int(value.data.nbytes + value.indices.nbytes + value.indptr.nbytes)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Caché en memoria LRU acotada por tamaño total (bytes) y, opcionalmente, por número de entradas.
+    Es segura entre hilos y lleva estadísticas de aciertos, fallos y expulsiones.
+    """
+    def __init__(self, max_bytes: int, max_items: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = sizeof):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return   # no cabe: no desalojamos todo por una sola entrada
+            self._data[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes or \
+                    (self.max_items is not None and len(self._data) > self.max_items):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        del self._data[key]
+        self._bytes -= self._sizes.pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "items": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _json_safe(obj: Any) -> Any:
+    # los attrs pueden contener tipos numpy; los convertimos a tipos JSON
+    return json.loads(json.dumps(obj, default=str))
@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
+import time
+import numpy as np
 import pandas as pd
-from typing import List, Optional, Union, Dict, Any
+from typing import Callable, Iterable, Iterator, List, Optional, Union, Dict, Any
+
+from .datasource import IDataSource, concat_chunks
+from .sketches import HyperLogLog
 
 
 class ICleaner(ABC):
@@ -36,9 +41,33 @@ class Cleaner(ICleaner):
         self.drop_empty_const = drop_empty_const
         self.null_threshold = null_threshold
 
-    def clean(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+    def params(self) -> Dict[str, Any]:
+        """Parámetros del constructor (sin el estado ajustado), p.ej. para crear otro limpiador igual."""
+        return {
+            "date_cols": self.date_cols,
+            "date_patterns": self.date_patterns,
+            "strategy_numeric": self.strategy_numeric,
+            "strategy_categorical": self.strategy_categorical,
+            "drop_empty_const": self.drop_empty_const,
+            "null_threshold": self.null_threshold,
+        }
+
+    def clean(self, df: pd.DataFrame, copy: bool = True,
+              progress: Optional[Callable[[str], None]] = None) -> pd.DataFrame:
+        """
+        Limpieza vectorizada en una sola pasada:
+        - ratios de nulos y columnas constantes calculados de una vez para todas las columnas
+        - las filas a eliminar se acumulan en una única máscara y se filtran al final
+        - la imputación se hace en el propio DataFrame
+        copy=False modifica df en lugar de trabajar sobre una copia.
+        Además del log, deja en df.attrs["cleaning_timings"] los segundos de cada paso.
+        progress: si se indica, se llama con el nombre de cada paso al terminarlo.
+        """
+        if copy:
+            df = df.copy()
         log: List[str] = []
+        timings: Dict[str, float] = {}
+        t0 = time.perf_counter()
 
         # 1) columnas de fecha
         if self.date_cols is None:
@@ -55,65 +84,406 @@ class Cleaner(ICleaner):
                 log.append(f"Columna '{c}' convertida a datetime.")
             except Exception:
                 log.append(f"Columna '{c}' NO se pudo convertir a datetime.")
+        t0 = _lap(timings, "fechas", t0, progress)
+
+        # 2) nulos por columna en una sola pasada (count() no materializa un frame de booleanos)
+        n_rows = len(df)
+        null_counts = n_rows - df.count()
+        t0 = _lap(timings, "nulos", t0, progress)
 
         # 3) eliminar columnas vacías o constantes
+        drop_cols: List[str] = []
         if self.drop_empty_const:
-            before = df.shape[1]
-            df = df.dropna(axis=1, how="all")
-            df = df.loc[:, df.nunique() > 1]
-            removed = before - df.shape[1]
-            if removed:
-                log.append(f"Eliminadas {removed} columnas vacías o constantes.")
-
-        # 4) nulos
-        for c in list(df.columns):
-            pct = df[c].isnull().mean()
+            drop_cols = [c for c in df.columns if _is_empty_or_constant(df[c], null_counts[c], n_rows)]
+            if drop_cols:
+                log.append(f"Eliminadas {len(drop_cols)} columnas vacías o constantes.")
+        t0 = _lap(timings, "constantes", t0, progress)
+
+        # 4) plan de nulos: columnas a eliminar, valores de imputación y máscara de filas
+        fill_values: Dict[str, Any] = {}
+        add_category: List[str] = []
+        row_mask = np.zeros(n_rows, dtype=bool)
+        dropped_cols = set(drop_cols)
+
+        for c in df.columns:
+            if c in dropped_cols:
+                continue
+            null_count = int(null_counts[c])
+            pct = null_count / n_rows if n_rows else 0.0
             if pct > self.null_threshold:
-                df.drop(columns=[c], inplace=True)
+                drop_cols.append(c)
                 log.append(f"Columna '{c}' eliminada (> {pct:.0%} nulos).")
                 continue
 
             # 4a) columnas numéricas
             if pd.api.types.is_numeric_dtype(df[c]):
-                null_count = df[c].isnull().sum()
                 strat = self.strategy_numeric
                 if strat == "mean" and null_count > 0:
-                    df[c] = df[c].fillna(df[c].mean())
+                    fill_values[c] = df[c].mean()
                     log.append(f"'{c}' imputada con media.")
                 elif strat == "zero":
-                    df[c] = df[c].fillna(0)
+                    if null_count > 0:
+                        fill_values[c] = 0
                     log.append(f"'{c}' imputada con cero.")
                 elif strat == "drop" and null_count > 0:
-                    before_rows = len(df)
-                    df = df.dropna(subset=[c])
-                    dropped = before_rows - len(df)
+                    dropped = _extend_mask(row_mask, df[c])
                     log.append(f"Dropped {dropped} filas con nulos en '{c}'.")
 
             # 4b) columnas categóricas
             else:
-                null_count = df[c].isnull().sum()
                 strat = self.strategy_categorical
                 if strat == "fill" and null_count > 0:
-                    # si ya es Categorical, añadimos el nuevo nivel
-                    if pd.api.types.is_categorical_dtype(df[c]):
-                        df[c] = df[c].cat.add_categories("Desconocido")
-                    df[c] = df[c].fillna("Desconocido")
+                    # si ya es Categorical, hay que añadir el nuevo nivel
+                    if isinstance(df[c].dtype, pd.CategoricalDtype):
+                        add_category.append(c)
+                    fill_values[c] = "Desconocido"
                     log.append(f"'{c}' imputada con 'Desconocido'.")
                 elif strat == "drop" and null_count > 0:
-                    before_rows = len(df)
-                    df = df.dropna(subset=[c])
-                    dropped = before_rows - len(df)
+                    dropped = _extend_mask(row_mask, df[c])
                     log.append(f"Dropped {dropped} filas con nulos en '{c}'.")
+        t0 = _lap(timings, "plan", t0, progress)
 
-        # 5) mensajes si quedan nulos
-        remaining = int(df.isnull().sum().sum())
+        # 5) aplicar el plan: columnas, filas e imputación
+        if drop_cols:
+            df.drop(columns=drop_cols, inplace=True)
+        if row_mask.any():
+            df = df[~row_mask]
+        for c in add_category:
+            if "Desconocido" not in df[c].cat.categories:
+                df[c] = df[c].cat.add_categories("Desconocido")
+        if fill_values:
+            df.fillna(value=fill_values, inplace=True)
+        t0 = _lap(timings, "aplicar", t0, progress)
+
+        # 6) mensajes si quedan nulos
+        remaining = int(df.shape[0] * df.shape[1] - df.count().sum())
         if remaining:
             log.append(f"⚠️ Quedan {remaining} valores nulos tras limpieza.")
+        _lap(timings, "verificar", t0, progress)
 
         df.attrs["cleaning_log"] = log
+        df.attrs["cleaning_timings"] = timings
         return df
 
 
+def _lap(timings: Dict[str, float], step: str, t0: float,
+         progress: Optional[Callable[[str], None]] = None) -> float:
+    # registra el tiempo del paso, avisa a progress y devuelve el instante actual
+    now = time.perf_counter()
+    timings[step] = round(now - t0, 4)
+    if progress is not None:
+        progress(step)
+    return now
+
+
+def _is_empty_or_constant(s: pd.Series, null_count: int, n_rows: int) -> bool:
+    # equivalente a nunique() <= 1 sin construir la tabla hash completa
+    if null_count >= n_rows:
+        return True
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        codes = codes[codes >= 0]
+        return bool((codes == codes[0]).all())
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) \
+            or pd.api.types.is_datetime64_any_dtype(s):
+        return s.min() == s.max()
+    values = s.dropna() if null_count else s
+    return bool((values == values.iloc[0]).all())
+
+
+def _extend_mask(row_mask: np.ndarray, s: pd.Series) -> int:
+    # añade a la máscara las filas nulas de s y devuelve cuántas filas nuevas se eliminan
+    nulls = s.isna().to_numpy()
+    new = int((nulls & ~row_mask).sum())
+    row_mask |= nulls
+    return new
+
+
+
+class _ColumnStats:
+    """Estadísticos acumulados de una columna a lo largo de los bloques."""
+    def __init__(self, count_distinct: bool = False):
+        self.nulls = 0
+        self.count = 0
+        self.total = 0.0
+        self.numeric = True
+        self.dtypes: List[Any] = []
+        self.categories: Dict[Any, None] = {}   # unión ordenada de categorías
+        self.first: Any = None
+        self.vmin: Any = None
+        self.vmax: Any = None
+        self.varies = False
+        self.distinct = HyperLogLog(p=12) if count_distinct else None
+
+    def update(self, s: pd.Series) -> None:
+        n_null = int(s.isna().sum())
+        self.nulls += n_null
+        self.count += len(s) - n_null
+        if s.dtype not in self.dtypes:
+            self.dtypes.append(s.dtype)
+
+        is_cat = isinstance(s.dtype, pd.CategoricalDtype)
+        if is_cat:
+            self.categories.update(dict.fromkeys(s.cat.categories))
+        if not pd.api.types.is_numeric_dtype(s):   # mismo criterio que Cleaner.clean (bool es numérica)
+            self.numeric = False
+        if len(s) == n_null:
+            return
+
+        if self.distinct is not None:
+            self.distinct.update(s)
+        if self.numeric:
+            self.total += float(np.nansum(s.to_numpy(dtype="float64", na_value=np.nan)))
+        if self.varies:
+            return
+        # valores mínimo y máximo (o primer valor) para detectar columnas constantes
+        if self.numeric or pd.api.types.is_datetime64_any_dtype(s):
+            lo, hi = s.min(), s.max()
+            self.vmin = lo if self.vmin is None else min(self.vmin, lo)
+            self.vmax = hi if self.vmax is None else max(self.vmax, hi)
+            self.varies = self.vmin != self.vmax
+        else:
+            if is_cat:
+                values = pd.Series(s.cat.remove_unused_categories().cat.categories)
+            else:
+                values = s.dropna()
+            if self.first is None:
+                self.first = values.iloc[0]
+            self.varies = bool((values != self.first).any())
+
+
+class StreamingCleaner(Cleaner):
+    """
+    Variante de Cleaner en dos pasadas para datos que no caben en memoria.
+    1) fit(): recorre los bloques acumulando nulos, sumas, conteos y mínimos/máximos
+       por columna, y decide el plan de limpieza.
+    2) transform(): aplica el plan bloque a bloque (mismas reglas que Cleaner).
+    Al agotar transform() quedan en cleaning_log_ los mismos mensajes que daría Cleaner.clean
+    y en stats_ los estadísticos por columna.
+    """
+    def __init__(self, *args: Any, count_distinct: bool = False, **kwargs: Any):
+        """
+        count_distinct: estimar además los valores distintos de cada columna con un
+            HyperLogLog (stats_[c].distinct). El plan no lo usa y hashea todas las
+            filas, así que por defecto está desactivado.
+        Resto de parámetros: los de Cleaner.
+        """
+        super().__init__(*args, **kwargs)
+        self.count_distinct = count_distinct
+
+    def params(self) -> Dict[str, Any]:
+        return {**super().params(), "count_distinct": self.count_distinct}
+
+    def fit(self, chunks: Iterable[pd.DataFrame]) -> "StreamingCleaner":
+        stats: Dict[str, _ColumnStats] = {}
+        columns: List[str] = []
+        date_cols: Optional[List[str]] = None
+        date_failed: set = set()
+        n_rows = 0
+
+        for chunk in chunks:
+            if date_cols is None:
+                columns = list(chunk.columns)
+                date_cols = self._date_columns(columns)
+                stats = {c: _ColumnStats(self.count_distinct) for c in columns}
+            for c in date_cols:
+                if c in date_failed:
+                    continue
+                try:
+                    chunk[c] = pd.to_datetime(chunk[c])
+                except Exception:
+                    date_failed.add(c)
+            n_rows += len(chunk)
+            for c in columns:
+                stats[c].update(chunk[c])
+
+        date_cols = date_cols or []
+        self.stats_ = stats
+        self.n_rows_ = n_rows
+        self.plan_ = self._build_plan(columns, date_cols, date_failed, stats, n_rows)
+        return self
+
+    def _date_columns(self, columns: List[str]) -> List[str]:
+        if self.date_cols is None:
+            return [c for c in columns if any(pat in c.lower() for pat in self.date_patterns)]
+        return [c for c in self.date_cols if c in columns]
+
+    def _build_plan(self, columns, date_cols, date_failed, stats, n_rows) -> Dict[str, Any]:
+        # el log se guarda como plantilla: los mensajes de filas eliminadas se
+        # completan en transform(), que es cuando se conocen los conteos
+        log: List[Any] = []
+        for c in date_cols:
+            if c in date_failed:
+                log.append(f"Columna '{c}' NO se pudo convertir a datetime.")
+            else:
+                log.append(f"Columna '{c}' convertida a datetime.")
+
+        drop_cols: List[str] = []
+        if self.drop_empty_const:
+            drop_cols = [c for c in columns if stats[c].count == 0 or not stats[c].varies]
+            if drop_cols:
+                log.append(f"Eliminadas {len(drop_cols)} columnas vacías o constantes.")
+
+        fill_values: Dict[str, Any] = {}
+        row_drop_cols: List[str] = []
+        categories: Dict[str, List[Any]] = {}
+        casts: Dict[str, Any] = {}
+
+        for c in columns:
+            if c in drop_cols:
+                continue
+            st = stats[c]
+            pct = st.nulls / n_rows if n_rows else 0.0
+            if pct > self.null_threshold:
+                drop_cols.append(c)
+                log.append(f"Columna '{c}' eliminada (> {pct:.0%} nulos).")
+                continue
+
+            if st.categories:
+                categories[c] = list(st.categories)
+            if len(st.dtypes) > 1 and st.numeric:
+                # p.ej. int8 en un bloque e int16 o float32 en otro
+                casts[c] = np.result_type(*st.dtypes)
+
+            if st.numeric:
+                strat = self.strategy_numeric
+                if strat == "mean" and st.nulls > 0:
+                    fill_values[c] = st.total / st.count
+                    log.append(f"'{c}' imputada con media.")
+                elif strat == "zero":
+                    if st.nulls > 0:
+                        fill_values[c] = 0
+                    log.append(f"'{c}' imputada con cero.")
+                elif strat == "drop" and st.nulls > 0:
+                    row_drop_cols.append(c)
+                    log.append(("drop_rows", c))
+            else:
+                strat = self.strategy_categorical
+                if strat == "fill" and st.nulls > 0:
+                    if c in categories and "Desconocido" not in categories[c]:
+                        categories[c].append("Desconocido")
+                    fill_values[c] = "Desconocido"
+                    log.append(f"'{c}' imputada con 'Desconocido'.")
+                elif strat == "drop" and st.nulls > 0:
+                    row_drop_cols.append(c)
+                    log.append(("drop_rows", c))
+
+        return {
+            "date_cols": [c for c in date_cols if c not in date_failed],
+            "drop_cols": drop_cols,
+            "fill_values": fill_values,
+            "row_drop_cols": row_drop_cols,
+            "categories": categories,
+            "casts": casts,
+            "log": log,
+        }
+
+    def transform(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Aplica el plan calculado en fit() a cada bloque. Es un generador: el log
+        final (cleaning_log_) está disponible cuando se han consumido todos los bloques.
+        """
+        plan = self.plan_
+        dropped_rows = {c: 0 for c in plan["row_drop_cols"]}
+        remaining = 0
+
+        for chunk in chunks:
+            for c in plan["date_cols"]:
+                chunk[c] = pd.to_datetime(chunk[c])
+            chunk = chunk.drop(columns=[c for c in plan["drop_cols"] if c in chunk.columns])
+
+            if dropped_rows:
+                mask = np.zeros(len(chunk), dtype=bool)
+                for c in plan["row_drop_cols"]:
+                    dropped_rows[c] += _extend_mask(mask, chunk[c])
+                if mask.any():
+                    chunk = chunk[~mask]
+
+            # todos los bloques comparten categorías y tipos
+            for c, cats in plan["categories"].items():
+                chunk[c] = chunk[c].cat.set_categories(cats)
+            for c, dtype in plan["casts"].items():
+                chunk[c] = chunk[c].astype(dtype)
+            # solo las columnas con nulos en el bloque: fillna sobre una columna object
+            # sin nulos intentaría convertirla de tipo (FutureWarning en pandas 2.x)
+            fill = {c: v for c, v in plan["fill_values"].items()
+                    if c in chunk.columns and chunk[c].hasnans}
+            if fill:
+                chunk = chunk.fillna(value=fill)
+
+            remaining += int(chunk.shape[0] * chunk.shape[1] - chunk.count().sum())
+            yield chunk
+
+        log = [
+            f"Dropped {dropped_rows[entry[1]]} filas con nulos en '{entry[1]}'."
+            if isinstance(entry, tuple) else entry
+            for entry in plan["log"]
+        ]
+        if remaining:
+            log.append(f"⚠️ Quedan {remaining} valores nulos tras limpieza.")
+        self.cleaning_log_ = log
+
+    def clean_chunks(self, source: IDataSource) -> Iterator[pd.DataFrame]:
+        """Dos pasadas sobre la fuente: fit() con sus bloques y transform() con una nueva lectura."""
+        self.fit(source.iter_chunks())
+        return self.transform(source.iter_chunks())
+
+    def clean(self, df: pd.DataFrame, copy: bool = True,
+              progress: Optional[Callable[[str], None]] = None,
+              chunksize: int = 500_000) -> pd.DataFrame:
+        """
+        Con un DataFrame en memoria se usa el mismo plan, recorriéndolo por bloques.
+        Misma firma que Cleaner.clean: df nunca se modifica (cada bloque es una copia),
+        así que copy no cambia nada; progress se llama tras el plan y tras aplicarlo.
+        """
+        timings: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        chunks = lambda: (df.iloc[i:i + chunksize].copy() for i in range(0, max(len(df), 1), chunksize))
+        self.fit(chunks())
+        t0 = _lap(timings, "plan", t0, progress)
+        out = concat_chunks(list(self.transform(chunks())))
+        _lap(timings, "aplicar", t0, progress)
+        out.attrs["cleaning_log"] = self.cleaning_log_
+        out.attrs["cleaning_timings"] = timings
+        return out
+
+
+
+class CleanedDataSource(IDataSource):
+    """
+    Fuente que limpia por bloques otra fuente con un StreamingCleaner y aplica
+    después transforms (funciones bloque → bloque, p.ej. add_time_features).
+    El plan de limpieza se calcula en la primera lectura y se reutiliza en las
+    siguientes, así que recorrerla varias veces (épocas de entrenamiento) solo
+    añade una pasada de fit() en total.
+    """
+    def __init__(self, source: IDataSource, cleaner: StreamingCleaner,
+                 transforms: Iterable[Callable[[pd.DataFrame], pd.DataFrame]] = ()):
+        self.source = source
+        self.cleaner = cleaner
+        self.transforms = list(transforms)
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        if getattr(self.cleaner, "plan_", None) is None:
+            self.cleaner.fit(self.source.iter_chunks())
+        for chunk in self.cleaner.transform(self.source.iter_chunks()):
+            for fn in self.transforms:
+                chunk = fn(chunk)
+            yield chunk
+
+    def load(self) -> pd.DataFrame:
+        return concat_chunks(list(self.iter_chunks()))
+
+
+def add_time_features(df: pd.DataFrame, column: str = "Start_Time") -> pd.DataFrame:
+    """Añade Hour, Weekday y Month a partir de la columna datetime column (si existe)."""
+    if column in df.columns and pd.api.types.is_datetime64_any_dtype(df[column]):
+        st = df[column]
+        df["Hour"] = st.dt.hour
+        df["Weekday"] = st.dt.dayofweek
+        df["Month"] = st.dt.month
+    return df
+
 
 class TypeOnlyCleaner(ICleaner):
     """
@@ -125,8 +495,13 @@ class TypeOnlyCleaner(ICleaner):
         """
         self.dtype_map = dtype_map
 
-    def clean(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+    def clean(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+        """
+        copy=False trabaja sobre df (p. ej. una copia superficial): las columnas
+        convertidas se reemplazan, no se modifican en sitio.
+        """
+        if copy:
+            df = df.copy()
         log: List[str] = []
 
         for col, dtype in self.dtype_map.items():
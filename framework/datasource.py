@@ -1,5 +1,12 @@
 from abc import ABC, abstractmethod
+import os
+import warnings
 import pandas as pd
+from pandas.api.types import union_categoricals
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# compresión según la extensión (al pasar un fichero abierto pandas no la infiere)
+_COMPRESSION = {".gz": "gzip", ".bz2": "bz2", ".zip": "zip", ".xz": "xz", ".zst": "zstd"}
 
 class IDataSource(ABC):
     @abstractmethod
@@ -7,6 +14,13 @@ class IDataSource(ABC):
         """Carga y devuelve un DataFrame."""
         pass
 
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Devuelve el dataset por bloques. Por defecto un único bloque con load();
+        las fuentes que pueden leer en streaming lo sobrescriben.
+        """
+        yield self.load()
+
 class CSVDataSource(IDataSource):
     def __init__(self, file_path: str):
         self.file_path = file_path
@@ -14,6 +28,166 @@ class CSVDataSource(IDataSource):
     def load(self) -> pd.DataFrame:
         return pd.read_csv(self.file_path)
 
+class ChunkedCSVDataSource(IDataSource):
+    """
+    Lectura de CSV por bloques de tamaño acotado con inferencia de tipos compactos.
+    Los tipos se deciden con una muestra inicial (sample_rows filas):
+      - texto con pocos valores distintos → category
+      - texto que parsea como fecha → datetime64
+      - enteros → el entero más pequeño que quepa (por bloque)
+      - reales → float32 si downcast_floats=True
+    iter_chunks() mantiene la memoria acotada por chunksize; load() concatena los
+    bloques unificando las categorías.
+    """
+    def __init__(
+        self,
+        file_path: str,
+        chunksize: int = 500_000,
+        sample_rows: int = 100_000,
+        infer_dtypes: bool = True,
+        category_ratio: float = 0.5,
+        max_categories: int = 10_000,
+        date_ratio: float = 0.95,
+        downcast_floats: bool = True,
+        read_csv_kwargs: Optional[Dict[str, Any]] = None,
+        progress: Optional[Callable[[int, int, int], None]] = None,
+    ):
+        """
+        chunksize: filas por bloque.
+        sample_rows: filas leídas para inferir los tipos.
+        category_ratio: ratio máximo valores distintos / no nulos para usar category.
+        max_categories: número máximo de valores distintos para usar category.
+        date_ratio: fracción mínima de valores de la muestra que deben parsear como fecha.
+        downcast_floats: convertir los reales a float32.
+        progress: se llama tras cada bloque con (filas leídas, bytes leídos, bytes totales).
+            Si lanza una excepción, la lectura se interrumpe.
+        """
+        self.file_path = file_path
+        self.chunksize = chunksize
+        self.sample_rows = sample_rows
+        self.infer_dtypes = infer_dtypes
+        self.category_ratio = category_ratio
+        self.max_categories = max_categories
+        self.date_ratio = date_ratio
+        self.downcast_floats = downcast_floats
+        self.read_csv_kwargs = read_csv_kwargs or {}
+        self.progress = progress
+        self._plan: Optional[Dict[str, List[str]]] = None
+
+    # --- inferencia de tipos ---
+    def infer_plan(self) -> Dict[str, List[str]]:
+        """
+        Lee una muestra y decide qué columnas son category, datetime, int o float.
+        El resultado se guarda para no volver a leer la muestra.
+        """
+        if self._plan is not None:
+            return self._plan
+
+        sample = pd.read_csv(self.file_path, nrows=self.sample_rows, **self.read_csv_kwargs)
+        plan: Dict[str, List[str]] = {"category": [], "datetime": [], "int": [], "float": []}
+
+        for c in sample.columns:
+            s = sample[c]
+            if pd.api.types.is_bool_dtype(s):
+                continue
+            if pd.api.types.is_integer_dtype(s):
+                plan["int"].append(c)
+            elif pd.api.types.is_float_dtype(s):
+                plan["float"].append(c)
+            elif s.dtype == object:
+                values = s.dropna()
+                if values.empty:
+                    continue
+                if self._looks_like_date(values):
+                    plan["datetime"].append(c)
+                    continue
+                nunique = values.nunique()
+                if nunique <= self.max_categories and nunique / len(values) <= self.category_ratio:
+                    plan["category"].append(c)
+
+        self._plan = plan
+        return plan
+
+    def _looks_like_date(self, values: pd.Series) -> bool:
+        # probamos primero con unas pocas filas: parsear texto que no es fecha es muy lento
+        for vals in (values.head(100), values):
+            if not vals.astype(str).str.contains(r"\d").all():
+                return False
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                parsed = pd.to_datetime(vals, errors="coerce")
+            if parsed.notna().mean() < self.date_ratio:
+                return False
+        return True
+
+    def _apply_plan(self, chunk: pd.DataFrame, plan: Dict[str, List[str]]) -> pd.DataFrame:
+        for c in plan["datetime"]:
+            if c in chunk.columns:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    chunk[c] = pd.to_datetime(chunk[c], errors="coerce")
+        for c in plan["int"]:
+            if c in chunk.columns and pd.api.types.is_integer_dtype(chunk[c]):
+                chunk[c] = pd.to_numeric(chunk[c], downcast="integer")
+        if self.downcast_floats:
+            for c in plan["float"]:
+                if c in chunk.columns and pd.api.types.is_float_dtype(chunk[c]):
+                    chunk[c] = chunk[c].astype("float32")
+        return chunk
+
+    # --- lectura ---
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        kwargs = dict(self.read_csv_kwargs)
+        plan = None
+        if self.infer_dtypes:
+            plan = self.infer_plan()
+            dtype = dict(kwargs.pop("dtype", None) or {})
+            for c in plan["category"]:
+                dtype.setdefault(c, "category")
+            kwargs["dtype"] = dtype
+
+        if self.progress is None:
+            with pd.read_csv(self.file_path, chunksize=self.chunksize, **kwargs) as reader:
+                for chunk in reader:
+                    yield self._apply_plan(chunk, plan) if plan is not None else chunk
+            return
+
+        # con progreso abrimos el fichero nosotros para saber cuántos bytes lleva leídos
+        total = os.path.getsize(self.file_path)
+        kwargs.setdefault("compression", _COMPRESSION.get(os.path.splitext(self.file_path)[1].lower()))
+        rows = 0
+        with open(self.file_path, "rb") as fh, \
+                pd.read_csv(fh, chunksize=self.chunksize, **kwargs) as reader:
+            self.progress(0, 0, total)
+            for chunk in reader:
+                rows += len(chunk)
+                self.progress(rows, min(fh.tell(), total), total)
+                yield self._apply_plan(chunk, plan) if plan is not None else chunk
+
+    def load(self) -> pd.DataFrame:
+        return concat_chunks(list(self.iter_chunks()))
+
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena bloques conservando las columnas category: pd.concat las degradaría
+    a object si cada bloque tiene categorías distintas.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+
+    for c in chunks[0].columns:
+        if isinstance(chunks[0][c].dtype, pd.CategoricalDtype):
+            if not all(c in ch.columns and isinstance(ch[c].dtype, pd.CategoricalDtype) for ch in chunks):
+                continue
+            cats = union_categoricals([ch[c] for ch in chunks]).categories
+            for ch in chunks:
+                ch[c] = ch[c].cat.set_categories(cats)
+
+    return pd.concat(chunks, ignore_index=True)
+
 class JSONDataSource(IDataSource):
     def __init__(self, file_path: str):
         self.file_path = file_path
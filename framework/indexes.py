@@ -0,0 +1,127 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from .aggregation import date_bucket, group_key
+
+# agrupaciones temporales que ofrece el cliente
+GRANULARITIES = ("Anual", "Mensual", "Diaria")
+
+
+class DateBucketIndex:
+    """
+    Agrupaciones temporales precalculadas (año, mes y día) de las columnas datetime
+    de un DataFrame. Cada una es una columna categórica alineada con df (códigos
+    int8/int16 por fila), así los gráficos y los valores únicos no vuelven a
+    convertir millones de fechas a texto en cada petición.
+    """
+    def __init__(self, df: pd.DataFrame, columns: Optional[List[str]] = None,
+                 granularities: Tuple[str, ...] = GRANULARITIES):
+        """
+        columns: columnas a indexar; por defecto todas las datetime.
+        """
+        if columns is None:
+            columns = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+        self.columns = columns
+        self.index = df.index
+        self._buckets: Dict[Tuple[str, str], pd.Series] = {
+            (c, g): date_bucket(df[c], g) for c in columns for g in granularities
+        }
+
+    def get(self, col: str, agrupacion: str) -> Optional[pd.Series]:
+        """Columna agrupada o None si col no está indexada con esa agrupación."""
+        return self._buckets.get((col, agrupacion))
+
+    def labels(self, col: str, agrupacion: str) -> Optional[List[str]]:
+        """Etiquetas distintas, ordenadas, de una agrupación."""
+        s = self.get(col, agrupacion)
+        return None if s is None else list(s.cat.categories)
+
+    def memory_usage(self) -> int:
+        return int(sum(s.memory_usage(deep=True, index=False) for s in self._buckets.values()))
+
+
+class _DistinctValues:
+    """Valores distintos de una columna, ordenados, con su frecuencia."""
+    def __init__(self, s: pd.Series):
+        ordered = isinstance(s.dtype, pd.CategoricalDtype) and s.cat.ordered
+        codes, uniques = pd.factorize(s, sort=ordered)   # nulos → -1
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        uniques = pd.Index(uniques)
+        if not ordered:
+            order = uniques.argsort()
+            uniques, counts = uniques[order], counts[order]
+        self.values = uniques
+        self.counts = counts
+        self._by_freq: Optional[np.ndarray] = None
+        self._keys: Optional[np.ndarray] = None
+        self._key_order: Optional[np.ndarray] = None
+
+    def by_frequency(self) -> np.ndarray:
+        if self._by_freq is None:
+            self._by_freq = np.argsort(-self.counts, kind="stable")
+        return self._by_freq
+
+    def search(self, prefix: str) -> np.ndarray:
+        """Posiciones (en orden de valor) de los valores cuyo texto empieza por prefix, sin distinguir mayúsculas."""
+        if self._keys is None:
+            keys = np.array([str(v).lower() for v in self.values], dtype=object)
+            self._key_order = np.argsort(keys, kind="stable")
+            self._keys = keys[self._key_order]
+        prefix = prefix.lower()
+        lo = np.searchsorted(self._keys, prefix, side="left")
+        hi = np.searchsorted(self._keys, prefix + "\U0010ffff", side="left")
+        return np.sort(self._key_order[lo:hi])
+
+
+class DistinctValueIndex:
+    """
+    Valores distintos por columna (y agrupación de fechas), ordenados y con su
+    frecuencia, para los desplegables del cliente. Cada columna se indexa la
+    primera vez que se pide; después una página cuesta un slice, y la búsqueda
+    por prefijo un par de búsquedas binarias. Se construye uno por versión del df.
+    """
+    def __init__(self, df: pd.DataFrame, buckets: Optional[DateBucketIndex] = None):
+        """buckets: agrupaciones de fechas precalculadas del mismo df."""
+        self.df = df
+        self.buckets = buckets
+        self._index: Dict[Tuple[str, str], _DistinctValues] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, col: str, agrupacion: str) -> _DistinctValues:
+        key = (col, agrupacion)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                entry = _DistinctValues(group_key(self.df, col, agrupacion, self.buckets))
+                self._index[key] = entry
+            return entry
+
+    def page(self, col: str, agrupacion: str = "Ninguna", offset: int = 0,
+             limit: Optional[int] = 100, orden: str = "valor",
+             prefijo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Página de valores distintos de col.
+        orden: "valor" (ascendente) o "frecuencia" (descendente).
+        prefijo: filtra los valores cuyo texto empieza por él.
+        Devuelve values, counts, total (valores que cumplen el filtro), offset y limit.
+        """
+        entry = self._get(col, agrupacion)
+        pos = entry.search(prefijo) if prefijo else None
+        if orden == "frecuencia":
+            freq = entry.by_frequency()
+            pos = freq if pos is None else freq[np.isin(freq, pos)]
+        total = len(entry.values) if pos is None else len(pos)
+        end = total if limit is None else offset + limit
+        pos = np.arange(offset, min(end, total)) if pos is None else pos[offset:end]
+        return {
+            "values": pd.Series(entry.values.take(pos), dtype=object).tolist(),
+            "counts": entry.counts[pos].tolist(),
+            "total":  int(total),
+            "offset": offset,
+            "limit":  limit,
+        }
+
+    def computed(self) -> List[Tuple[str, str]]:
+        return list(self._index)
@@ -0,0 +1,203 @@
+import itertools
+import multiprocessing
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+def process_context() -> multiprocessing.context.BaseContext:
+    """
+    Contexto para los pools de procesos del servidor. Los pools se crean (y
+    recrean) desde hilos de peticiones o de trabajos: hacer fork de un proceso con
+    varios hilos puede dejar al hijo bloqueado en un lock heredado. Con forkserver
+    (o spawn donde no existe) los procesos nacen de un proceso sin hilos.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class JobCancelled(Exception):
+    """Se lanza desde Job.report() cuando se ha pedido cancelar el trabajo."""
+
+
+class QueueFull(Exception):
+    """No caben más trabajos pendientes en el JobManager."""
+
+
+class Job:
+    """
+    Trabajo en segundo plano con su progreso. La función del trabajo llama a
+    report() en cada punto de control: actualiza filas, bytes, pasos (folds,
+    candidatos...) y etapa y, si se pidió cancelar, lanza JobCancelled para
+    terminar en ese punto.
+    """
+    def __init__(self, job_id: str, kind: str, params: Optional[Dict[str, Any]] = None):
+        self.id = job_id
+        self.kind = kind
+        self.params = params or {}
+        self.status = "pendiente"       # pendiente, en curso, cancelando, completado, error, cancelado
+        self.stage: Optional[str] = None
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_total: Optional[int] = None
+        self.steps = 0
+        self.steps_total: Optional[int] = None
+        self.stage_started_at: Optional[float] = None
+        self.stage_start_fraction = 0.0  # fracción completada al empezar la etapa
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Any = None
+        self.future: Optional[Future] = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completado", "error", "cancelado")
+
+    def report(self, stage: Optional[str] = None, rows: Optional[int] = None,
+               bytes_read: Optional[int] = None, bytes_total: Optional[int] = None,
+               steps: Optional[int] = None, steps_total: Optional[int] = None) -> None:
+        new_stage = stage is not None and stage != self.stage
+        if stage is not None:
+            self.stage = stage
+        if rows is not None:
+            self.rows = rows
+        if bytes_read is not None:
+            self.bytes_read = bytes_read
+        if bytes_total is not None:
+            self.bytes_total = bytes_total
+        if steps is not None:
+            self.steps = steps
+        if steps_total is not None:
+            self.steps_total = steps_total
+        if new_stage:
+            # los pasos suelen volver a 0 en cada etapa (rondas, ajuste final): el ritmo
+            # para la ETA se mide desde aquí
+            self.stage_started_at = time.time()
+            self.stage_start_fraction = self.fraction() or 0.0
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+    def fraction(self) -> Optional[float]:
+        """Fracción completada: por bytes leídos o, si no hay, por pasos."""
+        if self.bytes_total:
+            return self.bytes_read / self.bytes_total
+        if self.steps_total:
+            return self.steps / self.steps_total
+        return None
+
+    def eta(self) -> Optional[float]:
+        """Segundos restantes de la etapa en curso, al ritmo medido desde que empezó (lectura o pasos)."""
+        frac = self.fraction()
+        if self.status != "en curso" or not frac or frac >= 1:
+            return None
+        start = self.stage_started_at or self.started_at
+        done = frac - self.stage_start_fraction
+        if done <= 0:
+            return None
+        elapsed = time.time() - start
+        return round(elapsed * (1 - frac) / done, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "id":          self.id,
+            "kind":        self.kind,
+            "params":      self.params,
+            "status":      self.status,
+            "stage":       self.stage,
+            "rows":        self.rows,
+            "bytes_read":  self.bytes_read,
+            "bytes_total": self.bytes_total,
+            "steps":       self.steps,
+            "steps_total": self.steps_total,
+            "progress":    None if self.fraction() is None else round(self.fraction(), 4),
+            "elapsed":     round(end - self.started_at, 1) if self.started_at else 0.0,
+            "eta":         self.eta(),
+            "error":       self.error,
+        }
+
+
+class JobManager:
+    """
+    Ejecuta trabajos largos (cargas de datasets...) en un pool de hilos propio y
+    acotado, fuera de los hilos que atienden peticiones: las cargas no bloquean
+    a los gráficos. Como mucho max_workers trabajos en curso y max_pending en
+    cola; más allá, submit() lanza QueueFull. Se conservan los últimos
+    keep_finished trabajos terminados para consultar su estado.
+    """
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, keep_finished: int = 100):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any,
+               params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Job:
+        """Encola fn(job, *args, **kwargs); su valor de retorno queda en job.result."""
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if not j.done)
+            if active >= self.max_workers + self.max_pending:
+                raise QueueFull(f"Hay {active} trabajos pendientes; inténtalo más tarde")
+            job = Job(f"{kind}-{next(self._ids)}", kind, params)
+            self._jobs[job.id] = job
+            self._trim()
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        if job.cancelled:
+            job.status, job.finished_at = "cancelado", time.time()
+            return
+        job.status, job.started_at = "en curso", time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "completado"
+        except JobCancelled:
+            job.status = "cancelado"
+        except Exception as e:
+            traceback.print_exc()
+            job.status, job.error = "error", str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _trim(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.done]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """Pide cancelar el trabajo; termina en su siguiente punto de control."""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job.status, job.finished_at = "cancelado", time.time()
+        return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        for job in self.list():
+            if not job.done:
+                job._cancel.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
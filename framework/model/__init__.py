@@ -1,7 +1,8 @@
 from .modelbase import BasePipelineModel, IModelStrategy
-from .classification import LogisticClassification
-from .clustering import KMeansClustering
-from .regression import LinearRegressionModel
+from .incremental import IncrementalModel
+from .classification import LogisticClassification, SGDClassification
+from .clustering import KMeansClustering, MiniBatchKMeansClustering
+from .regression import LinearRegressionModel, SGDRegressionModel
 
 __all__ = [
   "IModelStrategy",
@@ -9,4 +10,8 @@ __all__ = [
   "KMeansClustering",
   "LogisticClassification",
   "LinearRegressionModel",
+  "IncrementalModel",
+  "SGDClassification",
+  "SGDRegressionModel",
+  "MiniBatchKMeansClustering",
 ]
@@ -0,0 +1,125 @@
+import io
+import json
+from typing import Any, Hashable, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..cache import LRUCache, sizeof
+
+try:
+    import pyarrow as pa
+except ImportError:  # sin pyarrow solo hay salida JSON / NDJSON
+    pa = None
+
+# (posiciones de las filas del lote, predicciones del lote)
+Batch = Tuple[np.ndarray, np.ndarray]
+
+
+class BatchPredictor:
+    """
+    Predicción por lotes de tamaño fijo sobre todas las filas de X o solo sobre
+    las posiciones indicadas, sin materializar todas las predicciones a la vez.
+    Si el modelo separa preprocesado y estimador (BasePipelineModel.transform /
+    predict_transformed), cada lote se preprocesa por separado, así que pedir
+    unas pocas filas solo transforma esas filas.
+    Al predecir todas las filas, si la matriz preprocesada completa cabe en
+    feature_cache se guarda con la clave dada (modelo, versión, dataset,
+    features): las predicciones siguientes sobre el mismo dataset, también las
+    de rangos o filtros, solo ejecutan el estimador.
+    """
+    def __init__(self, model: Any, feature_cache: Optional[LRUCache] = None,
+                 batch_size: int = 50_000):
+        if batch_size <= 0:
+            raise ValueError("batch_size debe ser positivo")
+        self.model = model
+        self.feature_cache = feature_cache
+        self.batch_size = batch_size
+
+    def cached_features(self, key: Optional[Hashable]) -> Optional[Any]:
+        """Matriz preprocesada de todas las filas si está en la caché."""
+        if key is None or self.feature_cache is None or not hasattr(self.model, "predict_transformed"):
+            return None
+        return self.feature_cache.get(key)
+
+    def iter_batches(self, X: pd.DataFrame, rows: Optional[np.ndarray] = None,
+                     key: Optional[Hashable] = None) -> Iterator[Batch]:
+        """Lotes (posiciones, predicciones) en orden de fila."""
+        Xt = self.cached_features(key)
+        n = len(X) if rows is None else len(rows)
+        # bloques preprocesados para la caché, mientras la estimación de la matriz completa quepa
+        keep = [] if Xt is None and rows is None and key is not None and self.feature_cache is not None else None
+        kept_bytes = 0
+        separable = hasattr(self.model, "predict_transformed")
+        for start in range(0, n, self.batch_size):
+            stop = min(start + self.batch_size, n)
+            pos = np.arange(start, stop) if rows is None else rows[start:stop]
+            if Xt is not None:
+                preds = self.model.predict_transformed(Xt[pos])
+            else:
+                block = X.iloc[start:stop] if rows is None else X.iloc[pos]
+                bt = self.model.transform(block) if separable else None
+                if bt is None:
+                    separable, keep = False, None    # el modelo no preprocesa: predict directo
+                    preds = self.model.predict(block)
+                else:
+                    preds = self.model.predict_transformed(bt)
+                    if keep is not None:
+                        keep.append(bt)
+                        kept_bytes += sizeof(bt)
+                        if kept_bytes * n / stop > self.feature_cache.max_bytes:
+                            keep = None
+            yield pos, np.asarray(preds)
+        if keep:
+            self.feature_cache.put(key, _stack(keep))
+
+
+def _stack(blocks: list) -> Any:
+    if hasattr(blocks[0], "indptr"):   # matriz dispersa de scipy (p.ej. one-hot)
+        from scipy import sparse
+        return sparse.vstack(blocks, format=blocks[0].format)
+    return np.concatenate(blocks)
+
+
+def _jsonable(values: np.ndarray) -> list:
+    # NaN no es JSON válido: lo enviamos como null
+    if values.dtype.kind == "f":
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def ndjson_batches(batches: Iterable[Batch], index: pd.Index) -> Iterator[bytes]:
+    """Una línea JSON por lote: {"index": [...], "predictions": [...]}."""
+    for pos, preds in batches:
+        line = {"index": _jsonable(index[pos].to_numpy()), "predictions": _jsonable(preds)}
+        yield (json.dumps(line, default=str) + "\n").encode("utf-8")
+
+
+def arrow_batches(batches: Iterable[Batch], index: pd.Index) -> Iterator[bytes]:
+    """
+    Stream IPC de Arrow con un record batch (columnas index, prediction) por lote.
+    Se lee con pyarrow.ipc.open_stream(...).read_all().
+    """
+    if pa is None:
+        raise ImportError("El formato arrow necesita pyarrow")
+    buf = io.BytesIO()
+    writer = None
+    for pos, preds in batches:
+        rb = pa.record_batch([pa.array(index[pos].to_numpy()), pa.array(preds)],
+                             names=["index", "prediction"])
+        if writer is None:
+            writer = pa.ipc.new_stream(buf, rb.schema)
+        writer.write_batch(rb)
+        yield _drain(buf)
+    if writer is None:   # sin filas: stream vacío pero válido
+        schema = pa.schema([("index", pa.int64()), ("prediction", pa.null())])
+        writer = pa.ipc.new_stream(buf, schema)
+    writer.close()
+    yield _drain(buf)
+
+
+def _drain(buf: io.BytesIO) -> bytes:
+    data = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return data
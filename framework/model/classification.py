@@ -1,5 +1,6 @@
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix
+from .incremental import IncrementalModel
 from .modelbase import IModelStrategy
 import pandas as pd
 
@@ -20,3 +21,14 @@ class LogisticClassification(IModelStrategy):
             "accuracy": accuracy_score(y, y_pred),
             "confusion_matrix": confusion_matrix(y, y_pred).tolist()
         }
+
+
+class SGDClassification(IncrementalModel):
+    """
+    Clasificador lineal entrenado por bloques con SGD (por defecto loss="log_loss",
+    es decir, regresión logística): sirve para datasets que no caben en memoria.
+    """
+    def __init__(self, scale: bool = True, n_epochs: int = 1, batch_size: int = 50_000, **kw):
+        kw.setdefault("loss", "log_loss")
+        kw.setdefault("random_state", 0)
+        super().__init__(SGDClassifier(**kw), scale=scale, n_epochs=n_epochs, batch_size=batch_size)
@@ -1,11 +1,23 @@
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from .evaluation import ClusterStats, cluster_scores, silhouette_with_ci, stratified_sample
+from .incremental import IncrementalModel
 from .modelbase import IModelStrategy
+import numpy as np
 import pandas as pd
 
 class KMeansClustering(IModelStrategy):
-    def __init__(self, n_clusters=3, **kw):
+    def __init__(self, n_clusters=3, silhouette_sample: int = 10_000, random_state: int = 0,
+                 confidence: float = 0.95, **kw):
+        """
+        silhouette_sample: filas de la muestra estratificada con la que se estima silhouette.
+        random_state: semilla de KMeans (salvo que kw traiga otra) y de la muestra.
+        confidence: nivel del intervalo de confianza de silhouette.
+        """
+        kw.setdefault("random_state", random_state)
         self.n_clusters = n_clusters
+        self.silhouette_sample = silhouette_sample
+        self.random_state = random_state
+        self.confidence = confidence
         self.km = KMeans(n_clusters=n_clusters, **kw)
 
     def fit(self, X: pd.DataFrame, y=None):
@@ -18,8 +30,81 @@ class KMeansClustering(IModelStrategy):
         return pd.Series(self.km.predict(X), index=X.index)
 
     def evaluate(self, X: pd.DataFrame, y=None):  #devuelve inercia y puntuación de silhouette.
-        labels = self.predict(X)
+        # silhouette exacta es O(n²): se estima con una muestra estratificada por clúster
+        # (con intervalo de confianza) y se añaden Calinski-Harabasz y Davies-Bouldin por centroides
+        labels = self.km.predict(X)
         return {
             "inertia": float(self.km.inertia_),
-            "silhouette": silhouette_score(X, labels)
+            **cluster_scores(X.to_numpy(dtype="float64"), labels, self.n_clusters,
+                             sample_size=self.silhouette_sample, random_state=self.random_state,
+                             confidence=self.confidence),
         }
+
+
+class MiniBatchKMeansClustering(IncrementalModel):
+    """
+    K-means por bloques (MiniBatchKMeans.partial_fit): los centros se actualizan
+    con cada bloque sin cargar todas las filas. La validación progresiva es la
+    inercia media por fila de cada bloque antes de aprender de él.
+    """
+    def __init__(self, n_clusters: int = 3, scale: bool = True, n_epochs: int = 1,
+                 batch_size: int = 50_000, silhouette_sample: int = 10_000, random_state: int = 0,
+                 confidence: float = 0.95, **kw):
+        kw.setdefault("random_state", random_state)
+        super().__init__(MiniBatchKMeans(n_clusters=n_clusters, **kw),
+                         scale=scale, n_epochs=n_epochs, batch_size=batch_size)
+        self.n_clusters = n_clusters
+        self.silhouette_sample = silhouette_sample
+        self.random_state = random_state
+        self.confidence = confidence
+
+    def _new_metrics(self) -> "_InertiaSums":
+        return _InertiaSums()
+
+    def _progressive(self, acc, Xa, ya):
+        acc = acc if acc is not None else self._new_metrics()
+        acc.update(Xa, self.estimator)
+        return acc
+
+    def evaluate(self, X: pd.DataFrame = None, y=None):
+        # por bloques: inercia y estadísticos por clúster (Calinski-Harabasz, Davies-Bouldin);
+        # silhouette sobre una muestra estratificada por clúster, la única parte en memoria
+        if X is None:
+            return super().evaluate()
+        acc = self._new_metrics()
+        stats = ClusterStats(self.n_clusters)
+        labels = []
+        for _, Xa in self._batches(X):
+            lab = self.estimator.predict(Xa)
+            acc.update(Xa, self.estimator)
+            stats.update(Xa, lab)
+            labels.append(lab)
+        labels = np.concatenate(labels) if labels else np.array([], dtype=int)
+        for i, (_, Xa) in enumerate(self._batches(X)):
+            stats.update_distances(Xa, labels[i * self.batch_size:(i + 1) * self.batch_size])
+
+        idx = stratified_sample(labels, self.silhouette_sample, self.random_state)
+        Xs = self._prepare(X.iloc[idx][self.features_])[0]
+        clusters, counts = np.unique(labels, return_counts=True)
+        return {
+            "inertia": acc.inertia, **acc.metrics(),
+            **silhouette_with_ci(Xs, labels[idx], dict(zip(clusters.tolist(), counts.tolist())),
+                                 self.confidence, random_state=self.random_state),
+            "calinski_harabasz": stats.calinski_harabasz(),
+            "davies_bouldin":    stats.davies_bouldin(),
+        }
+
+
+class _InertiaSums:
+    """Suma de distancias al cuadrado a su centro, acumulable por bloques."""
+    def __init__(self):
+        self.n = 0
+        self.inertia = 0.0
+
+    def update(self, Xa, estimator) -> "_InertiaSums":
+        self.n += len(Xa)
+        self.inertia += float(-estimator.score(Xa))
+        return self
+
+    def metrics(self):
+        return {"n": self.n, "inertia_per_row": self.inertia / self.n if self.n else None}
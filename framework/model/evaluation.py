@@ -0,0 +1,362 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from sklearn.metrics import silhouette_samples
+from sklearn.model_selection import train_test_split
+
+
+class ConfusionCounts:
+    """
+    Matriz de confusión acumulable: update() suma lotes de (y_true, y_pred) y
+    merge() combina conteos de otros lotes o folds. De los conteos salen
+    accuracy y precisión / recall / F1 sin volver a predecir.
+    Las etiquetas se guardan ordenadas, como en sklearn.metrics.confusion_matrix.
+    """
+    kind = "classification"
+
+    def __init__(self, labels: Optional[List[Any]] = None, matrix: Optional[np.ndarray] = None):
+        self.labels: List[Any] = list(labels or [])
+        k = len(self.labels)
+        self.matrix = np.zeros((k, k), dtype=np.int64) if matrix is None else np.asarray(matrix, dtype=np.int64)
+
+    def _extend(self, new: List[Any]) -> None:
+        labels = sorted(set(self.labels) | set(new), key=lambda v: (str(type(v)), v))
+        if labels == self.labels:
+            return
+        pos = pd.Index(labels).get_indexer(self.labels)
+        matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        matrix[np.ix_(pos, pos)] = self.matrix
+        self.labels, self.matrix = labels, matrix
+
+    def update(self, y_true: Any, y_pred: Any) -> "ConfusionCounts":
+        t = pd.Series(np.asarray(y_true)).dropna()
+        p = pd.Series(np.asarray(y_pred)).reindex(t.index)
+        self._extend(pd.unique(pd.concat([t, p.dropna()])).tolist())
+        index = pd.Index(self.labels)
+        ti, pi = index.get_indexer(t), index.get_indexer(p)
+        ok = pi >= 0
+        k = len(self.labels)
+        self.matrix += np.bincount(ti[ok] * k + pi[ok], minlength=k * k).reshape(k, k)
+        return self
+
+    def merge(self, other: "ConfusionCounts") -> "ConfusionCounts":
+        self._extend(other.labels)
+        pos = pd.Index(self.labels).get_indexer(other.labels)
+        self.matrix[np.ix_(pos, pos)] += other.matrix
+        return self
+
+    def metrics(self) -> Dict[str, Any]:
+        m = self.matrix
+        n = int(m.sum())
+        tp = np.diag(m).astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(m.sum(axis=0) > 0, tp / m.sum(axis=0), 0.0)
+            recall = np.where(m.sum(axis=1) > 0, tp / m.sum(axis=1), 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        return {
+            "n":                n,
+            "accuracy":         float(tp.sum() / n) if n else None,
+            "precision_macro":  float(precision.mean()) if len(tp) else None,
+            "recall_macro":     float(recall.mean()) if len(tp) else None,
+            "f1_macro":         float(f1.mean()) if len(tp) else None,
+            "labels":           _plain(self.labels),
+            "confusion_matrix": m.tolist(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "labels": _plain(self.labels), "matrix": self.matrix.tolist()}
+
+
+class ResidualSums:
+    """
+    Sumas acumulables de residuos y del target (desplazado por el primer valor
+    medio, para no perder precisión en la varianza) con las que se calculan
+    MSE, RMSE, MAE y R² por lotes o folds.
+    """
+    kind = "regression"
+
+    def __init__(self, n: int = 0, shift: Optional[float] = None, sum_y: float = 0.0,
+                 sum_y2: float = 0.0, sse: float = 0.0, sae: float = 0.0):
+        self.n = n
+        self.shift = shift
+        self.sum_y = sum_y      # Σ (y - shift)
+        self.sum_y2 = sum_y2    # Σ (y - shift)²
+        self.sse = sse          # Σ (y - ŷ)²
+        self.sae = sae          # Σ |y - ŷ|
+
+    def update(self, y_true: Any, y_pred: Any) -> "ResidualSums":
+        t = np.asarray(y_true, dtype="float64")
+        p = np.asarray(y_pred, dtype="float64")
+        ok = ~(np.isnan(t) | np.isnan(p))
+        t, p = t[ok], p[ok]
+        if not len(t):
+            return self
+        if self.shift is None:
+            self.shift = float(t.mean())
+        d = t - self.shift
+        err = t - p
+        self.n += len(t)
+        self.sum_y += float(d.sum())
+        self.sum_y2 += float((d * d).sum())
+        self.sse += float((err * err).sum())
+        self.sae += float(np.abs(err).sum())
+        return self
+
+    def merge(self, other: "ResidualSums") -> "ResidualSums":
+        if other.n == 0:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+        # las sumas de other pasan a nuestro desplazamiento
+        delta = other.shift - self.shift
+        self.sum_y2 += other.sum_y2 + 2 * delta * other.sum_y + other.n * delta * delta
+        self.sum_y += other.sum_y + other.n * delta
+        self.n += other.n
+        self.sse += other.sse
+        self.sae += other.sae
+        return self
+
+    def metrics(self) -> Dict[str, Any]:
+        if not self.n:
+            return {"n": 0, "mse": None, "rmse": None, "mae": None, "r2": None}
+        sst = self.sum_y2 - self.sum_y ** 2 / self.n
+        mse = self.sse / self.n
+        return {
+            "n":    self.n,
+            "mse":  mse,
+            "rmse": float(np.sqrt(mse)),
+            "mae":  self.sae / self.n,
+            "r2":   1 - self.sse / sst if sst > 0 else None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "n": self.n, "shift": self.shift, "sum_y": self.sum_y,
+                "sum_y2": self.sum_y2, "sse": self.sse, "sae": self.sae}
+
+
+def _plain(values: List[Any]) -> List[Any]:
+    # etiquetas numpy → tipos de Python (JSON)
+    return [v.item() if isinstance(v, np.generic) else v for v in values]
+
+
+def metrics_for(y: pd.Series, classifier: Optional[bool] = None):
+    """
+    Acumulador vacío: conteos de confusión para un clasificador y sumas de residuos
+    si no. Sin indicar classifier (p.ej. is_classifier(estimador)) se deduce del
+    target como evaluate(): numérico → regresión.
+    """
+    if classifier is None:
+        classifier = y.dtype.kind not in "if"
+    return ConfusionCounts() if classifier else ResidualSums()
+
+
+def metrics_from_dict(state: Dict[str, Any]):
+    state = dict(state)
+    kind = state.pop("kind")
+    if kind == ResidualSums.kind:
+        return ResidualSums(**state)
+    return ConfusionCounts(state["labels"], np.asarray(state["matrix"]))
+
+
+def holdout_split(y: pd.Series, test_size: float = 0.2, max_test_rows: Optional[int] = None,
+                  random_state: int = 0, classifier: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Posiciones de entrenamiento y de validación. En clasificación el reparto es
+    estratificado (si todas las clases tienen al menos dos filas); max_test_rows
+    limita la validación a una muestra para que evaluarla sea barato.
+    classifier: como en metrics_for; sin indicarlo se deduce del tipo del target.
+    """
+    n = len(y)
+    n_test = int(round(n * test_size))
+    if max_test_rows is not None:
+        n_test = min(n_test, max_test_rows)
+    n_test = min(max(n_test, 1), n - 1)
+    if classifier is None:
+        classifier = y.dtype.kind not in "if"
+    stratify = None
+    if classifier:
+        codes = pd.factorize(y)[0]          # los nulos forman su propia clase (-1)
+        counts = np.bincount(codes + 1)
+        counts = counts[counts > 0]
+        if counts.min() >= 2 and len(counts) <= min(n_test, n - n_test):
+            stratify = codes
+    train, test = train_test_split(np.arange(n), test_size=n_test, stratify=stratify,
+                                   random_state=random_state)
+    return np.sort(train), np.sort(test)
+
+
+class ClusterStats:
+    """
+    Conteos, sumas y sumas de cuadrados por clúster, acumulables por bloques.
+    Con ellos salen los centroides y las dispersiones intra/entre clústeres, así
+    que Calinski-Harabasz no necesita distancias entre pares de puntos. Para
+    Davies-Bouldin hace falta una segunda pasada (update_distances) con la
+    distancia media de cada punto al centroide de su clúster.
+    Las sumas se guardan desplazadas por la media del primer bloque.
+    """
+    def __init__(self, n_clusters: int):
+        self.k = n_clusters
+        self.shift: Optional[np.ndarray] = None
+        self.counts = np.zeros(n_clusters, dtype=np.int64)
+        self.sums: Optional[np.ndarray] = None                  # Σ (x - shift) por clúster
+        self.sumsq = np.zeros(n_clusters)                       # Σ ||x - shift||² por clúster
+        self.dist = np.zeros(n_clusters)                        # Σ ||x - centroide|| por clúster
+
+    def update(self, X: np.ndarray, labels: np.ndarray) -> "ClusterStats":
+        if not len(X):
+            return self
+        if self.shift is None:
+            self.shift = X.mean(axis=0)
+            self.sums = np.zeros((self.k, X.shape[1]))
+        d = X - self.shift
+        onehot = np.zeros((len(X), self.k))
+        onehot[np.arange(len(X)), labels] = 1.0
+        self.counts += np.bincount(labels, minlength=self.k)
+        self.sums += onehot.T @ d
+        self.sumsq += np.bincount(labels, weights=(d * d).sum(axis=1), minlength=self.k)
+        return self
+
+    def centroids(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.shift + self.sums / self.counts[:, None]
+
+    def update_distances(self, X: np.ndarray, labels: np.ndarray) -> "ClusterStats":
+        dist = np.linalg.norm(X - self.centroids()[labels], axis=1)
+        self.dist += np.bincount(labels, weights=dist, minlength=self.k)
+        return self
+
+    def calinski_harabasz(self) -> Optional[float]:
+        used = self.counts > 0
+        n, k = int(self.counts.sum()), int(used.sum())
+        if k < 2 or n <= k:
+            return None
+        nk = self.counts[used]
+        mean_k = self.sums[used] / nk[:, None]                  # centroides (desplazados)
+        within = float((self.sumsq[used] - nk * (mean_k ** 2).sum(axis=1)).sum())
+        overall = self.sums[used].sum(axis=0) / n
+        between = float((nk * ((mean_k - overall) ** 2).sum(axis=1)).sum())
+        return between * (n - k) / (within * (k - 1)) if within > 0 else None
+
+    def davies_bouldin(self) -> Optional[float]:
+        used = np.flatnonzero(self.counts > 0)
+        if len(used) < 2:
+            return None
+        scatter = self.dist[used] / self.counts[used]
+        centers = self.centroids()[used]
+        sep = np.linalg.norm(centers[:, None, :] - centers[None, :, :], axis=2)
+        np.fill_diagonal(sep, np.inf)
+        ratio = (scatter[:, None] + scatter[None, :]) / sep
+        return float(ratio.max(axis=1).mean())
+
+
+def stratified_sample(labels: np.ndarray, sample_size: int, random_state: int = 0) -> np.ndarray:
+    """
+    Posiciones de una muestra estratificada por clúster: cada clúster aporta en
+    proporción a su tamaño y al menos dos puntos (si los tiene). La muestra tiene
+    exactamente sample_size filas, salvo que no lleguen para dos puntos por
+    clúster. Determinista con random_state.
+    """
+    rng = np.random.default_rng(random_state)
+    n = len(labels)
+    if sample_size >= n:
+        return np.arange(n)
+    clusters, counts = np.unique(labels, return_counts=True)
+    quota = _quotas(counts, sample_size)
+    picks = [rng.choice(np.flatnonzero(labels == c), size=q, replace=False)
+             for c, q in zip(clusters, quota)]
+    return np.sort(np.concatenate(picks))
+
+
+def _quotas(counts: np.ndarray, sample_size: int) -> np.ndarray:
+    # reparto proporcional por restos mayores, con un mínimo de dos puntos por clúster
+    ideal = counts * sample_size / counts.sum()
+    minimum = np.minimum(counts, 2)
+    quota = np.minimum(np.maximum(np.floor(ideal).astype(int), minimum), counts)
+    missing = sample_size - int(quota.sum())
+    if missing > 0:
+        # suma(ideal - quota) = missing con términos < 1: hay al menos missing restos positivos
+        quota[np.argsort(quota - ideal, kind="stable")[:missing]] += 1
+    while missing < 0:
+        # los mínimos de dos puntos han pasado del tamaño pedido: se quita a los más sobrados
+        room = np.flatnonzero(quota > minimum)
+        if not len(room):
+            break
+        quota[room[np.argmax((quota - ideal)[room])]] -= 1
+        missing += 1
+    return quota
+
+
+def silhouette_with_ci(X_sample: np.ndarray, labels_sample: np.ndarray,
+                       population: Dict[Any, int], confidence: float = 0.95,
+                       n_groups: int = 10, random_state: int = 0) -> Dict[str, Any]:
+    """
+    Silhouette media estimada con una muestra estratificada por clúster e intervalo
+    de confianza. La muestra se reparte en n_groups grupos disjuntos, también
+    estratificados; en cada grupo las distancias se miden solo contra el propio
+    grupo y la media se pondera por el tamaño de cada clúster en la población.
+    El estimador es la media de los grupos y el intervalo sale de su dispersión
+    (t de Student), que recoge tanto qué puntos se evalúan como contra cuáles se
+    miden. Coste O(s²/n_groups). Si la muestra es toda la población se calcula
+    la silhouette exacta y el intervalo se reduce a ese valor.
+    """
+    n = len(labels_sample)
+    if len(set(labels_sample.tolist())) < 2:
+        return {"silhouette": None, "silhouette_ci": None, "silhouette_sample": n}
+    total = sum(population.values())
+    if n >= total:
+        exact = float(silhouette_samples(X_sample, labels_sample).mean())
+        return {"silhouette": exact, "silhouette_ci": [exact, exact], "silhouette_sample": n}
+
+    # grupos estratificados: dentro de cada clúster, orden aleatorio y reparto circular
+    rng = np.random.default_rng(random_state)
+    group = np.empty(n, dtype=int)
+    for c in population:
+        pos = np.flatnonzero(labels_sample == c)
+        group[rng.permutation(pos)] = np.arange(len(pos)) % n_groups
+
+    estimates = []
+    for g in range(n_groups):
+        rows = np.flatnonzero(group == g)
+        lab = labels_sample[rows]
+        if len(set(lab.tolist())) < 2:
+            continue
+        values = silhouette_samples(X_sample[rows], lab)
+        weights = {c: size for c, size in population.items() if (lab == c).any()}
+        norm = sum(weights.values())
+        estimates.append(sum(size / norm * values[lab == c].mean() for c, size in weights.items()))
+
+    estimates = np.asarray(estimates)
+    mean = float(estimates.mean())
+    if len(estimates) < 2:
+        return {"silhouette": mean, "silhouette_ci": None, "silhouette_sample": n}
+    half = stats.t.ppf(0.5 + confidence / 2, len(estimates) - 1) * estimates.std(ddof=1) / np.sqrt(len(estimates))
+    return {
+        "silhouette":        mean,
+        "silhouette_ci":     [float(mean - half), float(mean + half)],
+        "silhouette_sample": n,
+    }
+
+
+def cluster_scores(X: np.ndarray, labels: np.ndarray, n_clusters: int, sample_size: int = 10_000,
+                   random_state: int = 0, confidence: float = 0.95,
+                   batch_size: int = 100_000) -> Dict[str, Any]:
+    """
+    Métricas de clustering sin coste cuadrático sobre todas las filas: silhouette en
+    una muestra estratificada (con intervalo de confianza) y Calinski-Harabasz y
+    Davies-Bouldin a partir de los centroides, acumulados por bloques.
+    """
+    cstats = ClusterStats(n_clusters)
+    for i in range(0, len(X), batch_size):
+        cstats.update(X[i:i + batch_size], labels[i:i + batch_size])
+    for i in range(0, len(X), batch_size):
+        cstats.update_distances(X[i:i + batch_size], labels[i:i + batch_size])
+    idx = stratified_sample(labels, sample_size, random_state)
+    clusters, counts = np.unique(labels, return_counts=True)
+    return {
+        **silhouette_with_ci(X[idx], labels[idx], dict(zip(clusters.tolist(), counts.tolist())),
+                             confidence, random_state=random_state),
+        "calinski_harabasz": cstats.calinski_harabasz(),
+        "davies_bouldin":    cstats.davies_bouldin(),
+    }
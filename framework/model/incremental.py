@@ -0,0 +1,144 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import is_classifier
+from sklearn.preprocessing import StandardScaler
+
+from ..datasource import IDataSource
+from .evaluation import ConfusionCounts, ResidualSums
+from .modelbase import IModelStrategy
+
+# (features del bloque, target del bloque o None)
+Pair = Tuple[pd.DataFrame, Optional[pd.Series]]
+
+
+class IncrementalModel(IModelStrategy):
+    """
+    Modelo entrenado por bloques con partial_fit (SGDClassifier, SGDRegressor,
+    MiniBatchKMeans...): nunca necesita la matriz de features completa en memoria.
+    fit(X, y) recorre un DataFrame en bloques de batch_size filas y fit_source()
+    consume los bloques de un IDataSource (p.ej. un CSV leído por bloques), con
+    memoria acotada por el tamaño del bloque.
+    Una primera pasada ajusta (también con partial_fit) el StandardScaler, cuyas
+    medias imputan los nulos de las features, y recoge las clases del target;
+    después se hacen n_epochs pasadas de partial_fit. En la primera, cada bloque se
+    evalúa antes de aprender de él (validación progresiva), así evaluate() sin
+    datos devuelve métricas sobre filas que el modelo no había visto; con
+    n_epochs > 1 miden el modelo a mitad de entrenamiento, no el final.
+    """
+    def __init__(self, estimator: Any, scale: bool = True, n_epochs: int = 1,
+                 batch_size: int = 50_000):
+        """
+        scale: estandarizar las features antes de partial_fit.
+        n_epochs: pasadas de partial_fit sobre los datos.
+        batch_size: filas por bloque cuando se entrena o predice sobre un DataFrame.
+        """
+        self.estimator = estimator
+        self.scale = scale
+        self.n_epochs = n_epochs
+        self.batch_size = batch_size
+        self.features_: List[str] = []
+        self.evaluation_: Dict[str, Dict[str, Any]] = {}
+        self.progress_callback: Optional[Callable[[str, int, int], None]] = None
+
+    def set_progress(self, callback: Optional[Callable[[str, int, int], None]]) -> "IncrementalModel":
+        """callback(etapa, bloques hechos, bloques de la etapa) tras cada bloque."""
+        self.progress_callback = callback
+        return self
+
+    def _report(self, stage: str, done: int, total: Optional[int]) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(stage, done, total)
+
+    # ------------------------------------------------------------------ #
+    def fit(self, X: pd.DataFrame, y: pd.Series = None):
+        self.features_ = list(X.columns)
+        pairs = lambda: ((X.iloc[i:i + self.batch_size],
+                          None if y is None else y.iloc[i:i + self.batch_size])
+                         for i in range(0, len(X), self.batch_size))
+        return self._fit_pairs(pairs)
+
+    def fit_source(self, source: IDataSource, features: List[str], target: Optional[str] = None):
+        """Entrena con los bloques de source (que se lee una vez por época, más la pasada inicial)."""
+        self.features_ = list(features)
+        pairs = lambda: ((chunk[features], chunk[target] if target else None)
+                         for chunk in source.iter_chunks())
+        return self._fit_pairs(pairs)
+
+    def _fit_pairs(self, pairs: Callable[[], Iterable[Pair]]):
+        # 1) escalado, clases y número de bloques
+        self.scaler_ = StandardScaler(with_std=self.scale)
+        classes = set()
+        n_chunks = 0
+        for Xc, yc in pairs():
+            self.scaler_.partial_fit(Xc.to_numpy(dtype="float64", na_value=np.nan))
+            if yc is not None and is_classifier(self.estimator):
+                classes.update(pd.unique(yc.dropna()).tolist())
+            n_chunks += 1
+            self._report("estadísticos", n_chunks, None)
+        self.classes_ = np.array(sorted(classes)) if classes else None
+        self.n_rows_ = int(self.scaler_.n_samples_seen_.max()) if n_chunks else 0
+
+        # 2) épocas de partial_fit; la primera con validación progresiva
+        # (en las siguientes el modelo ya ha aprendido de todos los bloques)
+        total = n_chunks * self.n_epochs
+        done = 0
+        acc = None
+        trained = False
+        for epoch in range(self.n_epochs):
+            for Xc, yc in pairs():
+                Xa, ya = self._prepare(Xc, yc)
+                if len(Xa):
+                    if epoch == 0 and trained and ya is not None:
+                        acc = self._progressive(acc, Xa, ya)
+                    self._partial_fit(Xa, ya)
+                    trained = True
+                done += 1
+                self._report(f"época {epoch + 1} de {self.n_epochs}", done, total)
+        self.evaluation_ = {"progresiva": acc.metrics()} if acc is not None else {}
+        return self
+
+    def _prepare(self, X: pd.DataFrame, y: Optional[pd.Series] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        Xa = X.to_numpy(dtype="float64", na_value=np.nan)
+        if y is not None:
+            keep = y.notna().to_numpy()
+            Xa, y = Xa[keep], y.to_numpy()[keep]
+        nan = np.isnan(Xa)
+        if nan.any():
+            Xa[nan] = np.take(self.scaler_.mean_, np.nonzero(nan)[1])
+        return self.scaler_.transform(Xa), y
+
+    def _partial_fit(self, Xa: np.ndarray, ya: Optional[np.ndarray]) -> None:
+        if self.classes_ is not None:
+            self.estimator.partial_fit(Xa, ya, classes=self.classes_)
+        else:
+            self.estimator.partial_fit(Xa, ya)
+
+    def _new_metrics(self) -> Any:
+        return ConfusionCounts() if is_classifier(self.estimator) else ResidualSums()
+
+    def _progressive(self, acc: Any, Xa: np.ndarray, ya: Optional[np.ndarray]) -> Any:
+        acc = acc if acc is not None else self._new_metrics()
+        acc.update(ya, self.estimator.predict(Xa))
+        return acc
+
+    # ------------------------------------------------------------------ #
+    def _batches(self, X: pd.DataFrame) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+        for i in range(0, len(X), self.batch_size):
+            Xc = X.iloc[i:i + self.batch_size][self.features_]
+            yield Xc, self._prepare(Xc)[0]
+
+    def predict(self, X: pd.DataFrame) -> pd.Series:
+        preds = [self.estimator.predict(Xa) for _, Xa in self._batches(X)]
+        return pd.Series(np.concatenate(preds) if preds else [], index=X.index)
+
+    def evaluate(self, X: pd.DataFrame = None, y: pd.Series = None) -> Dict[str, Any]:
+        # sin datos: validación progresiva del entrenamiento; con datos: métricas acumuladas por bloques
+        if X is None:
+            return {**self.evaluation_.get("progresiva", {}), "evaluation": self.evaluation_}
+        acc = self._new_metrics()
+        for i, (_, Xa) in enumerate(self._batches(X)):
+            yc = y.iloc[i * self.batch_size:(i + 1) * self.batch_size]
+            acc.update(yc, self.estimator.predict(Xa))
+        return acc.metrics()
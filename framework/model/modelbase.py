@@ -1,18 +1,28 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.cluster import KMeans
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.svm import SVC
+from sklearn.base import is_classifier
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.metrics import (mean_squared_error, r2_score,
-                             accuracy_score, confusion_matrix,
-                             silhouette_score)
+from sklearn.metrics import silhouette_score
+
+from .evaluation import holdout_split, metrics_for
+from .search import CachedGridSearchCV, CachedHalvingSearchCV, CachedRandomSearchCV
+
+# estrategias de búsqueda de hiperparámetros de BasePipelineModel
+SEARCH_STRATEGIES = {
+    "grid":    CachedGridSearchCV,
+    "halving": CachedHalvingSearchCV,
+    "random":  CachedRandomSearchCV,
+}
 
 
 class IModelStrategy(ABC):
@@ -44,16 +54,40 @@ class BasePipelineModel(IModelStrategy):
     Base class for sklearn pipelines. Builds a pipeline with preprocessing,
     estimator, and optional grid search.
     Si indicas un diccionario de hiperparámetros (por ejemplo {'estimator__n_estimators': [50,100]}) y use_grid_search=True, entonces el pipeline usará GridSearchCV 
-    para probar todas las combinaciones y quedará con la mejor
+    para probar todas las combinaciones y quedará con la mejor.
+    Con cache_dir, cada resultado candidato × fold se guarda en disco (CachedGridSearchCV)
+    y al reentrenar con los mismos datos solo se calculan las combinaciones nuevas.
+    search_strategy elige cómo se recorre param_grid: "grid" (todas las combinaciones),
+    "halving" (successive halving sobre el número de filas) o "random" (candidatos
+    aleatorios con presupuesto de evaluaciones/tiempo); search_options se pasa a la
+    búsqueda (factor, min_resources, n_iter, time_budget...). En todos los casos
+    evaluate() devuelve best_params.
+    Con holdout (fracción), fit() aparta una validación estratificada (como mucho
+    holdout_max_rows filas), entrena con el resto y calcula sus métricas por lotes;
+    con las búsquedas cacheadas guarda además las métricas out-of-fold del mejor
+    candidato. evaluate() sin datos devuelve esas métricas sin volver a predecir.
     """
     def __init__(self, estimator, param_grid: Dict[str, Any] = None,
                  preprocess_config: Dict[str, Any] = None,    # qué columnas numéricas / categóricas preprocesar
-                 use_grid_search: bool = False, cv: int = 5, scoring: str = None):
+                 use_grid_search: bool = False, cv: int = 5, scoring: str = None,
+                 cache_dir: Optional[str] = None, search_strategy: str = "grid",
+                 search_options: Optional[Dict[str, Any]] = None,
+                 holdout: Optional[float] = None, holdout_max_rows: Optional[int] = None,
+                 random_state: int = 0):
         self.estimator = estimator     # cualquier objeto de scikit-learn (p.ej. RandomForestRegressor)
         self.param_grid = param_grid or {}    # rango de hiperparámetros para GridSearchCV
         self.use_grid_search = use_grid_search and bool(self.param_grid)
         self.cv = cv
         self.scoring = scoring
+        self.cache_dir = cache_dir     # caché en disco de la validación cruzada
+        if search_strategy not in SEARCH_STRATEGIES:
+            raise ValueError(f"search_strategy debe ser uno de {list(SEARCH_STRATEGIES)}")
+        self.search_strategy = search_strategy
+        self.search_options = search_options or {}
+        self.holdout = holdout                     # fracción de filas reservada para evaluar
+        self.holdout_max_rows = holdout_max_rows
+        self.random_state = random_state
+        self.evaluation_: Dict[str, Dict[str, Any]] = {}
 
         # Build preprocessing transformer if config given
         if preprocess_config:
@@ -77,39 +111,85 @@ class BasePipelineModel(IModelStrategy):
         steps.append(("estimator", self.estimator))
         pipeline = Pipeline(steps)
 
+        if self.use_grid_search and (self.cache_dir or self.search_strategy != "grid"):
+            search = SEARCH_STRATEGIES[self.search_strategy]
+            return search(pipeline, self.param_grid,
+                          cv=self.cv, scoring=self.scoring,
+                          n_jobs=-1, cache_dir=self.cache_dir, **self.search_options)
         if self.use_grid_search:
             return GridSearchCV(pipeline, self.param_grid,
                                 cv=self.cv, scoring=self.scoring,
                                 n_jobs=-1)
         return pipeline
 
+    def set_search(self, search_strategy: str, **search_options: Any) -> "BasePipelineModel":
+        """Cambia la estrategia de búsqueda; el modelo queda sin entrenar."""
+        if search_strategy not in SEARCH_STRATEGIES:
+            raise ValueError(f"search_strategy debe ser uno de {list(SEARCH_STRATEGIES)}")
+        self.search_strategy = search_strategy
+        self.search_options = search_options
+        self.pipeline = self._build_pipeline()
+        return self
+
     def fit(self, X: pd.DataFrame, y: pd.Series = None):  #Cualquier modelo de scikit-learn: p.ej. RandomForestRegressor(), SVC(), LogisticRegression(), etc
         #Entrena todo el pipeline. Si hay GridSearchCV, buscará la mejor combinación de parámetros.
-        self.pipeline.fit(X, y)
+        self.evaluation_ = {}
+        if self.holdout and y is not None:
+            train, test = holdout_split(y, self.holdout, self.holdout_max_rows, self.random_state,
+                                        classifier=is_classifier(self.estimator))
+            self.pipeline.fit(X.iloc[train], y.iloc[train])
+            self.evaluation_["holdout"] = self._score_batches(X.iloc[test], y.iloc[test])
+        else:
+            self.pipeline.fit(X, y)
+        oof = getattr(self.pipeline, "oof_metrics_", None)
+        if oof is not None:
+            self.evaluation_["cv"] = oof.metrics()
         return self
 
+    def _score_batches(self, X: pd.DataFrame, y: pd.Series, batch_size: int = 50_000) -> Dict[str, Any]:
+        # métricas acumuladas lote a lote: no se guardan todas las predicciones a la vez
+        acc = metrics_for(y, is_classifier(self.estimator))
+        for start in range(0, len(X), batch_size):
+            rows = slice(start, start + batch_size)
+            acc.update(y.iloc[rows], self.pipeline.predict(X.iloc[rows]))
+        return acc.metrics()
+
     def predict(self, X: pd.DataFrame) -> pd.Series:
         #Aplica transformaciones y produce una serie de predicciones alineada con el índice de X
         preds = self.pipeline.predict(X)
         return pd.Series(preds, index=X.index)
 
-    def evaluate(self, X: pd.DataFrame, y: pd.Series = None) -> Dict[str, Any]:
-        # detecta si la variable y es numérica (regresión) o no (clasificación) y devuelve las métricas adecuadas, junto a los best_params_ si hubo grid search.
-        y_pred = self.predict(X)
+    def fitted_pipeline(self) -> Pipeline:
+        # con búsqueda de hiperparámetros, el pipeline ganador reentrenado; si no, el propio pipeline
+        return getattr(self.pipeline, "best_estimator_", self.pipeline)
+
+    def transform(self, X: pd.DataFrame) -> Optional[Any]:
+        """Matriz de features ya preprocesada (escalado, one-hot); None si el modelo no preprocesa."""
+        pipe = self.fitted_pipeline()
+        if "preproc" not in pipe.named_steps:
+            return None
+        return pipe.named_steps["preproc"].transform(X)
+
+    def predict_transformed(self, Xt: Any) -> np.ndarray:
+        """Predicciones sobre filas de transform(X), sin repetir el preprocesado."""
+        return self.fitted_pipeline().named_steps["estimator"].predict(Xt)
+
+    def evaluate(self, X: pd.DataFrame = None, y: pd.Series = None) -> Dict[str, Any]:
+        # métricas de clasificación o de regresión según el estimador (como las guardadas en fit), junto a los best_params_ si hubo grid search.
         results = {}
         if hasattr(self.pipeline, 'best_params_'):
             results['best_params'] = self.pipeline.best_params_
 
-        # Regression metrics
-        if y is not None and y.dtype.kind in 'if':
-            results['mse'] = mean_squared_error(y, y_pred)
-            results['r2'] = r2_score(y, y_pred)
-
-        # Classification metrics
-        if y is not None and y.dtype.kind not in 'if':
-            results['accuracy'] = accuracy_score(y, y_pred)
-            results['confusion_matrix'] = confusion_matrix(y, y_pred).tolist()
+        # Sin datos: métricas guardadas en fit (validación apartada y, si no hay, out-of-fold)
+        if X is None:
+            evaluation = getattr(self, "evaluation_", {})   # modelos guardados antes de existir
+            results.update(evaluation.get("holdout") or evaluation.get("cv") or {})
+            results['evaluation'] = evaluation
+            return results
 
+        # por lotes y con los mismos acumuladores que la validación apartada
+        if y is not None:
+            results.update(self._score_batches(X, y))
         return results
 
 
@@ -1,5 +1,6 @@
-from sklearn.linear_model import LinearRegression
+from sklearn.linear_model import LinearRegression, SGDRegressor
 from sklearn.metrics import mean_squared_error, r2_score
+from .incremental import IncrementalModel
 from .modelbase import IModelStrategy
 import pandas as pd
 
@@ -20,3 +21,10 @@ class LinearRegressionModel(IModelStrategy):
             "mse": mean_squared_error(y, y_pred),
             "r2": r2_score(y, y_pred)
         }
+
+
+class SGDRegressionModel(IncrementalModel):
+    """Regresión lineal entrenada por bloques con SGD, para datasets que no caben en memoria."""
+    def __init__(self, scale: bool = True, n_epochs: int = 1, batch_size: int = 50_000, **kw):
+        kw.setdefault("random_state", 0)
+        super().__init__(SGDRegressor(**kw), scale=scale, n_epochs=n_epochs, batch_size=batch_size)
@@ -0,0 +1,421 @@
+import hashlib
+import json
+import os
+import time
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import BaseEstimator, clone, is_classifier, is_regressor
+from sklearn.exceptions import FitFailedWarning
+from sklearn.metrics import accuracy_score, check_scoring, r2_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+
+from .evaluation import ConfusionCounts, ResidualSums, metrics_for, metrics_from_dict
+
+
+def data_fingerprint(X: pd.DataFrame, y: Optional[pd.Series] = None) -> str:
+    """Huella del contenido de X (columnas, índice y valores) y de y."""
+    h = hashlib.sha1()
+    h.update(json.dumps([str(c) for c in X.columns]).encode())
+    h.update(pd.util.hash_pandas_object(X, index=True).to_numpy().tobytes())
+    if y is not None:
+        h.update(str(y.name).encode())
+        h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def estimator_config(estimator: BaseEstimator) -> Dict[str, str]:
+    """Parámetros (anidados) de un estimador en texto, para usarlos en una clave de caché."""
+    config = {}
+    for k, v in estimator.get_params(deep=True).items():
+        # los sub-estimadores aparecen por nombre: sus parámetros ya están en la lista
+        config[k] = type(v).__name__ if hasattr(v, "get_params") else repr(v)
+    return config
+
+
+class CVCellCache:
+    """
+    Resultados de validación cruzada en disco, uno por celda (candidato × fold),
+    cada uno en un JSON pequeño escrito de forma atómica. La clave incluye la
+    huella de los datos, la configuración del estimador, el CV, el scoring, los
+    parámetros del candidato y el fold, así que una celda solo se reutiliza si
+    volvería a dar el mismo resultado.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        payload = json.dumps(parts, sort_keys=True, default=repr)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, float]]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Dict[str, float]) -> None:
+        tmp = self._path(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp, self._path(key))
+
+    def clear(self) -> None:
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+def _score_predictions(scorer: Any, estimator: BaseEstimator, y_true: pd.Series,
+                       y_pred: np.ndarray) -> Optional[float]:
+    """
+    Puntuación de scorer a partir de predicciones ya calculadas; None si el
+    scorer necesita otra salida del estimador (predict_proba, decision_function...).
+    """
+    if getattr(scorer, "_response_method", None) == "predict" and hasattr(scorer, "_score_func"):
+        return scorer._sign * scorer._score_func(y_true, y_pred, **scorer._kwargs)
+    if type(scorer).__name__ == "_PassthroughScorer":   # scoring=None: estimator.score
+        if is_classifier(estimator):
+            return accuracy_score(y_true, y_pred)
+        if is_regressor(estimator):
+            return r2_score(y_true, y_pred)
+    return None
+
+
+def _fit_and_score(estimator: BaseEstimator, X: pd.DataFrame, y: Optional[pd.Series],
+                   train: np.ndarray, test: np.ndarray, params: Dict[str, Any],
+                   scorer: Any, error_score: Any = np.nan) -> Dict[str, Any]:
+    # si el ajuste o la puntuación fallan, la celda vale error_score y lleva
+    # "failed" ("fit" o "score") y el error; con error_score="raise" se propaga
+    est = clone(estimator).set_params(**params)
+    t0 = time.perf_counter()
+    try:
+        est.fit(X.iloc[train], None if y is None else y.iloc[train])
+    except Exception as e:
+        if error_score == "raise":
+            raise
+        return {"score": error_score, "fit_time": time.perf_counter() - t0, "score_time": 0.0,
+                "failed": "fit", "error": f"{type(e).__name__}: {e}"}
+    t1 = time.perf_counter()
+    try:
+        if y is None:
+            score, oof = scorer(est, X.iloc[test], None), None
+        else:
+            # una sola predicción del fold para el score y para los conteos / sumas de
+            # residuos (las métricas out-of-fold salen después de la caché)
+            y_test = y.iloc[test]
+            y_pred = est.predict(X.iloc[test])
+            score = _score_predictions(scorer, est, y_test, y_pred)
+            if score is None:
+                score = scorer(est, X.iloc[test], y_test)
+            oof = metrics_for(y, is_classifier(est)).update(y_test, y_pred).to_dict()
+    except Exception as e:
+        if error_score == "raise":
+            raise
+        return {"score": error_score, "fit_time": t1 - t0, "score_time": time.perf_counter() - t1,
+                "failed": "score", "error": f"{type(e).__name__}: {e}"}
+    result = {"score": float(score), "fit_time": t1 - t0, "score_time": time.perf_counter() - t1}
+    if oof is not None:
+        result["oof"] = oof
+    return result
+
+
+def _rank(mean: np.ndarray) -> np.ndarray:
+    # como GridSearchCV: los candidatos con score nan quedan los últimos y los empates
+    # comparten el puesto más alto
+    if np.isnan(mean).all():
+        return np.ones(len(mean), dtype=np.int32)
+    mean = np.nan_to_num(mean, nan=np.nanmin(mean) - 1)
+    return rankdata(-mean, method="min").astype(np.int32)
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=repr)
+
+
+class CachedGridSearchCV(BaseEstimator):
+    """
+    Búsqueda exhaustiva como GridSearchCV (mismos folds, scoring y best_params_),
+    pero cada celda candidato × fold se guarda en un CVCellCache: al reentrenar
+    con los mismos datos solo se calculan las combinaciones nuevas. Las celdas
+    pendientes se reparten en paralelo con joblib.
+    set_progress() permite seguir la búsqueda celda a celda (y cancelarla lanzando
+    una excepción desde el callback).
+    Cada celda guarda también los conteos de confusión / sumas de residuos de su
+    fold; tras fit, oof_metrics_ combina los folds del mejor candidato (métricas
+    out-of-fold sin volver a predecir).
+    Como en GridSearchCV, una celda cuyo ajuste o puntuación falla vale error_score
+    (nan por defecto, con un aviso; "raise" propaga el error) y no se guarda en la caché.
+    """
+    def __init__(self, estimator: BaseEstimator, param_grid: Dict[str, List[Any]],
+                 cv: Any = 5, scoring: Optional[str] = None, n_jobs: Optional[int] = -1,
+                 cache_dir: Optional[str] = None, refit: bool = True, error_score: Any = np.nan):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
+        self.refit = refit
+        self.error_score = error_score
+
+    def fit(self, X: pd.DataFrame, y: Optional[pd.Series] = None, data_key: Optional[str] = None):
+        """data_key: identificador de los datos; por defecto, la huella de su contenido."""
+        self._start(X, y, data_key)
+        candidates = list(ParameterGrid(self.param_grid))
+        scores, fit_times = self._evaluate(candidates, X, y, stage="validación cruzada")
+        self._set_results(candidates, scores, fit_times)
+        return self._refit(X, y)
+
+    def set_progress(self, callback: Optional[Callable[[str, int, int], None]]) -> "CachedGridSearchCV":
+        """callback(etapa, celdas hechas, celdas de la etapa) tras cada celda candidato × fold."""
+        self.progress_callback = callback
+        return self
+
+    def _report(self, stage: str, done: int, total: int) -> None:
+        callback = getattr(self, "progress_callback", None)
+        if callback is not None:
+            callback(stage, done, total)
+
+    # --- piezas comunes a las estrategias de búsqueda ---
+    def _start(self, X: pd.DataFrame, y: Optional[pd.Series], data_key: Optional[str]) -> None:
+        self._cache = CVCellCache(self.cache_dir) if self.cache_dir else None
+        self._scorer = check_scoring(self.estimator, scoring=self.scoring)
+        self._base = {
+            "data":      data_key or data_fingerprint(X, y),
+            "estimator": estimator_config(self.estimator),
+            "scoring":   repr(self.scoring),
+        }
+        self.n_cells_cached_ = 0
+        self.n_cells_computed_ = 0
+        self._oof: Dict[str, Any] = {}
+
+    def _evaluate(self, candidates: List[Dict[str, Any]], X: pd.DataFrame, y: Optional[pd.Series],
+                  stage: str = "validación cruzada", **key_parts: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Puntuación de validación cruzada de cada candidato sobre (X, y): matrices
+        candidatos × folds de scores y tiempos de ajuste. key_parts distingue
+        evaluaciones sobre subconjuntos de filas de los mismos datos.
+        """
+        cv = check_cv(self.cv, y, classifier=is_classifier(self.estimator))
+        folds = list(cv.split(X, y))
+        base = {**self._base, **key_parts, "cv": repr(cv)}
+
+        # celdas guardadas con otro tipo de métricas out-of-fold (p.ej. un target
+        # entero de clasificación tratado como regresión) se recalculan
+        kind = None if y is None else \
+            (ConfusionCounts.kind if is_classifier(self.estimator) else ResidualSums.kind)
+        results: Dict[tuple, Dict[str, float]] = {}
+        keys: Dict[tuple, str] = {}
+        for ci, params in enumerate(candidates):
+            for fi in range(len(folds)):
+                keys[ci, fi] = CVCellCache.key(**base, params=params, fold=fi)
+                cached = self._cache.get(keys[ci, fi]) if self._cache is not None else None
+                if cached is not None and cached.get("oof", {}).get("kind", kind) == kind:
+                    results[ci, fi] = cached
+
+        todo = [cell for cell in keys if cell not in results]
+        done = len(keys) - len(todo)
+        self._report(stage, done, len(keys))
+        # en modo generador los resultados llegan según terminan (en orden), así se informa del avance
+        computed = Parallel(n_jobs=self.n_jobs, return_as="generator")(
+            delayed(_fit_and_score)(self.estimator, X, y, folds[fi][0], folds[fi][1],
+                                    candidates[ci], self._scorer, self.error_score)
+            for ci, fi in todo
+        )
+        failed: Dict[str, List[str]] = {"fit": [], "score": []}
+        for cell, res in zip(todo, computed):
+            results[cell] = res
+            if "failed" in res:
+                failed[res["failed"]].append(res["error"])
+            elif self._cache is not None:
+                self._cache.put(keys[cell], res)
+            done += 1
+            self._report(stage, done, len(keys))
+        self.n_cells_cached_ += len(keys) - len(todo)
+        self.n_cells_computed_ += len(todo)
+        self._warn_failures(failed, len(keys))
+
+        # estadísticos out-of-fold por candidato (la última evaluación de cada uno manda)
+        for ci, params in enumerate(candidates):
+            states = [results[ci, fi].get("oof") for fi in range(len(folds))]
+            if all(states):   # celdas de cachés antiguas no los traen
+                merged = metrics_from_dict(states[0])
+                for state in states[1:]:
+                    merged.merge(metrics_from_dict(state))
+                self._oof[_params_key(params)] = merged
+            else:
+                self._oof.pop(_params_key(params), None)
+
+        shape = (len(candidates), len(folds))
+        scores = np.array([results[cell]["score"] for cell in keys]).reshape(shape)
+        fit_times = np.array([results[cell]["fit_time"] for cell in keys]).reshape(shape)
+        return scores, fit_times
+
+    @staticmethod
+    def _warn_failures(failed: Dict[str, List[str]], total: int) -> None:
+        if failed["fit"] and len(failed["fit"]) == total:
+            raise ValueError(f"Fallaron los {total} ajustes de la validación cruzada. "
+                             f"Primer error: {failed['fit'][0]}")
+        for what, errors in failed.items():
+            if errors:
+                counts = pd.Series(errors).value_counts()
+                detail = "\n".join(f"{n} celdas: {msg}" for msg, n in counts.items())
+                warnings.warn(f"Falló {'el ajuste' if what == 'fit' else 'la puntuación'} de "
+                              f"{len(errors)} de {total} celdas; su score es error_score.\n{detail}",
+                              FitFailedWarning if what == "fit" else UserWarning)
+
+    def _set_results(self, candidates: List[Dict[str, Any]], scores: np.ndarray,
+                     fit_times: np.ndarray, best_among: Optional[np.ndarray] = None,
+                     **extra: Any) -> None:
+        """
+        Rellena cv_results_, best_index_, best_params_ y best_score_ como GridSearchCV.
+        best_among: filas entre las que elegir el mejor (por defecto, todas).
+        """
+        mean = scores.mean(axis=1)
+        ranking = np.where(np.isnan(mean), -np.inf, mean)
+        self.cv_results_ = {
+            "params":          candidates,
+            "mean_test_score": mean,
+            "std_test_score":  scores.std(axis=1),
+            "rank_test_score": _rank(mean),
+            "mean_fit_time":   fit_times.mean(axis=1),
+            **{f"split{fi}_test_score": scores[:, fi] for fi in range(scores.shape[1])},
+            **extra,
+        }
+        rows = np.arange(len(candidates)) if best_among is None else best_among
+        self.best_index_ = int(rows[np.argmax(ranking[rows])])
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = float(mean[self.best_index_])
+        self.oof_metrics_ = self._oof.get(_params_key(self.best_params_))
+
+    def _refit(self, X: pd.DataFrame, y: Optional[pd.Series]):
+        if self.refit:
+            self._report("ajuste final", 0, 1)
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+    def predict(self, X: pd.DataFrame):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X: pd.DataFrame):
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X: pd.DataFrame, y: Optional[pd.Series] = None) -> float:
+        return check_scoring(self.best_estimator_, scoring=self.scoring)(self.best_estimator_, X, y)
+
+
+class CachedHalvingSearchCV(CachedGridSearchCV):
+    """
+    Successive halving sobre el número de filas: todos los candidatos se evalúan
+    con pocas filas (min_resources), se queda el mejor 1/factor y se multiplica
+    por factor el número de filas, hasta que queda un candidato o se usan todas.
+    Así el coste de la búsqueda crece mucho menos que el tamaño del dataset; solo
+    el ajuste final con los mejores parámetros usa todas las filas.
+    Las filas de cada ronda son un prefijo de una permutación fija (random_state).
+    """
+    def __init__(self, estimator: BaseEstimator, param_grid: Dict[str, List[Any]],
+                 cv: Any = 5, scoring: Optional[str] = None, n_jobs: Optional[int] = -1,
+                 cache_dir: Optional[str] = None, refit: bool = True,
+                 error_score: Any = np.nan,
+                 factor: int = 3, min_resources: int = 2_000, max_resources: Optional[int] = None,
+                 random_state: int = 0):
+        """
+        factor: proporción de candidatos descartados y de crecimiento de filas por ronda.
+        min_resources / max_resources: filas de la primera y (como mucho) de la última ronda.
+        """
+        super().__init__(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                         cache_dir=cache_dir, refit=refit, error_score=error_score)
+        self.factor = factor
+        self.min_resources = min_resources
+        self.max_resources = max_resources
+        self.random_state = random_state
+
+    def fit(self, X: pd.DataFrame, y: Optional[pd.Series] = None, data_key: Optional[str] = None):
+        self._start(X, y, data_key)
+        n = len(X)
+        max_r = min(n, self.max_resources or n)
+        order = np.random.default_rng(self.random_state).permutation(n)
+
+        alive = list(ParameterGrid(self.param_grid))
+        r = min(self.min_resources, max_r)
+        rows: List[Dict[str, Any]] = []
+        all_scores, all_times, iters, resources = [], [], [], []
+        it = 0
+        while True:
+            idx = np.sort(order[:r])
+            Xs = X.iloc[idx]
+            ys = None if y is None else y.iloc[idx]
+            scores, fit_times = self._evaluate(alive, Xs, ys, n_resources=r, seed=self.random_state,
+                                               stage=f"ronda {it + 1}: {len(alive)} candidatos, {r} filas")
+            rows.extend(alive)
+            all_scores.append(scores)
+            all_times.append(fit_times)
+            iters += [it] * len(alive)
+            resources += [r] * len(alive)
+
+            if len(alive) == 1 or r >= max_r:
+                break
+            keep = max(1, int(np.ceil(len(alive) / self.factor)))
+            mean = scores.mean(axis=1)
+            best = np.argsort(-np.where(np.isnan(mean), -np.inf, mean), kind="stable")[:keep]
+            alive = [alive[i] for i in best]
+            r = min(r * self.factor, max_r)
+            it += 1
+
+        last = np.flatnonzero(np.array(iters) == it)
+        self.n_iterations_ = it + 1
+        self._set_results(rows, np.vstack(all_scores), np.vstack(all_times), best_among=last,
+                          iter=np.array(iters), n_resources=np.array(resources))
+        return self._refit(X, y)
+
+
+class CachedRandomSearchCV(CachedGridSearchCV):
+    """
+    Búsqueda aleatoria con presupuesto: se prueban candidatos de param_grid
+    (listas o distribuciones de scipy) en orden aleatorio hasta agotar n_iter
+    evaluaciones o time_budget segundos, lo que llegue antes. Siempre se
+    evalúa al menos un candidato.
+    """
+    def __init__(self, estimator: BaseEstimator, param_grid: Dict[str, Any],
+                 cv: Any = 5, scoring: Optional[str] = None, n_jobs: Optional[int] = -1,
+                 cache_dir: Optional[str] = None, refit: bool = True,
+                 error_score: Any = np.nan,
+                 n_iter: int = 10, time_budget: Optional[float] = None, random_state: int = 0):
+        """
+        n_iter: número máximo de candidatos evaluados.
+        time_budget: segundos máximos de búsqueda (sin contar el ajuste final).
+        """
+        super().__init__(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                         cache_dir=cache_dir, refit=refit, error_score=error_score)
+        self.n_iter = n_iter
+        self.time_budget = time_budget
+        self.random_state = random_state
+
+    def fit(self, X: pd.DataFrame, y: Optional[pd.Series] = None, data_key: Optional[str] = None):
+        self._start(X, y, data_key)
+        t0 = time.perf_counter()
+        candidates: List[Dict[str, Any]] = []
+        all_scores, all_times = [], []
+        sampler = ParameterSampler(self.param_grid, self.n_iter, random_state=self.random_state)
+        for i, params in enumerate(sampler):
+            scores, fit_times = self._evaluate([params], X, y,
+                                               stage=f"candidato {i + 1} de {len(sampler)}")
+            candidates.append(params)
+            all_scores.append(scores)
+            all_times.append(fit_times)
+            if self.time_budget is not None and time.perf_counter() - t0 >= self.time_budget:
+                break
+        self.n_candidates_ = len(candidates)
+        self._set_results(candidates, np.vstack(all_scores), np.vstack(all_times))
+        return self._refit(X, y)
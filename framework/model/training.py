@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional, Tuple
+
+import pandas as pd
+
+from ..jobs import Job, JobCancelled, process_context
+
+
+class TrainingCancelled(Exception):
+    """El entrenamiento se canceló desde el proceso principal."""
+
+
+def _fit_in_worker(model: Any, X: Optional[pd.DataFrame], y: Optional[pd.Series],
+                   events: Any, cancel: Any, source: Optional[tuple] = None) -> Tuple[Any, float]:
+    # se ejecuta en un proceso del pool: informa del avance por events y
+    # comprueba cancel en cada celda de la búsqueda (o bloque, en los incrementales)
+    def progress(stage: str, done: int, total: int) -> None:
+        if cancel.is_set():
+            raise TrainingCancelled()
+        events.put((stage, done, total))
+
+    search = model if hasattr(model, "set_progress") else getattr(model, "pipeline", None)
+    if hasattr(search, "set_progress"):
+        search.set_progress(progress)
+    events.put(("ajuste", 0, None))
+    t0 = time.perf_counter()
+    try:
+        if source is not None:
+            model.fit_source(*source)   # (IDataSource, features, target): bloques leídos en el worker
+        else:
+            model.fit(X, y)
+    finally:
+        if hasattr(search, "set_progress"):
+            search.set_progress(None)   # el callback no se puede serializar de vuelta
+    return model, time.perf_counter() - t0
+
+
+class TrainingPool:
+    """
+    Entrena modelos en un pool de procesos: un ajuste largo (SVC, grid search...)
+    no ocupa el intérprete del servidor y cada entrenamiento trabaja sobre su
+    propia copia del modelo, que vuelve ya ajustada. El avance (etapa y celdas
+    candidato × fold) llega por una cola y se vuelca en el Job; cancelar el Job
+    detiene el ajuste en la siguiente celda. Si el modelo no tiene puntos de
+    control (set_progress) o no llega a uno en cancel_grace segundos, se terminan
+    los procesos del pool: un ajuste cancelado nunca sigue ocupando un worker.
+    """
+    def __init__(self, max_workers: int = 1, mp_context: Any = None, poll: float = 0.5,
+                 cancel_grace: float = 5.0):
+        """
+        max_workers: entrenamientos simultáneos (cada uno puede usar varios núcleos).
+        mp_context: contexto de multiprocessing; por defecto process_context() (sin fork).
+        poll: segundos entre comprobaciones de progreso y cancelación.
+        cancel_grace: segundos que se espera al siguiente punto de control tras cancelar.
+        """
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self.poll = poll
+        self.cancel_grace = cancel_grace
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager: Any = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> Tuple[ProcessPoolExecutor, Any]:
+        with self._lock:
+            if self._pool is None:
+                ctx = self.mp_context or process_context()
+                if self._manager is None:
+                    self._manager = ctx.Manager()
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+            return self._pool, self._manager
+
+    def run(self, job: Job, model: Any, X: Optional[pd.DataFrame],
+            y: Optional[pd.Series] = None, source: Optional[tuple] = None) -> Tuple[Any, float]:
+        """
+        Ajusta model en el pool informando a job; devuelve (modelo ajustado, segundos de ajuste).
+        source: (IDataSource, features, target) para modelos incrementales que leen por
+            bloques (model.fit_source); en ese caso X e y no se usan.
+        """
+        try:
+            return self._run(job, model, X, y, source)
+        except BrokenProcessPool:
+            # un proceso murió a mitad de ajuste (memoria, señal...) o se terminó
+            # el pool al cancelar otro entrenamiento: pool nuevo y un reintento
+            return self._run(job, model, X, y, source)
+
+    def _run(self, job: Job, model: Any, X: Optional[pd.DataFrame],
+             y: Optional[pd.Series], source: Optional[tuple]) -> Tuple[Any, float]:
+        pool, manager = self._get()
+        events, cancel = manager.Queue(), manager.Event()
+        try:
+            future = pool.submit(_fit_in_worker, model, X, y, events, cancel, source)
+        except BrokenProcessPool:
+            self._reset(pool)
+            raise
+        try:
+            while True:
+                try:
+                    stage, done, total = events.get(timeout=self.poll)
+                    job.report(stage=stage, steps=done, steps_total=total)
+                except queue.Empty:
+                    job.report()          # punto de control: lanza JobCancelled si procede
+                if future.done() and events.empty():
+                    break
+        except JobCancelled:
+            cancel.set()
+            if not future.cancel():
+                # ya en curso: hasta que el worker quede libre el trabajo está "cancelando"
+                job.status = "cancelando"
+                wait([future], timeout=self.cancel_grace)
+                if not future.done():
+                    self._terminate(pool)
+            raise
+        try:
+            return future.result()
+        except TrainingCancelled:
+            raise JobCancelled(job.id)
+        except BrokenProcessPool:
+            self._reset(pool)
+            raise
+
+    def _terminate(self, pool: ProcessPoolExecutor) -> None:
+        # ProcessPoolExecutor no puede interrumpir una tarea en curso: se matan sus procesos
+        for proc in list((pool._processes or {}).values()):
+            proc.terminate()
+        self._reset(pool)
+
+    def _reset(self, pool: Optional[ProcessPoolExecutor] = None) -> None:
+        # pool: el que falló; si otro hilo ya lo sustituyó, no se toca el nuevo
+        with self._lock:
+            if self._pool is not None and (pool is None or self._pool is pool):
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._manager.shutdown()
+            self._pool = self._manager = None
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import joblib
+
+
+class ModelVersion:
+    """
+    Modelo ya entrenado e inmutable, con los datos de su entrenamiento
+    (features, target, dataset y versión, tiempo de ajuste, métricas...).
+    Reentrenar crea otra versión: las predicciones en curso no ven cambios.
+    Las versiones guardadas en disco se cargan la primera vez que se usa model,
+    con los arrays grandes (árboles, vectores soporte...) mapeados en memoria.
+    """
+    def __init__(self, name: str, version: int, model: Any = None,
+                 meta: Optional[Dict[str, Any]] = None, path: Optional[str] = None):
+        self.name = name
+        self.version = version
+        self.meta = dict(meta or {})
+        self.meta.setdefault("trained_at", time.time())
+        self.path = path               # fichero joblib del modelo, si está persistido
+        self._model = model
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # mmap_mode="r": los arrays se leen del fichero bajo demanda y se comparten
+                    # entre procesos; el modelo se usa solo para predecir, no se modifica
+                    self._model = joblib.load(self.path, mmap_mode="r")
+        return self._model
+
+    def unload(self) -> None:
+        """Suelta el modelo de memoria si está guardado en disco; se recarga al usarlo."""
+        if self.path is not None:
+            with self._lock:
+                self._model = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def features(self) -> List[str]:
+        return self.meta.get("features", [])
+
+    def describe(self) -> Dict[str, Any]:
+        return {"name": self.name, "version": self.version, **self.meta,
+                "persisted": self.path is not None, "loaded": self.loaded}
+
+
+class ModelRegistry:
+    """
+    Versiones entrenadas de cada modelo, numeradas desde 1 por nombre.
+    Con store_dir cada versión se guarda en store_dir/<nombre>/v<N>.joblib junto a
+    sus metadatos (v<N>.json) y al arrancar se registran las versiones guardadas
+    sin cargarlas: tras reiniciar el servidor se puede predecir sin reentrenar.
+    """
+    _FILE = re.compile(r"^v(\d+)\.json$")
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = store_dir
+        self._versions: Dict[str, Dict[int, ModelVersion]] = {}
+        self._last: Dict[str, int] = {}    # último número asignado por nombre, aunque falle al guardar
+        self._lock = threading.Lock()
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+            self._scan()
+
+    # ------------------------------------------------------------------ #
+    def _paths(self, name: str, version: int):
+        base = os.path.join(self.store_dir, name, f"v{version}")
+        return base + ".joblib", base + ".json"
+
+    def _scan(self) -> None:
+        for name in sorted(os.listdir(self.store_dir)):
+            folder = os.path.join(self.store_dir, name)
+            if not os.path.isdir(folder):
+                continue
+            for fname in os.listdir(folder):
+                match = self._FILE.match(fname)
+                if not match:
+                    continue
+                version = int(match.group(1))
+                model_path, meta_path = self._paths(name, version)
+                if not os.path.exists(model_path):
+                    continue
+                try:
+                    with open(meta_path, encoding="utf-8") as fh:
+                        meta = json.load(fh)
+                except (OSError, ValueError):
+                    continue   # metadatos ilegibles: la versión se ignora
+                self._versions.setdefault(name, {})[version] = \
+                    ModelVersion(name, version, meta=meta, path=model_path)
+
+    def _write_meta(self, mv: ModelVersion) -> None:
+        _, meta_path = self._paths(mv.name, mv.version)
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(mv.meta, fh, ensure_ascii=False, default=str)
+        os.replace(tmp, meta_path)
+
+    def _persist(self, mv: ModelVersion) -> None:
+        model_path, _ = self._paths(mv.name, mv.version)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        tmp = model_path + ".tmp"
+        try:
+            joblib.dump(mv.model, tmp)      # sin compresión: permite mmap_mode al cargar
+            os.replace(tmp, model_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._write_meta(mv)                # los metadatos van al final: marcan la versión como completa
+        mv.path = model_path
+
+    # ------------------------------------------------------------------ #
+    def add(self, name: str, model: Any, **meta: Any) -> ModelVersion:
+        """
+        Registra model como versión nueva de name. Con store_dir la versión se guarda
+        antes de registrarla (si falla, no queda una versión a medias) y el modelo
+        se suelta de memoria: se recarga con mmap la primera vez que se use.
+        """
+        with self._lock:
+            version = max(self._last.get(name, 0), max(self._versions.get(name, {}), default=0)) + 1
+            self._last[name] = version
+        mv = ModelVersion(name, version, model, meta)
+        if self.store_dir:
+            self._persist(mv)
+            mv.unload()
+        with self._lock:
+            self._versions.setdefault(name, {})[version] = mv
+        return mv
+
+    def update_meta(self, name: str, version: int, **meta: Any) -> ModelVersion:
+        """Añade metadatos (p.ej. métricas de una evaluación) a una versión ya registrada."""
+        mv = self.get(name, version)
+        with self._lock:
+            mv.meta.update(meta)
+            if mv.path is not None:
+                self._write_meta(mv)
+        return mv
+
+    def get(self, name: str, version: Optional[int] = None) -> ModelVersion:
+        """Versión pedida o, sin version, la última. KeyError si no existe."""
+        with self._lock:
+            versions = self._versions.get(name)
+            if not versions:
+                raise KeyError(f"Modelo '{name}' no entrenado")
+            if version is None:
+                return versions[max(versions)]
+            if version not in versions:
+                raise KeyError(f"Modelo '{name}' no tiene versión {version}")
+            return versions[version]
+
+    def versions(self, name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [mv.describe() for _, mv in sorted(self._versions.get(name, {}).items())]
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._versions)
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
 import pandas as pd
-from typing import Any, Dict, List, Tuple
-import io
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import weakref
+
+from .profile import DatasetProfile
 
 class IProcessor(ABC):
     @abstractmethod
@@ -38,6 +41,41 @@ class IProcessor(ABC):
 
 
 class DataProcessor(IProcessor):
+    """
+    Las consultas de metadatos se responden desde un DatasetProfile calculado una
+    sola vez por DataFrame (caché por id con weakref: si el df se libera, su perfil
+    también). Si el df se modifica en sitio hay que llamar a invalidate().
+    """
+    def __init__(self, **profile_kwargs: Any):
+        """profile_kwargs: parámetros de DatasetProfile (top_n, n_uniques, ...)."""
+        self.profile_kwargs = profile_kwargs
+        self._profiles: Dict[int, Tuple[weakref.ref, DatasetProfile]] = {}
+        self._lock = threading.Lock()
+
+    def profile(self, df: pd.DataFrame) -> DatasetProfile:
+        key = id(df)
+        with self._lock:
+            entry = self._profiles.get(key)
+            if entry is not None and entry[0]() is df:
+                return entry[1]
+            prof = DatasetProfile(df, **self.profile_kwargs)
+            self._profiles[key] = (weakref.ref(df, lambda ref, k=key: self._drop(k, ref)), prof)
+            return prof
+
+    def _drop(self, key: int, ref: weakref.ref) -> None:
+        # el df se ha liberado: su id puede reutilizarse, así que quitamos solo su entrada
+        entry = self._profiles.get(key)
+        if entry is not None and entry[0] is ref:
+            self._profiles.pop(key, None)
+
+    def invalidate(self, df: Optional[pd.DataFrame] = None) -> None:
+        """Descarta el perfil de df (o todos)."""
+        with self._lock:
+            if df is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(id(df), None)
+
     def get_shape(self, df: pd.DataFrame) -> Tuple[int,int]:
         return df.shape
 
@@ -48,27 +86,32 @@ class DataProcessor(IProcessor):
         return df.columns.tolist()
 
     def get_info(self, df: pd.DataFrame) -> str:
-        # captura el output de df.info() en un string
-        buf = io.StringIO()
-        df.info(buf=buf)
-        return buf.getvalue()
+        # salida de df.info(), generada al construir el perfil
+        return self.profile(df).info()
 
     def get_null_percentages(self, df: pd.DataFrame) -> Dict[str,float]:
         # porcentaje de nulos por columna, redondeado
-        pct = (df.isnull().mean() * 100).round(2)
-        return pct.to_dict()
+        return self.profile(df).null_percentages()
 
     def get_unique_counts(self, df: pd.DataFrame) -> Dict[str,int]:
-        # número de valores únicos por columna
-        return df.nunique().to_dict()
+        # número de valores únicos por columna (aproximado en columnas de alta cardinalidad)
+        return self.profile(df).unique_counts()
 
     def get_unique_values(self, df: pd.DataFrame, n: int = 10) -> Dict[str, List[Any]]:
         # primeros n valores únicos de cada columna
+        prof = self.profile(df)
+        if n <= prof.n_uniques:
+            return prof.unique_values(n)
         uniq = {}
         for c in df.columns:
             vals = pd.Series(df[c].dropna().unique())
             uniq[c] = vals.head(n).tolist()
         return uniq
 
+    def get_top_values(self, df: pd.DataFrame, n: int = 10) -> Dict[str, Dict[Any, int]]:
+        # valores más frecuentes de cada columna con su conteo
+        return self.profile(df).top_values(n)
+
     def get_descriptive_stats(self, df: pd.DataFrame) -> pd.DataFrame:
-        return df.describe()
+        stats = self.profile(df).describe()
+        return stats if len(stats.columns) else df.describe()
@@ -0,0 +1,146 @@
+import io
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from .sketches import HyperLogLog
+
+# filas de describe() para columnas numéricas, en el mismo orden que pandas
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+# las columnas datetime no tienen std (NaN si se mezclan con numéricas, como en pandas)
+DATETIME_DESCRIBE_INDEX = ["count", "mean", "min", "25%", "50%", "75%", "max"]
+
+
+class ColumnProfile:
+    """Metadatos de una columna: nulos, cardinalidad, valores más frecuentes y primeros únicos."""
+    def __init__(self, name: str, dtype: str, nulls: int, n_unique: int, approximate: bool,
+                 top: Dict[Any, int], first_uniques: List[Any],
+                 describe: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.dtype = dtype
+        self.nulls = nulls
+        self.n_unique = n_unique
+        self.approximate = approximate   # n_unique estimado con HyperLogLog
+        self.top = top
+        self.first_uniques = first_uniques
+        self.describe = describe
+
+
+class DatasetProfile:
+    """
+    Perfil de un DataFrame calculado en una sola pasada por columna: nulos,
+    cardinalidad, top-N, primeros valores únicos y estadísticas de describe().
+    Para la mayoría de columnas basta un pd.factorize (cardinalidad exacta, únicos
+    en orden de aparición y conteos con bincount). Las columnas de alta cardinalidad
+    (detectadas con una muestra) usan HyperLogLog y el top-N de la muestra.
+    Es inmutable: si el DataFrame cambia hay que construir otro perfil.
+    """
+    def __init__(self, df: pd.DataFrame, top_n: int = 10, n_uniques: int = 100,
+                 sample_rows: int = 100_000, hll_ratio: float = 0.5):
+        """
+        top_n: valores más frecuentes que se guardan por columna.
+        n_uniques: primeros valores únicos que se guardan por columna.
+        sample_rows / hll_ratio: si en las primeras sample_rows filas la proporción
+            de distintos supera hll_ratio (y hay más filas), se usa HyperLogLog.
+        """
+        self.shape = df.shape
+        self.n_rows = len(df)
+        self.top_n = top_n
+        self.n_uniques = n_uniques
+        self.sample_rows = sample_rows
+        self.hll_ratio = hll_ratio
+        self.columns: Dict[str, ColumnProfile] = {
+            c: self._profile_column(df[c]) for c in df.columns
+        }
+        self._info = self._render_info(df)
+
+    # ------------------------------------------------------------------ #
+    def _high_cardinality(self, s: pd.Series) -> bool:
+        if len(s) <= self.sample_rows or isinstance(s.dtype, pd.CategoricalDtype):
+            return False
+        head = s.iloc[:self.sample_rows]
+        return head.nunique() > self.hll_ratio * head.count()
+
+    def _profile_column(self, s: pd.Series) -> ColumnProfile:
+        nulls = int(len(s) - s.count())
+        if self._high_cardinality(s):
+            n_unique = HyperLogLog().update(s).estimate()
+            top = s.iloc[:self.sample_rows].value_counts().head(self.top_n)
+            top_dict = dict(zip(top.index.tolist(), top.tolist()))
+            first = self._first_uniques(s)
+            approximate = True
+        else:
+            codes, uniques = pd.factorize(s, sort=False)   # nulos → -1
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            order = np.argsort(-counts, kind="stable")[:self.top_n]
+            top_vals = pd.Series(uniques.take(order)).tolist()
+            top_dict = dict(zip(top_vals, counts[order].tolist()))
+            first = pd.Series(uniques[:self.n_uniques]).tolist()
+            n_unique = len(uniques)
+            approximate = False
+
+        describe = None
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            describe = self._describe(s)
+        elif pd.api.types.is_datetime64_dtype(s):
+            # Timestamps, con el mismo cálculo que df.describe() (que omite las fechas con zona horaria)
+            describe = s.describe().to_dict()
+        return ColumnProfile(s.name, str(s.dtype), nulls, n_unique, approximate,
+                             top_dict, first, describe)
+
+    def _first_uniques(self, s: pd.Series) -> List[Any]:
+        # recorremos bloques crecientes hasta reunir n_uniques valores
+        size = 4 * self.n_uniques
+        while True:
+            vals = pd.Series(s.iloc[:size].dropna().unique())
+            if len(vals) >= self.n_uniques or size >= len(s):
+                return vals.head(self.n_uniques).tolist()
+            size *= 4
+
+    @staticmethod
+    def _describe(s: pd.Series) -> Dict[str, float]:
+        v = s.to_numpy(dtype="float64", na_value=np.nan)
+        v = v[~np.isnan(v)]
+        if not len(v):
+            return {k: (0.0 if k == "count" else np.nan) for k in DESCRIBE_INDEX}
+        q25, q50, q75 = np.percentile(v, [25, 50, 75])
+        return {
+            "count": float(len(v)),
+            "mean":  float(v.mean()),
+            "std":   float(v.std(ddof=1)) if len(v) > 1 else np.nan,
+            "min":   float(v.min()),
+            "25%":   float(q25),
+            "50%":   float(q50),
+            "75%":   float(q75),
+            "max":   float(v.max()),
+        }
+
+    @staticmethod
+    def _render_info(df: pd.DataFrame) -> str:
+        buf = io.StringIO()
+        df.info(buf=buf)
+        return buf.getvalue()
+
+    # ------------------------------------------------------------------ #
+    def info(self) -> str:
+        return self._info
+
+    def null_percentages(self) -> Dict[str, float]:
+        n = self.n_rows
+        return {c: (round(p.nulls / n * 100, 2) if n else np.nan) for c, p in self.columns.items()}
+
+    def unique_counts(self) -> Dict[str, int]:
+        return {c: p.n_unique for c, p in self.columns.items()}
+
+    def unique_values(self, n: int = 10) -> Dict[str, List[Any]]:
+        return {c: p.first_uniques[:n] for c, p in self.columns.items()}
+
+    def top_values(self, n: Optional[int] = None) -> Dict[str, Dict[Any, int]]:
+        n = self.top_n if n is None else n
+        return {c: dict(list(p.top.items())[:n]) for c, p in self.columns.items()}
+
+    def describe(self) -> pd.DataFrame:
+        """Equivalente a df.describe() para las columnas numéricas y datetime."""
+        stats = {c: p.describe for c, p in self.columns.items() if p.describe is not None}
+        numeric = any("std" in d for d in stats.values())
+        return pd.DataFrame(stats, index=DESCRIBE_INDEX if numeric else DATETIME_DESCRIBE_INDEX)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .aggregation import date_bucket, isin_mask
+
+if TYPE_CHECKING:
+    from .indexes import DateBucketIndex
+
+
+class QueryPlan:
+    """
+    Vista filtrada y proyectada de un DataFrame para las estrategias que necesitan
+    filas (scatter de puntos, histogramas por selección...), sin copiar el frame:
+      - el filtro de grupos es una máscara sobre los códigos de la columna
+        (o sobre su agrupación de fechas precalculada)
+      - solo se toman las columnas que pide la estrategia y solo las filas
+        seleccionadas, con un único take por columna
+    report() indica filas, columnas y bytes reservados por la consulta.
+    """
+    def __init__(self,
+                 df: pd.DataFrame,
+                 columns: Optional[List[str]] = None,
+                 grupo: Optional[str] = None,
+                 seleccion: Optional[List[Any]] = None,
+                 agrupacion_grupo: str = "Ninguna",
+                 buckets: Optional["DateBucketIndex"] = None):
+        """
+        columns: columnas a proyectar (None → todas).
+        grupo / seleccion: filtra las filas cuyo grupo está en seleccion.
+        agrupacion_grupo: si grupo es una fecha, la vista lo trae agrupado (Anual, Mensual, Diaria).
+        """
+        self.df = df
+        cols = df.columns if columns is None else [c for c in columns if c]
+        self.columns = list(dict.fromkeys(cols))
+        self.grupo = grupo
+        self.seleccion = seleccion or []
+        self.agrupacion_grupo = agrupacion_grupo
+        self.buckets = buckets
+        self._report: Dict[str, int] = {}
+
+    def _group_key(self) -> Tuple[Optional[pd.Series], int]:
+        # clave de grupo y bytes reservados para calcularla (0 si ya estaba precalculada)
+        if not self.grupo:
+            return None, 0
+        s = self.df[self.grupo]
+        if self.agrupacion_grupo == "Ninguna" or not pd.api.types.is_datetime64_any_dtype(s):
+            return s, 0
+        pre = self.buckets.get(self.grupo, self.agrupacion_grupo) if self.buckets is not None else None
+        if pre is not None:
+            return pre, 0
+        key = date_bucket(s, self.agrupacion_grupo)
+        return key, int(key.memory_usage(index=False, deep=False))
+
+    def execute(self) -> pd.DataFrame:
+        key, allocated = self._group_key()
+        mask = isin_mask(key, self.seleccion) if key is not None and self.seleccion else None
+        idx = np.flatnonzero(mask) if mask is not None else None
+
+        data: Dict[str, pd.Series] = {}
+        for c in self.columns:
+            s = key if c == self.grupo and key is not None else self.df[c]
+            data[c] = s if idx is None else s.take(idx)
+        # copy=False: sin filtro, las columnas de la vista son las del propio df
+        view = pd.DataFrame(data, copy=False)
+
+        if idx is not None:
+            allocated += int(view.memory_usage(index=True, deep=False).sum())
+        if mask is not None:
+            allocated += mask.nbytes + idx.nbytes
+        self._report = {
+            "rows_in":         len(self.df),
+            "rows_out":        len(view),
+            "columns":         len(self.columns),
+            "bytes_allocated": allocated,
+        }
+        return view
+
+    def report(self) -> Dict[str, int]:
+        return dict(self._report)
@@ -0,0 +1,209 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+class DatasetVersion:
+    """
+    Versión inmutable de un dataset registrado. El DataFrame no se modifica
+    nunca: los cambios crean otra versión (DatasetRegistry.update).
+    Guarda además las estructuras derivadas (índices, resúmenes...) de esta versión,
+    que se calculan una vez y se liberan con ella.
+    """
+    def __init__(self, name: str, version: int, df: pd.DataFrame, parent: Optional[int] = None):
+        self.name = name
+        self.version = version          # único en todo el registro
+        self.df = df
+        self.parent = parent
+        self.created_at = time.time()
+        self.nbytes = int(df.memory_usage(deep=True).sum())
+        self.refcount = 0
+        self.retired = False            # ya no es la versión actual de name
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def derived(self, key: str, factory: Callable[[pd.DataFrame], Any]) -> Any:
+        """Estructura derivada de esta versión; factory(df) solo se llama la primera vez."""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = factory(self.df)
+            return self._derived[key]
+
+    def derived_bytes(self) -> int:
+        total = 0
+        for value in list(self._derived.values()):
+            usage = getattr(value, "memory_usage", None)
+            if callable(usage):
+                try:
+                    total += int(usage())
+                except TypeError:
+                    pass
+        return total
+
+    def release(self) -> None:
+        # sin lectores y retirada: soltamos las referencias para que se libere la memoria
+        self.df = None
+        self._derived.clear()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name":          self.name,
+            "version":       self.version,
+            "parent":        self.parent,
+            "rows":          None if self.df is None else len(self.df),
+            "bytes":         self.nbytes,
+            "derived_bytes": self.derived_bytes(),
+            "refcount":      self.refcount,
+            "retired":       self.retired,
+            "derived":       list(self._derived),
+        }
+
+
+class DatasetRegistry:
+    """
+    Registro de datasets con nombre para un servidor con varios hilos.
+    Cada nombre apunta a su versión actual; publicar o actualizar crea una versión
+    nueva y retira la anterior, que sigue viva mientras algún lector la tenga
+    prestada (lease) y se libera al devolverse la última referencia.
+    Así una petición ve siempre el mismo DataFrame de principio a fin aunque
+    otra petición cargue o modifique el dataset a la vez.
+    """
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        max_bytes: memoria máxima de los datasets actuales; al superarla se descartan
+            los datasets menos usados recientemente que no tengan lectores.
+        """
+        self.max_bytes = max_bytes
+        self._current: Dict[str, DatasetVersion] = {}
+        self._retired: List[DatasetVersion] = []
+        self._last_used: Dict[str, float] = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.RLock()
+        self._writers: Dict[str, threading.Lock] = {}
+
+    # ------------------------------------------------------------------ #
+    def publish(self, name: str, df: pd.DataFrame, parent: Optional[int] = None) -> DatasetVersion:
+        """
+        Registra df como versión actual de name. df no debe modificarse después.
+        La versión se devuelve ya prestada (como acquire): hay que devolverla con
+        release(). Así no se libera antes de usarla si otra publicación la retira
+        o si el límite de memoria descarta datasets a la vez.
+        """
+        ds = DatasetVersion(name, next(self._versions), df, parent)
+        with self._lock:
+            ds.refcount += 1
+            old = self._current.get(name)
+            self._current[name] = ds
+            self._last_used[name] = time.time()
+            if old is not None:
+                self._retire(old)
+            self._enforce_limit(keep=name)
+        return ds
+
+    def update(self, name: str, fn: Callable[[pd.DataFrame], pd.DataFrame]) -> DatasetVersion:
+        """
+        Copia en escritura: fn recibe una copia superficial de la versión actual
+        (puede añadir o reemplazar columnas con df[c] = ..., no modificar valores
+        en sitio) y su resultado se publica como versión nueva. Las actualizaciones
+        de un mismo nombre se serializan; las lecturas no se bloquean.
+        Como publish, devuelve la versión nueva prestada: hay que llamar a release().
+        """
+        with self._lock:
+            writer = self._writers.setdefault(name, threading.Lock())
+        with writer:
+            with self.lease(name) as ds:
+                new_df = fn(ds.df.copy(deep=False))
+                parent = ds.version
+            return self.publish(name, new_df, parent=parent)
+
+    def drop(self, name: str) -> None:
+        with self._lock:
+            ds = self._current.pop(name, None)
+            self._last_used.pop(name, None)
+            if ds is not None:
+                self._retire(ds)
+
+    # ------------------------------------------------------------------ #
+    def acquire(self, name: str) -> DatasetVersion:
+        """Presta la versión actual de name; hay que devolverla con release()."""
+        with self._lock:
+            ds = self._current.get(name)
+            if ds is None:
+                raise KeyError(f"Dataset '{name}' no cargado")
+            ds.refcount += 1
+            self._last_used[name] = time.time()
+            return ds
+
+    def release(self, ds: DatasetVersion) -> None:
+        with self._lock:
+            ds.refcount -= 1
+            if ds.retired and ds.refcount <= 0:
+                self._free(ds)
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[DatasetVersion]:
+        ds = self.acquire(name)
+        try:
+            yield ds
+        finally:
+            self.release(ds)
+
+    def get(self, name: str) -> Optional[DatasetVersion]:
+        """Versión actual sin préstamo (solo para consultar metadatos)."""
+        with self._lock:
+            return self._current.get(name)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._current)
+
+    def versions(self) -> Dict[str, int]:
+        """Versión actual de cada dataset."""
+        with self._lock:
+            return {n: ds.version for n, ds in self._current.items()}
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._current
+
+    # ------------------------------------------------------------------ #
+    def _retire(self, ds: DatasetVersion) -> None:
+        ds.retired = True
+        if ds.refcount <= 0:
+            self._free(ds)
+        else:
+            self._retired.append(ds)
+
+    def _free(self, ds: DatasetVersion) -> None:
+        ds.release()
+        if ds in self._retired:
+            self._retired.remove(ds)
+
+    def _enforce_limit(self, keep: str) -> None:
+        if self.max_bytes is None:
+            return
+        for name in sorted(self._last_used, key=self._last_used.get):
+            if self.memory_usage() <= self.max_bytes:
+                break
+            if name != keep and self._current[name].refcount == 0:
+                self.drop(name)
+
+    def memory_usage(self) -> int:
+        """Bytes de los DataFrames vivos (actuales y retirados con lectores) y sus derivados.
+        Las columnas compartidas entre versiones por la copia en escritura se cuentan en cada una."""
+        with self._lock:
+            live = list(self._current.values()) + self._retired
+            return sum(ds.nbytes + ds.derived_bytes() for ds in live)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "datasets":  {n: ds.describe() for n, ds in self._current.items()},
+                "retired":   [ds.describe() for ds in self._retired],
+                "bytes":     self.memory_usage(),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+class HyperLogLog:
+    """
+    Estimador aproximado del número de valores distintos (HyperLogLog).
+    Usa 2**p registros (p=14 → 16 KB, error típico ~0.8 %). Es combinable:
+    merge() permite acumular bloques procesados por separado.
+    """
+    def __init__(self, p: int = 14):
+        if not 4 <= p <= 18:
+            raise ValueError("p debe estar entre 4 y 18")
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> "HyperLogLog":
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return self
+        h = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # rango = posición del primer bit a 1 en los 64-p bits restantes
+        bits = 64 - self.p
+        with np.errstate(divide="ignore"):
+            msb = np.floor(np.log2(rest.astype(np.float64)))
+        rank = np.where(rest == 0, bits + 1, bits - msb).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("Solo se pueden combinar sketches con el mismo p")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        m = float(self.m)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # corrección para cardinalidades pequeñas (linear counting)
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+    def __len__(self) -> int:
+        return self.estimate()
@@ -1,8 +1,11 @@
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.artist import setp
 from io import BytesIO
+from typing import List
 from .base import ChartStrategy
+from ..aggregation import aggregate
 import pandas as pd
 
 class BarChartStrategy(ChartStrategy):
@@ -13,16 +16,30 @@ class BarChartStrategy(ChartStrategy):
              agregacion: str,
              grupo: str = None) -> bytes:
 
-        fig, ax = plt.subplots(figsize=(16, 6), dpi=150)
+        agg = aggregate(df, x_col, y_col, agregacion, grupo)
+        return self.plot_aggregated(agg, x_col, y_col, agregacion, grupo)
+
+    def columns(self, df: pd.DataFrame, x_col: str, y_col: str = None,
+                grupo: str = None, **kwargs) -> List[str]:
+        return [c for c in (x_col, y_col, grupo) if c]
+
+    def plot_aggregated(self,
+                        agg: pd.Series,
+                        x_col: str,
+                        y_col: str,
+                        agregacion: str,
+                        grupo: str = None) -> bytes:
+        """
+        Pinta un resultado ya agregado (ver framework.aggregation.aggregate):
+        una Series indexada por x_col, o por (x_col, grupo) si hay grupo.
+        """
+        fig = Figure(figsize=(16, 6), dpi=150)
+        ax = fig.subplots()
 
         if grupo:
             # agrupado por x_col + grupo
-            df[grupo] = df[grupo].astype(str)
-            if agregacion == "Conteo":
-                grp = df.groupby([x_col, grupo]).size().unstack(fill_value=0)
-            else:
-                func = {"Media": "mean", "Suma": "sum"}[agregacion]
-                grp = df.groupby([x_col, grupo])[y_col].agg(func).unstack(fill_value=0)
+            grp = agg.unstack(fill_value=0)
+            grp.columns = grp.columns.astype(str)
 
             # Top-10 en x_col
             tops = grp.sum(axis=1).nlargest(10).index
@@ -31,13 +48,7 @@ class BarChartStrategy(ChartStrategy):
 
         else:
             # serie simple
-            if agregacion == "Conteo":
-                series = df.groupby(x_col).size()
-            else:
-                series = df.groupby(x_col)[y_col].agg(
-                    {"Media": "mean", "Suma": "sum"}[agregacion]
-                )
-            series.nlargest(10).plot(kind="bar", width=0.8, ax=ax)
+            agg.nlargest(10).plot(kind="bar", width=0.8, ax=ax)
 
         ax.set_xlabel(x_col)
         ax.set_ylabel("Resultado")
@@ -45,10 +56,9 @@ class BarChartStrategy(ChartStrategy):
         if grupo:
             title += f" (agrupado por {grupo})"
         ax.set_title(title)
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
-        plt.tight_layout()
+        setp(ax.get_xticklabels(), rotation=45, ha="right")
+        fig.tight_layout()
 
         buf = BytesIO()
         fig.savefig(buf, format="png")
-        plt.close(fig)
         return buf.getvalue()
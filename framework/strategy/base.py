@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 import pandas as pd
-from typing import Any
+from typing import Any, List, Optional
 from io import BytesIO
 
 class IPlotStrategy(ABC):
@@ -13,4 +13,9 @@ class IPlotStrategy(ABC):
         ...
 
 class ChartStrategy(IPlotStrategy):
-    pass
+    def columns(self, df: pd.DataFrame, **kwargs: Any) -> Optional[List[str]]:
+        """
+        Columnas de df que usa plot() con estos kwargs, para no pasarle más de las
+        necesarias. None → todas.
+        """
+        return None
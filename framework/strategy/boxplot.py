@@ -1,8 +1,11 @@
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.artist import setp
 from io import BytesIO
+from typing import Any, Dict, List
 from .base import ChartStrategy
+from ..summaries import NumericSummary, grouped_box_stats
 import pandas as pd
 
 class BoxplotStrategy(ChartStrategy):
@@ -12,21 +15,73 @@ class BoxplotStrategy(ChartStrategy):
              grupo: str = None,
              **kwargs) -> bytes:
 
-        fig, ax = plt.subplots(figsize=(10, 6))
+        if grupo:
+            return self.plot_grouped(grouped_box_stats(df[y_col], df[grupo]), y_col, grupo)
+
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
         bp = ax.boxplot(
             df[y_col].dropna(),
             notch=False,
-            patch_artist=True,
-            labels=[y_col]
+            patch_artist=True
         )
+        ax.set_xticks([1], [y_col])
+
+        ax.set_xlabel(y_col)
+        ax.set_ylabel(y_col)
+        ax.set_title(f"Boxplot de {y_col}")
+        ax.legend([bp["boxes"][0]], [y_col], loc='upper right')
+        fig.tight_layout()
+
+        buf = BytesIO()
+        fig.savefig(buf, format="png")
+        return buf.getvalue()
+
+    def columns(self, df: pd.DataFrame, y_col: str, grupo: str = None, **kwargs) -> List[str]:
+        return [c for c in (y_col, grupo) if c]
+
+    def plot_summary(self,
+                     summary: NumericSummary,
+                     y_col: str,
+                     **kwargs) -> bytes:
+        """
+        Boxplot a partir de un NumericSummary (cuartiles del sketch y muestra de outliers).
+        """
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        bp = ax.bxp([summary.box_stats(label=y_col)], patch_artist=True)
 
         ax.set_xlabel(y_col)
         ax.set_ylabel(y_col)
         ax.set_title(f"Boxplot de {y_col}")
         ax.legend([bp["boxes"][0]], [y_col], loc='upper right')
-        plt.tight_layout()
+        fig.tight_layout()
+
+        buf = BytesIO()
+        fig.savefig(buf, format="png")
+        return buf.getvalue()
+
+
+    def plot_grouped(self,
+                     stats: List[Dict[str, Any]],
+                     y_col: str,
+                     grupo: str,
+                     **kwargs) -> bytes:
+        """
+        Un boxplot por grupo a partir de grouped_box_stats (ya calculados en una pasada).
+        """
+        fig = Figure(figsize=(max(10, 0.35 * len(stats)), 6))
+        ax = fig.subplots()
+        if stats:
+            ax.bxp(stats, patch_artist=True)
+        if len(stats) > 10:
+            setp(ax.get_xticklabels(), rotation=45, ha="right")
+
+        ax.set_xlabel(grupo)
+        ax.set_ylabel(y_col)
+        ax.set_title(f"Boxplot de {y_col} por {grupo}")
+        fig.tight_layout()
 
         buf = BytesIO()
         fig.savefig(buf, format="png")
-        plt.close(fig)
         return buf.getvalue()
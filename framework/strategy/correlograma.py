@@ -1,19 +1,28 @@
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from io import BytesIO
+from typing import List
 from .base import ChartStrategy
 import pandas as pd
 
 class CorrelogramaStrategy(ChartStrategy):
     def plot(self,
              df: pd.DataFrame,
+             metodo: str = "pearson",
              **kwargs) -> bytes:
 
         num_df = df.select_dtypes(include=["number"])
-        corr = num_df.corr()
+        corr = num_df.corr(method=metodo)
+        return self.plot_matrix(corr, metodo)
 
-        fig, ax = plt.subplots(figsize=(8, 6), dpi=100)
+    def columns(self, df: pd.DataFrame, **kwargs) -> List[str]:
+        return df.select_dtypes(include=["number"]).columns.tolist()
+
+    def plot_matrix(self, corr: pd.DataFrame, metodo: str = "pearson") -> bytes:
+        """Pinta una matriz de correlación ya calculada (p. ej. con CorrelationStats)."""
+        fig = Figure(figsize=(8, 6), dpi=100)
+        ax = fig.subplots()
         cax = ax.matshow(corr, cmap="coolwarm", vmin=-1, vmax=1)
         fig.colorbar(cax, fraction=0.046, pad=0.04)
 
@@ -22,10 +31,10 @@ class CorrelogramaStrategy(ChartStrategy):
         ax.set_yticks(ticks)
         ax.set_xticklabels(corr.columns, rotation=90)
         ax.set_yticklabels(corr.columns)
-        ax.set_title("Matriz de correlación", pad=20)
-        plt.tight_layout()
+        titulo = "Matriz de correlación" if metodo == "pearson" else f"Matriz de correlación ({metodo})"
+        ax.set_title(titulo, pad=20)
+        fig.tight_layout()
 
         buf = BytesIO()
         fig.savefig(buf, format="png")
-        plt.close(fig)
         return buf.getvalue()
@@ -0,0 +1,96 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional
+
+from ..jobs import process_context
+from .base import IPlotStrategy
+
+
+def _warm_worker() -> None:
+    # se ejecuta una vez por proceso: deja matplotlib y pandas importados
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.figure  # noqa: F401
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import pandas.plotting._matplotlib  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+def _render(strategy: IPlotStrategy, method: str, args: tuple, kwargs: dict) -> bytes:
+    return getattr(strategy, method)(*args, **kwargs)
+
+
+class RenderExecutor:
+    """
+    Renderiza gráficos en un pool de procesos con matplotlib ya importado.
+    Las estrategias usan la API orientada a objetos (Figure), así que cada
+    proceso pinta de forma independiente y devuelve los bytes PNG.
+    Conviene enviar datos ya agregados: todo lo que se pasa se serializa.
+    Con max_workers=0 se renderiza en el propio proceso.
+    """
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = 120.0,
+                 mp_context: Any = None):
+        """
+        max_workers: procesos del pool (por defecto, núcleos disponibles).
+        timeout: segundos máximos de espera por gráfico.
+        mp_context: contexto de multiprocessing; por defecto process_context() (sin fork).
+        """
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.timeout = timeout
+        self.mp_context = mp_context
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self.mp_context or process_context(),
+                    initializer=_warm_worker,
+                )
+                # arrancamos todos los procesos ya, no en la primera petición
+                for _ in range(self.max_workers):
+                    self._pool.submit(_noop)
+            return self._pool
+
+    def start(self) -> "RenderExecutor":
+        if self.max_workers > 0:
+            self._get_pool()
+        return self
+
+    def submit(self, strategy: IPlotStrategy, method: str, *args: Any, **kwargs: Any) -> Future:
+        """Encola strategy.<method>(*args, **kwargs) y devuelve un Future con los bytes PNG."""
+        if self.max_workers <= 0:
+            fut: Future = Future()
+            try:
+                fut.set_result(_render(strategy, method, args, kwargs))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        return self._get_pool().submit(_render, strategy, method, args, kwargs)
+
+    def render(self, strategy: IPlotStrategy, method: str, *args: Any, **kwargs: Any) -> bytes:
+        """Versión bloqueante de submit(). Si un proceso murió, recrea el pool y reintenta una vez."""
+        try:
+            return self.submit(strategy, method, *args, **kwargs).result(self.timeout)
+        except BrokenProcessPool:
+            self._reset()
+            return self.submit(strategy, method, *args, **kwargs).result(self.timeout)
+
+    def _reset(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+            self._pool = None
@@ -1,8 +1,10 @@
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from io import BytesIO
+from typing import List
 from .base import ChartStrategy
+from ..summaries import NumericSummary
 import pandas as pd
 
 class HistogramStrategy(ChartStrategy):
@@ -13,14 +15,38 @@ class HistogramStrategy(ChartStrategy):
 
         data = pd.to_numeric(df[y_col], errors="coerce").dropna()
 
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
         ax.hist(data, bins=30, edgecolor='black', alpha=0.7)
         ax.set_xlabel(y_col)
         ax.set_ylabel("Frecuencia")
         ax.set_title(f"Histograma de {y_col}")
-        plt.tight_layout()
+        fig.tight_layout()
+
+        buf = BytesIO()
+        fig.savefig(buf, format="png")
+        return buf.getvalue()
+
+    def columns(self, df: pd.DataFrame, y_col: str, **kwargs) -> List[str]:
+        return [y_col]
+
+    def plot_summary(self,
+                     summary: NumericSummary,
+                     y_col: str,
+                     **kwargs) -> bytes:
+        """
+        Histograma a partir de un NumericSummary: solo se pintan sus conteos por bin.
+        """
+        counts, edges = summary.histogram()
+
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black', alpha=0.7)
+        ax.set_xlabel(y_col)
+        ax.set_ylabel("Frecuencia")
+        ax.set_title(f"Histograma de {y_col}")
+        fig.tight_layout()
 
         buf = BytesIO()
         fig.savefig(buf, format="png")
-        plt.close(fig)
         return buf.getvalue()
@@ -1,9 +1,12 @@
 # framework/strategy/line.py
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.artist import setp
 from io import BytesIO
+from typing import List
 from .base import ChartStrategy
+from ..aggregation import aggregate
 import pandas as pd
 
 class LineChartStrategy(ChartStrategy):
@@ -14,45 +17,42 @@ class LineChartStrategy(ChartStrategy):
              agregacion: str,
              grupo: str = None) -> bytes:
 
-        fig, ax = plt.subplots(figsize=(16, 6), dpi=150)
+        agg = aggregate(df, x_col, y_col, agregacion, grupo)
+        return self.plot_aggregated(agg, x_col, y_col, agregacion, grupo)
+
+    def columns(self, df: pd.DataFrame, x_col: str, y_col: str = None,
+                grupo: str = None, **kwargs) -> List[str]:
+        return [c for c in (x_col, y_col, grupo) if c]
+
+    def plot_aggregated(self,
+                        agg: pd.Series,
+                        x_col: str,
+                        y_col: str,
+                        agregacion: str,
+                        grupo: str = None) -> bytes:
+        """
+        Pinta un resultado ya agregado (ver framework.aggregation.aggregate):
+        una Series indexada por x_col, o por (x_col, grupo) si hay grupo.
+        """
+        fig = Figure(figsize=(16, 6), dpi=150)
+        ax = fig.subplots()
 
         if grupo:
             # pivot por x_col + grupo
-            if agregacion == "Conteo":
-                tmp = (
-                    df.groupby([x_col, grupo])
-                      .size()
-                      .rename("count")
-                      .reset_index()
-                )
-                pivot = tmp.pivot(index=x_col, columns=grupo, values="count")
-            else:
-                func = {"Media": "mean", "Suma": "sum"}[agregacion]
-                pivot = df.pivot_table(
-                    index=x_col, columns=grupo, values=y_col, aggfunc=func
-                )
-
-            pivot = pivot.sort_index()
+            pivot = agg.unstack().sort_index()
             for col in pivot.columns:
                 s = pivot[col].dropna()
                 ax.plot(s.index.astype(str), s.values, marker='o', label=str(col))
 
-            plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+            setp(ax.get_xticklabels(), rotation=45, ha="right")
             ncol = 3 if len(pivot.columns) > 15 else 1
             ax.legend(title=grupo, bbox_to_anchor=(1.02, 1), loc="upper left", ncol=ncol)
 
         else:
             # serie única
-            if agregacion == "Conteo":
-                serie = df.groupby(x_col).size().rename("count")
-                label = "count"
-            else:
-                func = {"Media": "mean", "Suma": "sum"}[agregacion]
-                serie = df.groupby(x_col)[y_col].agg(func)
-                label = y_col
-
-            ax.plot(serie.index.astype(str), serie.values, marker='o', label=label)
-            plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+            label = "count" if agregacion == "Conteo" else y_col
+            ax.plot(agg.index.astype(str), agg.values, marker='o', label=label)
+            setp(ax.get_xticklabels(), rotation=45, ha="right")
             ax.legend()
 
         ax.set_xlabel(x_col)
@@ -61,9 +61,8 @@ class LineChartStrategy(ChartStrategy):
         if grupo:
             title += f" (agrupado por {grupo})"
         ax.set_title(title)
-        plt.tight_layout()
+        fig.tight_layout()
 
         buf = BytesIO()
         fig.savefig(buf, format="png")
-        plt.close(fig)
         return buf.getvalue()
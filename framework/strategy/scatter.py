@@ -1,22 +1,49 @@
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from matplotlib import colormaps
 from io import BytesIO
+from typing import Any, Dict, List
 from .base import ChartStrategy
+from ..aggregation import bin_points
+import numpy as np
 import pandas as pd
 
 class ScatterStrategy(ChartStrategy):
+    """
+    Scatter de puntos o, con muchas filas, de densidad: los puntos se agregan en
+    una rejilla (ver framework.aggregation.bin_points) que se pinta como imagen.
+    modo: "puntos", "densidad" o "auto" (densidad a partir de max_points filas).
+    """
+    def __init__(self, max_points: int = 50_000, bins=(400, 250)):
+        self.max_points = max_points
+        self.bins = bins
+
+    def use_density(self, n_rows: int, modo: str = "auto") -> bool:
+        if modo == "densidad":
+            return True
+        if modo == "puntos":
+            return False
+        return n_rows > self.max_points
+
     def plot(self,
              df: pd.DataFrame,
              x_col: str,
              y_col: str,
              grupo: str = None,
+             modo: str = "auto",
              **kwargs) -> bytes:
 
-        fig, ax = plt.subplots(figsize=(10, 6))
+        if self.use_density(len(df), modo):
+            grid = bin_points(df[x_col], df[y_col], df[grupo] if grupo else None, bins=self.bins)
+            return self.plot_density(grid, x_col, y_col, grupo)
+
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
 
         if grupo:
-            for name, sub in df.groupby(grupo):
+            for name, sub in df.groupby(grupo, observed=True):
                 ax.scatter(sub[x_col], sub[y_col],
                            label=str(name), alpha=0.7, s=20)
             ax.legend(title=grupo, bbox_to_anchor=(1.02, 1), loc="upper left", fontsize="small")
@@ -26,9 +53,57 @@ class ScatterStrategy(ChartStrategy):
         ax.set_xlabel(x_col)
         ax.set_ylabel(y_col)
         ax.set_title(f"Scatter de {y_col} vs {x_col}")
-        plt.tight_layout()
+        fig.tight_layout()
+
+        buf = BytesIO()
+        fig.savefig(buf, format="png")
+        return buf.getvalue()
+
+    def columns(self, df: pd.DataFrame, x_col: str, y_col: str = None,
+                grupo: str = None, **kwargs) -> List[str]:
+        return [c for c in (x_col, y_col, grupo) if c]
+
+    def plot_density(self,
+                     grid: Dict[str, Any],
+                     x_col: str,
+                     y_col: str,
+                     grupo: str = None) -> bytes:
+        """
+        Pinta la rejilla de bin_points. Sin grupos, la densidad (escala log) con un
+        colormap; con grupos, cada celda toma la media de los colores de sus grupos
+        ponderada por conteos y la opacidad crece con el total de puntos.
+        """
+        counts = grid["counts"].astype(np.float64)
+        total = counts.sum(axis=0)
+        extent = grid["extent"]
+
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+
+        if not grupo or len(grid["labels"]) == 1:
+            img = np.ma.masked_equal(np.log1p(total), 0)
+            im = ax.imshow(img, origin="lower", extent=extent, aspect="auto",
+                           cmap="viridis", interpolation="nearest")
+            fig.colorbar(im, ax=ax, label="log(1 + puntos)")
+        else:
+            cmap = colormaps["tab10" if len(grid["labels"]) <= 10 else "tab20"]
+            colors = np.array([cmap(i)[:3] for i in range(len(grid["labels"]))])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rgb = np.tensordot(counts, colors, axes=([0], [0])) / total[..., None]
+            alpha = np.log1p(total) / max(np.log1p(total.max()), 1e-12)
+            rgba = np.zeros(total.shape + (4,))
+            rgba[..., :3] = np.nan_to_num(rgb)
+            rgba[..., 3] = np.where(total > 0, 0.25 + 0.75 * alpha, 0.0)
+            ax.imshow(rgba, origin="lower", extent=extent, aspect="auto", interpolation="nearest")
+            handles = [Patch(color=colors[i], label=lbl) for i, lbl in enumerate(grid["labels"])]
+            ax.legend(handles=handles, title=grupo, bbox_to_anchor=(1.02, 1),
+                      loc="upper left", fontsize="small")
+
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
+        ax.set_title(f"Densidad de {y_col} vs {x_col} ({grid['n_points']:,} puntos)")
+        fig.tight_layout()
 
         buf = BytesIO()
         fig.savefig(buf, format="png")
-        plt.close(fig)
         return buf.getvalue()
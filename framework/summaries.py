@@ -0,0 +1,358 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+class QuantileSketch:
+    """
+    Resumen combinable de una distribución para estimar cuantiles.
+    Guarda como mucho k centroides (media, peso) de igual peso: cada update()
+    o merge() junta los centroides y los vuelve a comprimir a k, de modo que el
+    error en rango es del orden de 1/(2k) con memoria O(k).
+    """
+    def __init__(self, k: int = 512):
+        self.k = k
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.vmin = np.inf
+        self.vmax = -np.inf
+
+    @property
+    def count(self) -> int:
+        return int(self.weights.sum())
+
+    def update(self, values: np.ndarray) -> "QuantileSketch":
+        v = np.asarray(values, dtype=np.float64)
+        v = np.sort(v[np.isfinite(v)])
+        if not len(v):
+            return self
+        self.vmin = min(self.vmin, float(v[0]))
+        self.vmax = max(self.vmax, float(v[-1]))
+        # k tramos consecutivos de igual tamaño sobre los datos ordenados
+        starts = np.unique(np.linspace(0, len(v), min(self.k, len(v)) + 1).astype(np.int64)[:-1])
+        sums = np.add.reduceat(v, starts)
+        sizes = np.diff(np.append(starts, len(v))).astype(np.float64)
+        return self._absorb(sums / sizes, sizes)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        self.vmin = min(self.vmin, other.vmin)
+        self.vmax = max(self.vmax, other.vmax)
+        return self._absorb(other.means, other.weights)
+
+    def _absorb(self, means: np.ndarray, weights: np.ndarray) -> "QuantileSketch":
+        m = np.concatenate([self.means, means])
+        w = np.concatenate([self.weights, weights])
+        order = np.argsort(m, kind="stable")
+        m, w = m[order], w[order]
+        if len(m) > self.k:
+            # reagrupamos por peso acumulado en k tramos
+            mid = np.cumsum(w) - w / 2
+            bucket = np.minimum((mid / w.sum() * self.k).astype(np.int64), self.k - 1)
+            bw = np.bincount(bucket, weights=w, minlength=self.k)
+            bm = np.bincount(bucket, weights=w * m, minlength=self.k)
+            keep = bw > 0
+            m, w = bm[keep] / bw[keep], bw[keep]
+        self.means, self.weights = m, w
+        return self
+
+    def quantile(self, q: Any) -> Any:
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        total = self.weights.sum()
+        # posiciones de los centroides en rango, con los extremos anclados a min y max
+        pos = np.concatenate([[0.0], np.cumsum(self.weights) - self.weights / 2, [total]])
+        val = np.concatenate([[self.vmin], self.means, [self.vmax]])
+        return np.interp(np.asarray(q, dtype=np.float64) * total, pos, val)
+
+
+class NumericSummary:
+    """
+    Resumen de una columna numérica para histogramas y boxplots sin recorrer los datos:
+    conteos en bins de bordes fijos, sketch de cuantiles, min/max, nulos y una
+    muestra de los valores extremos por cada lado (los candidatos a outlier).
+    Es incremental (update) y combinable (merge) mientras los bordes no cambien.
+    """
+    def __init__(self, edges: np.ndarray, k: int = 512, n_extremes: int = 500):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.below = 0      # valores fuera de los bordes fijos
+        self.above = 0
+        self.nulls = 0
+        self.sketch = QuantileSketch(k)
+        self.n_extremes = n_extremes
+        self.low = np.empty(0, dtype=np.float64)
+        self.high = np.empty(0, dtype=np.float64)
+
+    @classmethod
+    def from_series(cls, s: pd.Series, bins: int = 30, **kwargs: Any) -> "NumericSummary":
+        """Bordes equiespaciados entre el mínimo y el máximo, como ax.hist(data, bins=bins)."""
+        v = _numeric_values(s)
+        finite = v[np.isfinite(v)]
+        lo, hi = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 1.0)
+        summary = cls(np.histogram_bin_edges(finite, bins=bins, range=(lo, hi)), **kwargs)
+        summary.nulls = int(len(v) - len(finite))
+        summary._add(finite)
+        return summary
+
+    def update(self, s: pd.Series) -> "NumericSummary":
+        v = _numeric_values(s)
+        finite = v[np.isfinite(v)]
+        self.nulls += int(len(v) - len(finite))
+        self._add(finite)
+        return self
+
+    def _add(self, v: np.ndarray) -> None:
+        if not len(v):
+            return
+        inside = (v >= self.edges[0]) & (v <= self.edges[-1])
+        self.below += int((v < self.edges[0]).sum())
+        self.above += int((v > self.edges[-1]).sum())
+        self.counts += np.histogram(v[inside], bins=self.edges)[0]
+        self.sketch.update(v)
+        self._keep_extremes(v)
+
+    def _keep_extremes(self, v: np.ndarray) -> None:
+        n = self.n_extremes
+        low = np.concatenate([self.low, v])
+        high = np.concatenate([self.high, v])
+        if len(low) > n:
+            low = np.partition(low, n - 1)[:n]
+            high = np.partition(high, len(high) - n)[-n:]
+        self.low, self.high = np.sort(low), np.sort(high)
+
+    def merge(self, other: "NumericSummary") -> "NumericSummary":
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Solo se pueden combinar resúmenes con los mismos bordes")
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        self.nulls += other.nulls
+        self.sketch.merge(other.sketch)
+        self._keep_extremes(np.concatenate([other.low, other.high]))
+        return self
+
+    # --- consultas ---
+    @property
+    def count(self) -> int:
+        return self.sketch.count
+
+    @property
+    def min(self) -> float:
+        return self.sketch.vmin
+
+    @property
+    def max(self) -> float:
+        return self.sketch.vmax
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        return self.sketch.quantile(qs)
+
+    def histogram(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.counts, self.edges
+
+    def box_stats(self, label: str = "", whis: float = 1.5) -> Dict[str, Any]:
+        """Estadísticos en el formato de Axes.bxp (mediana, cuartiles, bigotes y outliers)."""
+        q1, med, q3 = self.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        lo, hi = q1 - whis * iqr, q3 + whis * iqr
+        # el bigote es el dato más extremo dentro de la valla; si todos los extremos
+        # guardados son outliers, la valla es la mejor aproximación
+        inside_low = self.low[self.low >= lo]
+        inside_high = self.high[self.high <= hi]
+        whislo = float(inside_low[0]) if len(inside_low) else float(lo)
+        whishi = float(inside_high[-1]) if len(inside_high) else float(hi)
+        fliers = np.concatenate([self.low[self.low < lo], self.high[self.high > hi]])
+        return {
+            "label": label, "med": float(med), "q1": float(q1), "q3": float(q3),
+            "whislo": min(whislo, float(q1)), "whishi": max(whishi, float(q3)),
+            "fliers": np.unique(fliers),
+        }
+
+
+def grouped_box_stats(values: pd.Series,
+                      groups: pd.Series,
+                      whis: float = 1.5,
+                      max_groups: int = 50,
+                      max_fliers: int = 200) -> List[Dict[str, Any]]:
+    """
+    Estadísticos de boxplot (formato Axes.bxp) de todos los grupos en una sola pasada:
+    los valores se ordenan una vez por (código de grupo, valor) y los cuartiles,
+    bigotes y outliers de cada grupo se leen por posición dentro de su tramo.
+    Cuartiles con interpolación lineal, como np.percentile / ax.boxplot.
+    Si hay más de max_groups grupos se muestran los más numerosos; de cada grupo
+    se devuelven como mucho max_fliers outliers, repartidos a lo largo del rango.
+    """
+    v = _numeric_values(values)
+    codes, uniques = pd.factorize(groups, sort=True)
+    ok = np.isfinite(v) & (codes >= 0)
+    v, codes = v[ok], codes[ok]
+
+    sizes = np.bincount(codes, minlength=len(uniques))
+    keep = np.flatnonzero(sizes)
+    if len(keep) > max_groups:
+        keep = np.sort(keep[np.argsort(-sizes[keep], kind="stable")[:max_groups]])
+        sel = np.isin(codes, keep)
+        v, codes = v[sel], codes[sel]
+    if not len(v):
+        return []
+
+    # orden por valor y después orden estable por código de grupo (radix sort sobre enteros)
+    order = np.argsort(v)
+    order = order[np.argsort(codes[order], kind="stable")]
+    sv, sc = v[order], codes[order]
+    n = sizes[keep]
+    starts = np.concatenate([[0], np.cumsum(n)[:-1]])
+
+    def quantile(q: float) -> np.ndarray:
+        pos = q * (n - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, n - 1)
+        frac = pos - lo
+        return sv[starts + lo] + frac * (sv[starts + hi] - sv[starts + lo])
+
+    q1, med, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    lo_fence = np.repeat(q1 - whis * iqr, n)
+    hi_fence = np.repeat(q3 + whis * iqr, n)
+    within = (sv >= lo_fence) & (sv <= hi_fence)
+    whislo = np.minimum.reduceat(np.where(within, sv, np.inf), starts)
+    whishi = np.maximum.reduceat(np.where(within, sv, -np.inf), starts)
+
+    out_pos = np.flatnonzero(~within)
+    bounds = np.searchsorted(out_pos, np.append(starts, len(sv)))
+    stats = []
+    for i, g in enumerate(keep):
+        fl = sv[out_pos[bounds[i]:bounds[i + 1]]]
+        if len(fl) > max_fliers:
+            fl = fl[np.linspace(0, len(fl) - 1, max_fliers).astype(np.int64)]
+        stats.append({
+            "label": str(uniques[g]), "n": int(n[i]),
+            "med": float(med[i]), "q1": float(q1[i]), "q3": float(q3[i]),
+            "whislo": float(min(whislo[i], q1[i])), "whishi": float(max(whishi[i], q3[i])),
+            "fliers": fl,
+        })
+    return stats
+
+
+def _numeric_values(s: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        s = pd.to_numeric(s, errors="coerce")
+    return s.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class CorrelationStats:
+    """
+    Estadísticos suficientes para la correlación de Pearson por pares, con la misma
+    eliminación de nulos por pares que DataFrame.corr(): para cada par de columnas
+    se acumulan el número de filas con ambos valores, sus sumas, sumas de cuadrados
+    y productos cruzados (todo como productos de matrices por bloques).
+    update() añade filas nuevas sin recalcular; para Spearman se mantiene una
+    muestra uniforme de filas (bottom-k por clave aleatoria) que también es incremental.
+    """
+    def __init__(self, columns: List[str], sample_size: int = 100_000, random_state: int = 0):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))      # sx[i, j]: suma de x_i donde x_i y x_j no son nulos
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+        self.shift: Any = None          # desplazamiento para estabilidad numérica
+        self.rows = 0
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(random_state)
+        self._sample = np.empty((0, p))
+        self._keys = np.empty(0)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, chunksize: int = 1_000_000, **kwargs: Any) -> "CorrelationStats":
+        stats = cls(df.select_dtypes(include=["number"]).columns, **kwargs)
+        for i in range(0, len(df), chunksize):
+            stats.update(df.iloc[i:i + chunksize])
+        return stats
+
+    def update(self, rows: pd.DataFrame) -> "CorrelationStats":
+        if not self.columns or not len(rows):
+            return self
+        x = rows[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = np.isfinite(x)
+        if self.shift is None:
+            cnt = present.sum(axis=0)
+            self.shift = np.where(present, x, 0.0).sum(axis=0) / np.maximum(cnt, 1)
+        m = present.astype(np.float64)
+        x0 = np.where(present, x - self.shift, 0.0)
+        self.n += m.T @ m
+        self.sx += x0.T @ m
+        self.sxx += (x0 * x0).T @ m
+        self.sxy += x0.T @ x0
+        self.rows += len(x)
+
+        # muestra uniforme: nos quedamos con las filas de menor clave aleatoria
+        keys = np.concatenate([self._keys, self._rng.random(len(x))])
+        sample = np.concatenate([self._sample, x])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size - 1)[:self.sample_size]
+            keys, sample = keys[keep], sample[keep]
+        self._keys, self._sample = keys, sample
+        return self
+
+    def pearson(self) -> pd.DataFrame:
+        n, sx, sy = self.n, self.sx, self.sx.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = self.sxy - sx * sy / n
+            var_x = self.sxx - sx * sx / n
+            var_y = self.sxx.T - sy * sy / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(var_x) > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def spearman(self) -> pd.DataFrame:
+        """Correlación de rangos sobre la muestra de filas (aproximada si hay más filas que muestra)."""
+        sample = pd.DataFrame(self._sample, columns=self.columns)
+        return sample.corr(method="spearman")
+
+    def corr(self, method: str = "pearson") -> pd.DataFrame:
+        if method == "spearman":
+            return self.spearman()
+        return self.pearson()
+
+
+class SummaryIndex:
+    """
+    Resúmenes numéricos de las columnas de un DataFrame, calculados la primera
+    vez que se piden y reutilizados mientras no cambie el dataset.
+    append() los actualiza con filas nuevas sin recalcularlos.
+    """
+    def __init__(self, df: pd.DataFrame, bins: int = 30):
+        self.df = df
+        self.bins = bins
+        self._summaries: Dict[str, NumericSummary] = {}
+        self._corr: Any = None
+        self._lock = threading.Lock()
+
+    def get(self, col: str) -> NumericSummary:
+        with self._lock:
+            summary = self._summaries.get(col)
+            if summary is None:
+                summary = NumericSummary.from_series(self.df[col], bins=self.bins)
+                self._summaries[col] = summary
+            return summary
+
+    def correlation(self) -> CorrelationStats:
+        """Estadísticos de correlación de las columnas numéricas (se calculan una vez)."""
+        with self._lock:
+            if self._corr is None:
+                self._corr = CorrelationStats.from_frame(self.df)
+            return self._corr
+
+    def append(self, new_rows: pd.DataFrame) -> None:
+        with self._lock:
+            for col, summary in self._summaries.items():
+                if col in new_rows.columns:
+                    summary.update(new_rows[col])
+            if self._corr is not None:
+                self._corr.update(new_rows)
+
+    def computed(self) -> List[str]:
+        return list(self._summaries)
@@ -6,6 +6,8 @@ from flask import Flask, request, jsonify, Response
 import pandas as pd
 
 from framework.cleaner import Cleaner
+from framework.aggregation import aggregate
+from framework.indexes import DateBucketIndex, DistinctValueIndex
 from framework.strategy.bar import BarChartStrategy
 from framework.strategy.line import LineChartStrategy
 from framework.strategy.histogram import HistogramStrategy
@@ -29,6 +31,10 @@ df = cleaner.clean(raw_df)
 for c in df.columns:
     if "date" in c.lower() or "fecha" in c.lower():
         df[c] = pd.to_datetime(df[c], errors="coerce")
+# agrupaciones año/mes/día precalculadas de las columnas fecha
+date_buckets = DateBucketIndex(df)
+# valores distintos por columna (se indexan al pedirlos por primera vez)
+distinct_values = DistinctValueIndex(df, date_buckets)
 
 # --- Endpoints de datos estáticos ---
 @app.route("/dataset_limpio")
@@ -45,27 +51,29 @@ def resumen():
 
 @app.route("/valores_unicos")
 def valores_unicos():
-    col   = request.args.get("col")
-    agrup = request.args.get("agrup", "Ninguna")
+    """
+    Parámetros: col, agrup, offset (0), limit (1000), orden ("valor" o "frecuencia")
+    y prefijo (opcional). Devuelve una página de valores distintos y el total.
+    """
+    col    = request.args.get("col")
+    agrup  = request.args.get("agrup", "Ninguna")
+    offset = request.args.get("offset", default=0, type=int)
+    limit  = request.args.get("limit", default=1000, type=int)
+    orden  = request.args.get("orden", "valor")
+    prefijo = request.args.get("prefijo") or None
     if col not in df.columns:
         return jsonify(error="Columna no válida"), 400
+    if orden not in ("valor", "frecuencia"):
+        return jsonify(error="Orden no válido"), 400
 
-    tmp = df[[col]].copy()
-    if agrup!="Ninguna" and pd.api.types.is_datetime64_any_dtype(tmp[col]):
-        if agrup=="Anual":
-            tmp[col] = tmp[col].dt.to_period("Y").astype(str)
-        elif agrup=="Mensual":
-            tmp[col] = tmp[col].dt.to_period("M").astype(str)
-        else:
-            tmp[col] = tmp[col].dt.date.astype(str)
-
-    vals = sorted(tmp[col].dropna().unique())
-    return jsonify(values=vals)
+    page = distinct_values.page(col, agrup, offset=max(offset, 0), limit=max(limit, 0),
+                                orden=orden, prefijo=prefijo)
+    return jsonify(page)
 
 # --- Subida de nuevo CSV ---
 @app.route("/upload", methods=["POST"])
 def upload_dataset():
-    global df
+    global df, date_buckets, distinct_values
     f = request.files.get("file")
     if not f:
         return jsonify(error="No se ha enviado ningún fichero"), 400
@@ -81,6 +89,8 @@ def upload_dataset():
             new_df[c] = pd.to_datetime(new_df[c], errors="coerce")
 
     df = new_df
+    date_buckets = DateBucketIndex(df)
+    distinct_values = DistinctValueIndex(df, date_buckets)
     return jsonify(message="Dataset cargado y limpiado",
                    log=df.attrs.get("cleaning_log", []))
 
@@ -104,8 +114,8 @@ def graficar():
     if not strat:
         return jsonify(error=f"Tipo '{tipo}' no soportado"), 400
 
-    # hacemos copia para manipular agrupaciones / filtros
-    d = df.copy()
+    # hacemos copia para manipular agrupaciones / filtros (Barra y Línea agregan sin copiar)
+    d = df if tipo in ("Barra", "Línea") else df.copy()
 
     # Filtrado / agrupaciones previas según tipo
     # Scatter: filtro por grupo
@@ -117,13 +127,9 @@ def graficar():
         sel   = data.get("seleccion_grupos", [])
 
         if grupo and sel:
-            if agr_f!="Ninguna" and pd.api.types.is_datetime64_any_dtype(d[grupo]):
-                if agr_f=="Anual":
-                    d[grupo] = d[grupo].dt.to_period("Y").astype(str)
-                elif agr_f=="Mensual":
-                    d[grupo] = d[grupo].dt.to_period("M").astype(str)
-                else:
-                    d[grupo] = d[grupo].dt.date.astype(str)
+            bucket = date_buckets.get(grupo, agr_f)
+            if bucket is not None:
+                d[grupo] = bucket
             d = d[d[grupo].isin(sel)]
 
         args = {
@@ -145,30 +151,29 @@ def graficar():
 
     # Correlograma
     elif tipo == "Correlograma":
-        args = {}
+        args = {"metodo": data.get("metodo", "pearson")}
 
-    # Barra / Línea
+    # Barra / Línea: agregamos sobre df sin copiarlo, con las fechas ya agrupadas
     else:
-        x_col = data["columna_x"]
-        y_col = data.get("columna_y")
-        agg   = data["agregacion"]
-        grupo = data.get("grupo")
-        # posible agrupación de fechas en eje X
-        agr_x = data.get("agrupacion_fecha", "Ninguna")
-        if agr_x!="Ninguna" and pd.api.types.is_datetime64_any_dtype(d[x_col]):
-            if agr_x=="Anual":
-                d[x_col] = d[x_col].dt.to_period("Y").astype(str)
-            elif agr_x=="Mensual":
-                d[x_col] = d[x_col].dt.to_period("M").astype(str)
-            else:
-                d[x_col] = d[x_col].dt.date.astype(str)
-
         args = {
-            "x_col": x_col,
-            "y_col": y_col,
-            "agregacion": agg,
-            "grupo": grupo
+            "x_col": data["columna_x"],
+            "y_col": data.get("columna_y"),
+            "agregacion": data["agregacion"],
+            "grupo": data.get("grupo")
         }
+        try:
+            res = aggregate(
+                df, **args,
+                agrupacion_fecha=data.get("agrupacion_fecha", "Ninguna"),
+                agrupacion_grupo_fecha=data.get("agrupacion_grupo_fecha", "Ninguna"),
+                seleccion_grupos=data.get("seleccion_grupos", []),
+                buckets=date_buckets,
+            )
+            img_bytes = strat.plot_aggregated(res, **args)
+        except Exception as e:
+            import traceback; traceback.print_exc()
+            return jsonify(error=str(e)), 500
+        return Response(img_bytes, mimetype="image/png")
 
     try:
         img_bytes = strat.plot(d, **args)
@@ -1,8 +1,12 @@
 import sys, os
+import copy
+import functools
+from typing import Any, Dict, Optional, Tuple
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, ROOT_DIR)
 
 from flask import Flask, request, jsonify, Response
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.svm import SVC
@@ -10,22 +14,35 @@ from sklearn.neighbors import KNeighborsClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.naive_bayes import GaussianNB
 
-from framework.datasource            import CSVDataSource
+from framework.datasource            import ChunkedCSVDataSource
 from framework.processor             import DataProcessor
-from framework.cleaner               import Cleaner, TypeOnlyCleaner
+from framework.cleaner               import (Cleaner, CleanedDataSource, StreamingCleaner,
+                                             TypeOnlyCleaner, add_time_features)
+from framework.cache                 import DatasetCache, LRUCache, canonical_key, cleaner_config
+from framework.aggregation           import aggregate, bin_points, group_key, isin_mask
+from framework.indexes               import DateBucketIndex
+from framework.query                 import QueryPlan
+from framework.registry              import DatasetRegistry, DatasetVersion
+from framework.jobs                  import Job, JobManager, QueueFull
+from framework.summaries             import SummaryIndex, grouped_box_stats
 from framework.strategy.bar          import BarChartStrategy
 from framework.strategy.line         import LineChartStrategy
 from framework.strategy.histogram    import HistogramStrategy
 from framework.strategy.boxplot      import BoxplotStrategy
 from framework.strategy.correlograma import CorrelogramaStrategy
 from framework.strategy.scatter      import ScatterStrategy
+from framework.strategy.executor     import RenderExecutor
 from framework.model                 import BasePipelineModel, KMeansClustering, LogisticClassification, LinearRegressionModel
+from framework.model                 import (IncrementalModel, MiniBatchKMeansClustering,
+                                             SGDClassification, SGDRegressionModel)
+from framework.model.batch           import BatchPredictor, arrow_batches, ndjson_batches, pa
+from framework.model.training        import TrainingPool
+from framework.model.versions        import ModelRegistry, ModelVersion
 
 
 app = Flask(__name__)
 
 # — Globals —
-df: pd.DataFrame = pd.DataFrame()
 processor = DataProcessor()
 cleaner   = Cleaner(
     date_cols=None,             # autodetección de columnas fecha
@@ -34,6 +51,137 @@ cleaner   = Cleaner(
     drop_empty_const=True,
     null_threshold=0.7
 )
+# caché en disco de datasets ya limpios (Parquet), invalidada por mtime/tamaño y config del Cleaner
+dataset_cache = DatasetCache(os.path.join(ROOT_DIR, ".cache", "datasets"))
+# datasets con nombre y versiones inmutables: /load_dataset y /convert_types publican
+# versiones nuevas y cada petición trabaja sobre la versión que tomó prestada.
+# El número de versión (único en el registro) forma parte de las claves de caché.
+registry = DatasetRegistry(max_bytes=int(os.environ["DATASETS_MAX_BYTES"])
+                           if os.environ.get("DATASETS_MAX_BYTES") else None)
+DEFAULT_DATASET = "default"
+registry.release(registry.publish(DEFAULT_DATASET, pd.DataFrame()))
+# cargas en segundo plano, en un pool propio para no ocupar los hilos de las peticiones
+jobs = JobManager(max_workers=int(os.environ.get("LOAD_WORKERS", 2)))
+# entrenamientos: cola propia y pool de procesos (TRAIN_WORKERS entrenamientos a la vez)
+TRAIN_WORKERS = int(os.environ.get("TRAIN_WORKERS", 1))
+train_jobs = JobManager(max_workers=TRAIN_WORKERS)
+trainer = TrainingPool(max_workers=TRAIN_WORKERS)
+# PNG ya generados y resultados agregados de /graficar
+render_cache = LRUCache(max_bytes=128 * 1024**2)
+agg_cache    = LRUCache(max_bytes=64 * 1024**2)
+
+
+def date_buckets_of(ds: DatasetVersion) -> DateBucketIndex:
+    """Agrupaciones año/mes/día precalculadas de las columnas datetime de la versión."""
+    return ds.derived("date_buckets", DateBucketIndex)
+
+
+def summaries_of(ds: DatasetVersion) -> SummaryIndex:
+    """Resúmenes numéricos (bins, cuantiles, extremos) para histogramas, boxplots y correlogramas."""
+    return ds.derived("summaries", SummaryIndex)
+
+
+def dataset_name() -> str:
+    """Dataset de la petición: campo "dataset" del JSON o parámetro ?dataset=."""
+    data = request.get_json(silent=True) or {}
+    return data.get("dataset") or request.args.get("dataset") or DEFAULT_DATASET
+
+
+def with_dataset(view):
+    """Presta al endpoint la versión actual del dataset pedido durante toda la petición."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            ds = registry.acquire(dataset_name())
+        except KeyError as e:
+            return jsonify(error=e.args[0]), 404
+        try:
+            return view(ds, *args, **kwargs)
+        finally:
+            registry.release(ds)
+    return wrapper
+
+
+def build_dataset(path: str, job: Optional[Job] = None) -> pd.DataFrame:
+    """
+    Carga, limpia y prepara las variables temporales de un CSV.
+    job: si se indica, recibe el progreso (filas, bytes, etapa) y puede cancelar la carga.
+    """
+    # 1) Cargar dataset (por bloques, con tipos compactos)
+    progress = None
+    if job is not None:
+        job.report(stage="lectura")
+        progress = lambda rows, read, total: job.report(rows=rows, bytes_read=read, bytes_total=total)
+    src = ChunkedCSVDataSource(path, progress=progress)
+    df_new = src.load()
+
+    # 2) Limpiar (el frame recién leído no se comparte: limpiamos sin copiarlo)
+    step = (lambda name: job.report(stage=f"limpieza: {name}")) if job is not None else None
+    df_new = cleaner.clean(df_new, copy=False, progress=step)
+
+    # 3) Fechas y variables temporales
+    if job is not None:
+        job.report(stage="fechas")
+    for c in df_new.columns:
+        if any(pat in c.lower() for pat in ("date","time","fecha")):
+            df_new[c] = pd.to_datetime(df_new[c], errors="coerce")
+    return add_time_features(df_new)
+
+
+def load_into_registry(path: str, name: str, use_cache: bool = True,
+                       job: Optional[Job] = None) -> Dict[str, Any]:
+    """
+    1) Si el fichero ya se cargó con la misma configuración, lo lee de la caché en disco
+    2) Si no, carga por bloques, limpia con Cleaner y convierte fechas (build_dataset)
+       y guarda el resultado en la caché
+    3) Publica el resultado como versión nueva del dataset y precalcula las
+       agrupaciones año/mes/día de sus fechas
+    Devuelve preview, columnas, tipos, log y versión.
+    """
+    # 1) Caché columnar
+    key = dataset_cache.key(path, cleaner_config(cleaner))
+    if job is not None:
+        job.report(stage="caché")
+    df_new = dataset_cache.get(key) if use_cache else None
+    cached = df_new is not None
+
+    # 2) Cargar, limpiar y preparar fechas
+    if not cached:
+        df_new = build_dataset(path, job)
+        if job is not None:
+            job.report(stage="guardando caché")
+        try:
+            dataset_cache.put(key, df_new)
+        except Exception:
+            # la caché es una optimización: si no se puede escribir, la carga sigue siendo válida
+            app.logger.warning("No se pudo guardar %s en la caché de datasets", path, exc_info=True)
+
+    # 3) Publicar la versión y precalcular las agrupaciones de fechas
+    if job is not None:
+        job.report(stage="índices", rows=len(df_new))
+    ds = registry.publish(name, df_new)
+    try:
+        date_buckets_of(ds)
+        df = ds.df
+
+        # 4) Preparar respuesta
+        preview_df = df.head(10).copy()
+        # Convertir datetime a strings ISO
+        for col in preview_df.select_dtypes(include=["datetime64[ns]"]):
+            preview_df[col] = preview_df[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
+        preview_records = preview_df.to_dict(orient="records")
+
+        return {
+            "preview":       preview_records,
+            "columns":       processor.get_columns(df),
+            "dtypes":        processor.get_dtypes(df),
+            "cleaning_log":  df.attrs.get("cleaning_log", []),
+            "cached":        cached,
+            "dataset":       ds.name,
+            "version":       ds.version
+        }
+    finally:
+        registry.release(ds)
 
 # --------------------- Endpoints ----------------- #
 
@@ -41,94 +189,111 @@ cleaner   = Cleaner(
 @app.route("/load_dataset", methods=["POST"])
 def load_dataset():
     """
-    Espera JSON: { "path": "<ruta_a_csv>" }
-    1) Carga con CSVDataSource
-    2) Limpia con Cleaner por defecto
-    3) Convierte fechas autodetectadas
-    4) Actualiza `df` global
-    Responde con preview, columnas, tipos y log.
+    Espera JSON: { "path": "<ruta_a_csv>", "use_cache": true, "dataset": "default" }
+    Carga el dataset dentro de la petición (ver load_into_registry) y responde con
+    preview, columnas, tipos, log y versión. Para ficheros grandes, /load_dataset_async.
     """
-    global df
     try:
         data = request.get_json() or {}
         path = data.get("path")
         if not path or not os.path.isfile(path):
             return jsonify(error=f"Fichero no encontrado: {path}"), 400
-
-        # 1) Cargar dataset
-        src = CSVDataSource(path)
-        df_new = src.load()
-
-        # 2) Limpiar
-        df_new = cleaner.clean(df_new)
-
-        # 3) Fechas y variables temporales
-        for c in df_new.columns:
-            if any(pat in c.lower() for pat in ("date","time","fecha")):
-                df_new[c] = pd.to_datetime(df_new[c], errors="coerce")
-        if "Start_Time" in df_new.columns:
-            st = df_new["Start_Time"]
-            df_new["Hour"] = st.dt.hour
-            df_new["Weekday"] = st.dt.dayofweek
-            df_new["Month"] = st.dt.month
-
-        # 4) Actualizar global
-        df = df_new
-
-        # 5) Preparar respuesta
-        preview_df = df.head(10).copy()
-        # Convertir datetime a strings ISO
-        for col in preview_df.select_dtypes(include=["datetime64[ns]"]):
-            preview_df[col] = preview_df[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
-        preview_records = preview_df.to_dict(orient="records")
-
-        cols = processor.get_columns(df)
-        dtypes = processor.get_dtypes(df)
-        log = df.attrs.get("cleaning_log", [])
-
-        return jsonify({
-            "preview":       preview_records,
-            "columns":       cols,
-            "dtypes":        dtypes,
-            "cleaning_log":  log
-        })
+        return jsonify(load_into_registry(path, dataset_name(), data.get("use_cache", True)))
 
     except Exception as e:
         import traceback; traceback.print_exc()
         return jsonify(error=str(e)), 500
+
+@app.route("/load_dataset_async", methods=["POST"])
+def load_dataset_async():
+    """
+    Mismo JSON que /load_dataset, pero la carga se hace en segundo plano.
+    Responde 202 con el id del trabajo; el progreso se consulta en /jobs/<id>.
+    """
+    data = request.get_json() or {}
+    path = data.get("path")
+    if not path or not os.path.isfile(path):
+        return jsonify(error=f"Fichero no encontrado: {path}"), 400
+    name = dataset_name()
+    try:
+        use_cache = data.get("use_cache", True)
+        job = jobs.submit("load", lambda job: load_into_registry(path, name, use_cache, job),
+                          params={"path": path, "dataset": name})
+    except QueueFull as e:
+        return jsonify(error=str(e)), 429
+    return jsonify(job_id=job.id, status=job.status), 202
+
+def find_job(job_id: str) -> Tuple[Optional[JobManager], Optional[Job]]:
+    """Gestor y trabajo con ese id (cargas o entrenamientos)."""
+    for manager in (jobs, train_jobs):
+        job = manager.get(job_id)
+        if job is not None:
+            return manager, job
+    return None, None
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify(jobs=[j.to_dict() for j in jobs.list() + train_jobs.list()])
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Estado, etapa, filas/bytes o pasos completados, ETA y, al terminar, el resultado."""
+    _, job = find_job(job_id)
+    if job is None:
+        return jsonify(error=f"Trabajo '{job_id}' no encontrado"), 404
+    info = job.to_dict()
+    if job.status == "completado":
+        info["result"] = job.result
+    return jsonify(info)
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    manager, job = find_job(job_id)
+    if job is None:
+        return jsonify(error=f"Trabajo '{job_id}' no encontrado"), 404
+    cancelled = manager.cancel(job_id)
+    return jsonify(job_id=job_id, cancelled=cancelled, status=job.status)
+
 # IProcessor
 @app.route("/columns", methods=["GET"])
-def get_columns():
-    return jsonify(columns=processor.get_columns(df))
+@with_dataset
+def get_columns(ds):
+    return jsonify(columns=processor.get_columns(ds.df))
 
 @app.route("/dtypes", methods=["GET"])
-def get_dtypes():
-    return jsonify(dtypes=processor.get_dtypes(df))
+@with_dataset
+def get_dtypes(ds):
+    return jsonify(dtypes=processor.get_dtypes(ds.df))
 
 @app.route("/info", methods=["GET"])
-def get_info():
-    return jsonify(info=processor.get_info(df))
+@with_dataset
+def get_info(ds):
+    return jsonify(info=processor.get_info(ds.df))
 
 @app.route("/null_percentages", methods=["GET"])
-def get_null_percentages():
-    return jsonify(null_percentages=processor.get_null_percentages(df))
+@with_dataset
+def get_null_percentages(ds):
+    return jsonify(null_percentages=processor.get_null_percentages(ds.df))
 
 @app.route("/unique_counts", methods=["GET"])
-def get_unique_counts():
-    return jsonify(unique_counts=processor.get_unique_counts(df))
+@with_dataset
+def get_unique_counts(ds):
+    return jsonify(unique_counts=processor.get_unique_counts(ds.df))
 
 @app.route("/unique_values", methods=["GET"])
-def get_unique_values():
+@with_dataset
+def get_unique_values(ds):
     n = request.args.get("n", default=20, type=int)
-    return jsonify(unique_values=processor.get_unique_values(df, n))
+    return jsonify(unique_values=processor.get_unique_values(ds.df, n))
 
 @app.route("/descriptive_stats", methods=["GET"])
-def get_descriptive_stats():
+@with_dataset
+def get_descriptive_stats(ds):
     """
     Devuelve las estadísticas descriptivas (df.describe()).
     Para mantenerlo ligero, lo devolvemos como JSON de dict-of-dicts.
     """
-    stats_df = processor.get_descriptive_stats(df)
+    stats_df = processor.get_descriptive_stats(ds.df)
     return jsonify(descriptive_stats=stats_df.to_dict())
 
 
@@ -138,28 +303,34 @@ def convert_types():
     """
     Espera JSON:
       { "dtype_map": { "station": "category", "CO": "float32", … } }
-    Aplica TypeOnlyCleaner sobre el df global, actualiza df y devuelve:
+    Aplica TypeOnlyCleaner sobre una copia superficial del dataset (solo se
+    copian las columnas convertidas), publica la versión nueva y devuelve:
       - el nuevo tipo de datos de todas las columnas
       - el cleaning_log con los mensajes de conversión
     """
-    global df
-
     data = request.get_json() or {}
     dtype_map = data.get("dtype_map", {})
     if not dtype_map:
         return jsonify(error="Debes enviar un 'dtype_map' no vacío"), 400
 
     caster = TypeOnlyCleaner(dtype_map=dtype_map)
-    df = caster.clean(df)  # reasignamos el df global tipado
+    try:
+        ds = registry.update(dataset_name(), lambda d: caster.clean(d, copy=False))
+    except KeyError as e:
+        return jsonify(error=e.args[0]), 404
 
     # Preparamos la respuesta
-    dtypes = processor.get_dtypes(df)
-    log    = df.attrs.get("cleaning_log", [])
+    try:
+        dtypes = processor.get_dtypes(ds.df)
+        log    = ds.df.attrs.get("cleaning_log", [])
+    finally:
+        registry.release(ds)
 
     return jsonify({
         "message":      "Tipos actualizados correctamente",
         "dtypes":       dtypes,
-        "cleaning_log": log
+        "cleaning_log": log,
+        "version":      ds.version
     })
 
 # IPlotStrategy
@@ -171,34 +342,135 @@ strategies = {
     "Correlograma": CorrelogramaStrategy(),
     "Scatter":      ScatterStrategy(),
 }
+# pool de procesos para renderizar datos ya agregados (RENDER_WORKERS=0 → en el propio proceso)
+renderer = RenderExecutor(max_workers=int(os.environ.get("RENDER_WORKERS", os.cpu_count() or 1)))
 
 @app.route("/graficar", methods=["POST"])
-def graficar():
+@with_dataset
+def graficar(ds):
     data = request.get_json() or {}
     tipo = data.get("tipo")
     strat = strategies.get(tipo)
     if strat is None:
         return jsonify(error=f"Tipo '{tipo}' no soportado"), 400
 
-    # Cogemos copia para no modificar el global
-    d = df.copy()
+    # Mismo payload sobre la misma versión del dataset → mismo PNG
+    render_key = canonical_key(data, ds.version)
+    img = render_cache.get(render_key)
+    if img is not None:
+        return Response(img, mimetype="image/png", headers={"X-Cache": "HIT"})
+
+    df = ds.df
+    date_buckets = date_buckets_of(ds)
+    summaries = summaries_of(ds)
 
     # Parámetros comunes
     grupo    = data.get("grupo")
     select   = data.get("seleccion_grupos", [])  # aquí vendrán las estaciones a mostrar
-    # Si hay selección y columna de grupo válida, filtramos
-    if grupo and select:
-        if grupo not in d.columns:
-            return jsonify(error=f"Columna de grupo '{grupo}' no existe"), 400
-        d = d[d[grupo].isin(select)]
+    if grupo and select and grupo not in df.columns:
+        return jsonify(error=f"Columna de grupo '{grupo}' no existe"), 400
 
-    # --- Ahora, según el tipo, armamos kwargs para la estrategia ---
+    # Barra o Línea: se agrega sobre el df sin copiarlo y la estrategia
+    # solo recibe el resultado agregado (una fila por grupo)
+    if tipo in ("Barra", "Línea"):
+        x_col = data["columna_x"]
+        y_col = data.get("columna_y")
+        agg   = data.get("agregacion")
+        kwargs = {
+            "x_col":      x_col,
+            "y_col":      y_col,
+            "agregacion": agg,
+            "grupo":      grupo
+        }
+        agg_params = {
+            **kwargs,
+            "y_col":                  y_col if agg != "Conteo" else None,
+            "agrupacion_fecha":       data.get("agrupacion_fecha", "Ninguna"),
+            "agrupacion_grupo_fecha": data.get("agrupacion_grupo_fecha", "Ninguna"),
+            "seleccion_grupos":       select,
+        }
+        try:
+            # Barra y Línea comparten el mismo resultado agregado
+            agg_key = canonical_key(agg_params, ds.version)
+            res = agg_cache.get(agg_key)
+            if res is None:
+                res = aggregate(df, **agg_params, buckets=date_buckets)
+                agg_cache.put(agg_key, res)
+            img = renderer.render(strat, "plot_aggregated", res, **kwargs)
+        except Exception as e:
+            import traceback; traceback.print_exc()
+            return jsonify(error=str(e)), 500
+        render_cache.put(render_key, img)
+        return Response(img, mimetype="image/png", headers={"X-Cache": "MISS"})
+
+    # Scatter con muchas filas: rejilla de densidad calculada sobre df sin copiarlo
     if tipo == "Scatter":
         x_col = data["columna_x"]
         y_col = data["columna_y"]
         agr_f = data.get("agrupacion_grupo_fecha", "Ninguna")
-        # (… aquí tu lógica original de scatter con agrupación de fechas en el grupo si hace falta …)
-        kwargs = {"x_col": x_col, "y_col": y_col, "grupo": grupo}
+        modo  = data.get("modo", "auto")
+        gkey  = group_key(df, grupo, agr_f, date_buckets) if grupo else None
+        mask  = isin_mask(gkey, select) if gkey is not None and select else None
+        n_rows = int(mask.sum()) if mask is not None else len(df)
+        if strat.use_density(n_rows, modo):
+            try:
+                xs, ys = df[x_col], df[y_col]
+                if mask is not None:
+                    xs, ys, gkey = xs[mask], ys[mask], gkey[mask]
+                grid = bin_points(xs, ys, gkey, bins=strat.bins)
+                img = renderer.render(strat, "plot_density", grid, x_col, y_col, grupo)
+            except Exception as e:
+                import traceback; traceback.print_exc()
+                return jsonify(error=str(e)), 500
+            render_cache.put(render_key, img)
+            return Response(img, mimetype="image/png", headers={"X-Cache": "MISS"})
+
+    # Histograma y Boxplot sin grupo: se pintan desde el resumen precalculado de la columna
+    if (tipo == "Histograma" and not (grupo and select)) or (tipo == "Boxplot" and not grupo):
+        y_col = data["columna_y"]
+        try:
+            img = renderer.render(strat, "plot_summary", summaries.get(y_col), y_col)
+        except Exception as e:
+            import traceback; traceback.print_exc()
+            return jsonify(error=str(e)), 500
+        render_cache.put(render_key, img)
+        return Response(img, mimetype="image/png", headers={"X-Cache": "MISS"})
+
+    # Boxplot por grupos: todos los grupos (o los seleccionados) en una sola pasada
+    if tipo == "Boxplot":
+        y_col = data["columna_y"]
+        try:
+            gkey = group_key(df, grupo, data.get("agrupacion_grupo_fecha", "Ninguna"), date_buckets)
+            values = df[y_col]
+            if select:
+                mask = isin_mask(gkey, select)
+                values, gkey = values[mask], gkey[mask]
+            stats = grouped_box_stats(values, gkey)
+            img = renderer.render(strat, "plot_grouped", stats, y_col, grupo)
+        except Exception as e:
+            import traceback; traceback.print_exc()
+            return jsonify(error=str(e)), 500
+        render_cache.put(render_key, img)
+        return Response(img, mimetype="image/png", headers={"X-Cache": "MISS"})
+
+    # Correlograma: matriz a partir de los estadísticos suficientes acumulados por versión
+    if tipo == "Correlograma" and not (grupo and select):
+        metodo = data.get("metodo", "pearson")
+        if metodo not in ("pearson", "spearman"):
+            return jsonify(error=f"Método '{metodo}' no soportado"), 400
+        try:
+            corr = summaries.correlation().corr(metodo)
+            img = renderer.render(strat, "plot_matrix", corr, metodo)
+        except Exception as e:
+            import traceback; traceback.print_exc()
+            return jsonify(error=str(e)), 500
+        render_cache.put(render_key, img)
+        return Response(img, mimetype="image/png", headers={"X-Cache": "MISS"})
+
+    # Resto de casos (scatter de puntos, histograma de una selección...): vista con solo
+    # las columnas que usa la estrategia y las filas seleccionadas, sin copiar el df
+    if tipo == "Scatter":
+        kwargs = {"x_col": data["columna_x"], "y_col": data["columna_y"], "grupo": grupo, "modo": "puntos"}
 
     elif tipo == "Histograma":
         kwargs = {"y_col": data["columna_y"]}
@@ -206,49 +478,48 @@ def graficar():
     elif tipo == "Boxplot":
         kwargs = {"y_col": data["columna_y"], "grupo": grupo}
 
-    elif tipo == "Correlograma":
-        kwargs = {}
+    else:  # Correlograma
+        kwargs = {"metodo": data.get("metodo", "pearson")}
 
-    else:  # Barra o Línea
-        x_col = data["columna_x"]
-        y_col = data.get("columna_y")
-        agg   = data.get("agregacion")
-        # 1) Agrupación de fechas en eje X
-        agr_x = data.get("agrupacion_fecha", "Ninguna")
-        if agr_x!="Ninguna" and pd.api.types.is_datetime64_any_dtype(d[x_col]):
-            if agr_x=="Anual":
-                d[x_col] = d[x_col].dt.to_period("Y").astype(str)
-            elif agr_x=="Mensual":
-                d[x_col] = d[x_col].dt.to_period("M").astype(str)
-            else:
-                d[x_col] = d[x_col].dt.date.astype(str)
-        # Quitar filas donde la agrupación temporal dio NaT o cadena vacía
-        d = d[d[x_col].notnull()]
-        # 2) Agrupación de fechas en el grupo (por si quieres agrupar un group datetime)
-        agr_g = data.get("agrupacion_grupo_fecha", "Ninguna")
-        if grupo and agr_g!="Ninguna" and pd.api.types.is_datetime64_any_dtype(d[grupo]):
-            if agr_g=="Anual":
-                d[grupo] = d[grupo].dt.to_period("Y").astype(str)
-            elif agr_g=="Mensual":
-                d[grupo] = d[grupo].dt.to_period("M").astype(str)
-            else:
-                d[grupo] = d[grupo].dt.date.astype(str)
+    plan = QueryPlan(df,
+                     columns=strat.columns(df, **kwargs),
+                     grupo=grupo,
+                     seleccion=select,
+                     agrupacion_grupo=data.get("agrupacion_grupo_fecha", "Ninguna"),
+                     buckets=date_buckets)
 
-        kwargs = {
-            "x_col":      x_col,
-            "y_col":      y_col,
-            "agregacion": agg,
-            "grupo":      grupo
-        }
-
-    # Generar el PNG
+    # Generar el PNG en este proceso: la vista tiene datos por fila y enviarla al pool
+    # de render la serializaría entera (y la copia no constaría en X-Bytes-Allocated)
     try:
-        img = strat.plot(d, **kwargs)
+        view = plan.execute()
+        img = strat.plot(view, **kwargs)
     except Exception as e:
         import traceback; traceback.print_exc()
         return jsonify(error=str(e)), 500
 
-    return Response(img, mimetype="image/png")
+    render_cache.put(render_key, img)
+    report = plan.report()
+    return Response(img, mimetype="image/png", headers={
+        "X-Cache":           "MISS",
+        "X-Rows":            str(report["rows_out"]),
+        "X-Bytes-Allocated": str(report["bytes_allocated"]),
+    })
+
+
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    """Aciertos, fallos, expulsiones y ocupación de las cachés de /graficar y /predict_model."""
+    return jsonify({
+        "datasets":        registry.versions(),
+        "render":          render_cache.stats(),
+        "aggregates":      agg_cache.stats(),
+        "features":        feature_cache.stats(),
+    })
+
+@app.route("/datasets", methods=["GET"])
+def list_datasets():
+    """Datasets registrados: versión actual, filas, memoria, lectores y estructuras derivadas."""
+    return jsonify(registry.stats())
 
 #- Modelos algoritmos de aprendizaje
 rf_model = BasePipelineModel(
@@ -274,6 +545,10 @@ svm_model = BasePipelineModel(
 )
 
 # — Modelos de aprendizaje —
+# resultados de la validación cruzada de los grid search, reutilizados entre entrenamientos
+CV_CACHE_DIR = os.path.join(ROOT_DIR, ".cache", "cv")
+# validación apartada al entrenar: las métricas no se calculan sobre las filas de entrenamiento
+HOLDOUT = {"holdout": 0.2, "holdout_max_rows": 50_000}
 features = ["Temperature(F)", "Humidity(%)", "Visibility(mi)",
             "Wind_Speed(mph)", "Precipitation(in)", "Hour", "Weekday", "Month"]
 
@@ -283,13 +558,15 @@ models = {
         estimator=RandomForestRegressor(random_state=42),
         param_grid={"estimator__n_estimators": [50,100], "estimator__max_depth": [5,10]},
         preprocess_config={"numeric": features}, use_grid_search=True,
-        scoring="r2"
+        scoring="r2", cache_dir=CV_CACHE_DIR, **HOLDOUT
     ),
     "classification_svm": BasePipelineModel(
         estimator=SVC(probability=True, random_state=42),
         param_grid={"estimator__C": [0.1,1,10], "estimator__kernel": ["rbf","linear"]},
         preprocess_config={"numeric": features}, use_grid_search=True,
-        scoring="accuracy"
+        scoring="accuracy", cache_dir=CV_CACHE_DIR,
+        search_strategy="halving",  # SVC no escala: el grid completo solo con pocas filas
+        **HOLDOUT
     ),
 
     # **Nuevos modelos de clasificación**
@@ -297,70 +574,256 @@ models = {
         estimator=KNeighborsClassifier(),
         param_grid={"estimator__n_neighbors": [3,5,7]},
         preprocess_config={"numeric": features}, use_grid_search=True,
-        scoring="recall"   # priorizamos recall
+        scoring="recall", cache_dir=CV_CACHE_DIR,  # priorizamos recall
+        **HOLDOUT
     ),
     "tree": BasePipelineModel(
         estimator=DecisionTreeClassifier(random_state=42),
         param_grid={"estimator__max_depth": [5,10,15]},
         preprocess_config={"numeric": features}, use_grid_search=True,
-        scoring="recall"
+        scoring="recall", cache_dir=CV_CACHE_DIR, **HOLDOUT
     ),
     "nb": BasePipelineModel(
         estimator=GaussianNB(),
         preprocess_config={"numeric": features},  # NB no necesita grid search
-        use_grid_search=False
+        use_grid_search=False, **HOLDOUT
     ),
 
     # Tus otros modelos
     "linear_reg": LinearRegressionModel(),
     "logistic": LogisticClassification(),
-    "clustering_kmeans": KMeansClustering(n_clusters=4)
+    "clustering_kmeans": KMeansClustering(n_clusters=4),
+
+    # Incrementales (partial_fit por bloques): admiten "path" en /train_model
+    "sgd_classifier": SGDClassification(),
+    "sgd_regressor": SGDRegressionModel(),
+    "minibatch_kmeans": MiniBatchKMeansClustering(n_clusters=4),
 }
 
 
+# modelos entrenados: versiones inmutables por nombre (models solo guarda las plantillas),
+# guardadas en disco y cargadas bajo demanda al reiniciar
+MODEL_STORE_DIR = os.environ.get("MODEL_STORE_DIR", os.path.join(ROOT_DIR, ".cache", "models"))
+trained_models = ModelRegistry(store_dir=MODEL_STORE_DIR)
+# matrices de features ya preprocesadas por (modelo, versión, dataset, features)
+feature_cache = LRUCache(max_bytes=int(os.environ.get("FEATURE_CACHE_BYTES", 512 * 1024**2)))
+
+
+def train_version(job: Job, name: str, model: Any, X: Optional[pd.DataFrame], y: Optional[pd.Series],
+                  meta: Dict[str, Any], source: Optional[tuple] = None) -> Dict[str, Any]:
+    """Entrena model en el pool de procesos y lo registra como versión nueva de name."""
+    fitted, fit_time = trainer.run(job, model, X, y, source=source)
+    if source is not None:
+        meta["rows"] = fitted.n_rows_
+    search = getattr(fitted, "pipeline", None)
+    if hasattr(search, "best_params_"):
+        meta["best_params"] = search.best_params_
+        meta["cv_score"] = float(search.best_score_)
+    if getattr(fitted, "evaluation_", None):
+        meta["evaluation"] = fitted.evaluation_
+    if hasattr(search, "n_cells_cached_"):
+        meta["cv_cells"] = {"cached": search.n_cells_cached_, "computed": search.n_cells_computed_}
+    mv = trained_models.add(name, fitted, fit_time=round(fit_time, 3), **meta)
+    return mv.describe()
+
+
 @app.route("/train_model", methods=["POST"])
-def train_model():
+@with_dataset
+def train_model(ds):
+    """
+    Espera JSON: { "model_name", "features", "target", "search_strategy", "search_options",
+    "path", "chunksize", "wait" }
+    Encola el entrenamiento de una copia de la plantilla del modelo y responde 202 con el
+    id del trabajo (progreso en /jobs/<id>). Al terminar queda como versión nueva del modelo.
+    Con "path" (solo modelos incrementales) se entrena leyendo ese CSV por bloques de
+    chunksize filas, limpiados como en /load_dataset, sin cargarlo en memoria.
+    Con "wait": true espera al final y responde con la versión creada.
+    """
+    df = ds.df
     data = request.get_json() or {}
     name = data.get("model_name")
     features = data.get("features", [])
     target = data.get("target")
+    path = data.get("path")
     if name not in models:
         return jsonify(error=f"Modelo '{name}' no soportado"), 400
-    if df.empty:
-        return jsonify(error="Dataset no cargado"), 400
-    X = df[features]
-    y = df[target] if target else None
-    model = models[name]
+    source = None
+    if path:
+        if not isinstance(models[name], IncrementalModel):
+            return jsonify(error=f"El modelo '{name}' no admite entrenamiento por bloques"), 400
+        if not os.path.exists(path):
+            return jsonify(error=f"Fichero '{path}' no encontrado"), 400
+        # las columnas se comprueban al leer los bloques: un error termina el trabajo
+        chunks = CleanedDataSource(ChunkedCSVDataSource(path, chunksize=int(data.get("chunksize") or 100_000)),
+                                   StreamingCleaner(**cleaner.params()), [add_time_features])
+        source = (chunks, features, target)
+        X = y = None
+    else:
+        if df.empty:
+            return jsonify(error="Dataset no cargado"), 400
+        missing = [c for c in features + ([target] if target else []) if c not in df.columns]
+        if missing:
+            return jsonify(error=f"Columnas no encontradas: {missing}"), 400
+        X = df[features]
+        y = df[target] if target else None
+
+    # cada entrenamiento parte de su propia copia: la plantilla compartida no se modifica
+    model = copy.deepcopy(models[name])
     try:
-        model.fit(X, y)
-    except Exception as e:
-        return jsonify(error=str(e)), 500
-    return jsonify(message=f"Modelo '{name}' entrenado correctamente")
+        # estrategia de búsqueda opcional: "grid", "halving" o "random" (+ search_options)
+        if data.get("search_strategy") and isinstance(model, BasePipelineModel):
+            model.set_search(data["search_strategy"], **data.get("search_options", {}))
+    except (TypeError, ValueError) as e:
+        return jsonify(error=str(e)), 400
+
+    if source is not None:
+        meta = {"features": features, "target": target, "path": path}
+    else:
+        meta = {"features": features, "target": target, "dataset": ds.name,
+                "dataset_version": ds.version, "rows": len(X)}
+    try:
+        job = train_jobs.submit("train", train_version, name, model, X, y, meta, source=source,
+                                params={"model_name": name, "dataset": path or ds.name})
+    except QueueFull as e:
+        return jsonify(error=str(e)), 429
+
+    if data.get("wait"):
+        job.future.result()
+        if job.status != "completado":
+            return jsonify(job_id=job.id, status=job.status, error=job.error), 500
+        return jsonify(message=f"Modelo '{name}' entrenado correctamente", job_id=job.id, **job.result)
+    return jsonify(job_id=job.id, status=job.status), 202
+
+
+def resolve_model(data: Dict[str, Any]):
+    """Versión pedida (campo "version") o la última del modelo; (versión, respuesta de error)."""
+    name = data.get("model_name")
+    # los modelos guardados se sirven aunque ya no tengan plantilla en models
+    if name not in models and name not in trained_models.names():
+        return None, (jsonify(error=f"Modelo '{name}' no soportado"), 400)
+    try:
+        return trained_models.get(name, data.get("version")), None
+    except KeyError as e:
+        return None, (jsonify(error=e.args[0]), 404)
+
+
+@app.route("/models", methods=["GET"])
+def list_models():
+    """Modelos disponibles y sus versiones entrenadas (en memoria o guardadas en disco)."""
+    names = list(models) + [n for n in trained_models.names() if n not in models]
+    return jsonify({name: trained_models.versions(name) for name in names})
+
+
+def stored_evaluation(mv: ModelVersion) -> Dict[str, Any]:
+    """
+    Métricas guardadas al entrenar, con el mismo formato que model.evaluate() sin
+    datos, sacadas de los metadatos: no carga el modelo de disco.
+    """
+    evaluation = mv.meta["evaluation"]
+    results = {}
+    if "best_params" in mv.meta:
+        results["best_params"] = mv.meta["best_params"]
+    results.update(evaluation.get("holdout") or evaluation.get("cv") or evaluation.get("progresiva") or {})
+    results["evaluation"] = evaluation
+    results["version"] = mv.version
+    return results
 
 @app.route("/evaluate_model", methods=["POST"])
-def evaluate_model():
+@with_dataset
+def evaluate_model(ds):
+    """
+    Espera JSON: { "model_name", "version", "sobre_dataset", "features", "target" }
+    Por defecto devuelve al instante las métricas calculadas al entrenar (validación
+    apartada y out-of-fold). Con "sobre_dataset": true, o si el modelo no las tiene,
+    predice y evalúa sobre el dataset actual completo.
+    """
+    df = ds.df
     data = request.get_json() or {}
-    name = data.get("model_name")
-    features = data.get("features", [])
-    target = data.get("target")
-    if name not in models:
-        return jsonify(error=f"Modelo '{name}' no soportado"), 400
+    mv, error = resolve_model(data)
+    if error:
+        return error
+    if mv.meta.get("evaluation") and not data.get("sobre_dataset"):
+        return jsonify(stored_evaluation(mv))
+    features = data.get("features") or mv.features
+    target = data.get("target", mv.meta.get("target"))
     X = df[features]
     y = df[target] if target else None
-    results = models[name].evaluate(X, y)
+    results = mv.model.evaluate(X, y)
+    # las métricas quedan en los metadatos de la versión (y en disco si está guardada)
+    metrics = {k: v for k, v in results.items() if k != "best_params"}
+    trained_models.update_meta(mv.name, mv.version, metrics=metrics,
+                               metrics_dataset={"name": ds.name, "version": ds.version, "rows": len(X)})
+    results["version"] = mv.version
     return jsonify(results)
 
+def prediction_rows(ds: DatasetVersion, data: Dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    Posiciones de las filas a predecir: rango [desde, hasta) y, si se indica,
+    filtro grupo + seleccion_grupos (con agrupacion_grupo_fecha) como en /graficar.
+    None si son todas las filas.
+    """
+    df = ds.df
+    n = len(df)
+    desde = max(int(data["desde"]) if data.get("desde") is not None else 0, 0)
+    hasta = min(int(data["hasta"]) if data.get("hasta") is not None else n, n)
+    grupo, select = data.get("grupo"), data.get("seleccion_grupos")
+    if not (grupo and select):
+        return None if (desde, hasta) == (0, n) else np.arange(desde, max(hasta, desde))
+    if grupo not in df.columns:
+        raise KeyError(f"Columna de grupo '{grupo}' no existe")
+    gkey = group_key(df, grupo, data.get("agrupacion_grupo_fecha", "Ninguna"), date_buckets_of(ds))
+    mask = isin_mask(gkey, select)
+    return np.flatnonzero(mask[desde:hasta]) + desde
+
 @app.route("/predict_model", methods=["POST"])
-def predict_model():
+@with_dataset
+def predict_model(ds):
+    """
+    Espera JSON: { "model_name", "version", "features", "desde", "hasta", "grupo",
+    "seleccion_grupos", "agrupacion_grupo_fecha", "batch_size", "formato" }
+    Predice por lotes de batch_size filas. formato "json" (por defecto) devuelve
+    la lista completa; "ndjson" y "arrow" envían cada lote según se calcula.
+    """
+    df = ds.df
     data = request.get_json() or {}
-    name = data.get("model_name")
-    features = data.get("features", [])
-    if name not in models:
-        return jsonify(error=f"Modelo '{name}' no soportado"), 400
+    mv, error = resolve_model(data)
+    if error:
+        return error
+    features = data.get("features") or mv.features
+    missing = [c for c in features if c not in df.columns]
+    if missing:
+        return jsonify(error=f"Columnas no encontradas: {missing}"), 400
+    formato = data.get("formato", "json")
+    if formato not in ("json", "ndjson", "arrow"):
+        return jsonify(error=f"Formato '{formato}' no soportado"), 400
+    if formato == "arrow" and pa is None:
+        return jsonify(error="El formato arrow necesita pyarrow"), 400
+    try:
+        rows = prediction_rows(ds, data)
+        batch_size = data.get("batch_size")
+        predictor = BatchPredictor(mv.model, feature_cache,
+                                   50_000 if batch_size is None else int(batch_size))
+    except KeyError as e:
+        return jsonify(error=e.args[0]), 400
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
     X = df[features]
-    preds = models[name].predict(X).tolist()
-    return jsonify(predictions=preds)
+    # la clave lleva la versión del modelo: la matriz depende de su preprocesado ajustado
+    batches = predictor.iter_batches(X, rows, key=(mv.name, mv.version, ds.version, tuple(features)))
+    headers = {"X-Model-Version": str(mv.version), "X-Dataset-Version": str(ds.version),
+               "X-Rows": str(len(X) if rows is None else len(rows))}
+    # los generadores se consumen después de devolver el préstamo del dataset:
+    # X y df.index los mantienen vivos aunque se publique otra versión
+    if formato == "ndjson":
+        return Response(ndjson_batches(batches, df.index), mimetype="application/x-ndjson", headers=headers)
+    if formato == "arrow":
+        return Response(arrow_batches(batches, df.index),
+                        mimetype="application/vnd.apache.arrow.stream", headers=headers)
+    preds = [p for _, p in batches]
+    preds = np.concatenate(preds).tolist() if preds else []
+    return jsonify(predictions=preds, version=mv.version)
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)